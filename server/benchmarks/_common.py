@@ -0,0 +1,58 @@
+"""Shared setup for the benchmark scripts.
+
+Run them from the server directory, e.g.::
+
+    python -m benchmarks.bench_bulk_create
+
+Each script gets a throwaway data directory and an authenticated TestClient,
+so no Google credentials or running server are needed.
+"""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+_data_dir = tempfile.mkdtemp(prefix="quiclick-bench-")
+os.environ.setdefault("QUICLICK_GOOGLE_CLIENT_ID", "bench")
+os.environ.setdefault("QUICLICK_GOOGLE_CLIENT_SECRET", "bench")
+os.environ.setdefault("QUICLICK_SECRET_KEY", "bench")
+os.environ["QUICLICK_DATA_DIR"] = _data_dir
+
+from starlette.testclient import TestClient  # noqa: E402
+
+from quiclick_server.database import get_current_user  # noqa: E402
+from quiclick_server.main import app  # noqa: E402
+
+# Minimal valid PNG, used where a realistic favicon payload matters
+PNG_DATA_URL = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4"
+    "nGP4DwABAQEABRjYTgAAAABJRU5ErkJggg=="
+)
+
+
+def make_client(sub: str) -> TestClient:
+    """Return a TestClient authenticated as ``sub`` (a fresh, empty account)."""
+    app.dependency_overrides[get_current_user] = lambda: sub
+    return TestClient(app)
+
+
+def bookmark_rows(count: int, favicon: bool = False) -> list[dict]:
+    rows = []
+    for i in range(count):
+        row = {"title": f"Bookmark {i}", "url": f"https://example.com/page/{i}"}
+        if favicon:
+            row["favicon"] = PNG_DATA_URL
+        rows.append(row)
+    return rows
+
+
+@contextmanager
+def timed(label: str, rows: int | None = None):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    line = f"{label:<40} {elapsed * 1000:10.1f} ms"
+    if rows:
+        line += f"  {rows / elapsed:12,.0f} rows/s"
+    print(line)
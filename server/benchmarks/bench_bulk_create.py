@@ -0,0 +1,27 @@
+"""Bulk create vs. one POST /bookmarks per row."""
+
+from benchmarks._common import bookmark_rows, make_client, timed
+
+SINGLE_ROWS = 500
+BULK_SIZES = [1_000, 10_000, 50_000]
+
+
+def main():
+    client = make_client("bench-single")
+    rows = bookmark_rows(SINGLE_ROWS)
+    with timed(f"POST /bookmarks x {SINGLE_ROWS}", SINGLE_ROWS):
+        for row in rows:
+            client.post("/bookmarks", json=row)
+
+    for size in BULK_SIZES:
+        for favicon in (False, True):
+            client = make_client(f"bench-bulk-{size}-{favicon}")
+            rows = bookmark_rows(size, favicon=favicon)
+            label = f"POST /bookmarks/bulk {size}" + (" +favicon" if favicon else "")
+            with timed(label, size):
+                resp = client.post("/bookmarks/bulk", json={"bookmarks": rows})
+            assert resp.json()["created"] == size
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Bursts of identical reads with and without single-flight coalescing.
+
+Seeds 5k bookmarks (with favicons), then fires bursts of concurrent
+identical requests, as a browser with many new-tab pages open does, at an
+incremental ``GET /changes``, a full pull (sync cache disabled) and
+``GET /bookmarks``. Reports the burst time and the coalescing ratio.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._common import bookmark_rows, make_client, timed
+from quiclick_server import coalesce
+from quiclick_server.config import reset_config
+
+SUB = "bench-coalesce"
+BOOKMARKS = 5_000
+CONCURRENCY = 16
+BURSTS = 5
+PAST = {"If-Modified-Since": "Wed, 01 Jan 2020 00:00:00 GMT"}
+
+
+def _burst(client, path: str, headers: dict):
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        for _ in range(BURSTS):
+            list(
+                pool.map(
+                    lambda _: client.get(path, headers=headers), range(CONCURRENCY)
+                )
+            )
+
+
+def main():
+    client = make_client(SUB)
+    rows = bookmark_rows(BOOKMARKS, favicon=True)
+    assert client.post("/bookmarks/bulk", json={"bookmarks": rows}).status_code == 200
+    os.environ["QUICLICK_SYNC_CACHE_BYTES"] = "0"
+
+    print(f"-- {BURSTS} bursts of {CONCURRENCY} identical requests")
+    for enabled in ("0", "1"):
+        os.environ["QUICLICK_COALESCE_READS"] = enabled
+        reset_config()
+        coalesce.clear()
+        mode = "coalesced" if enabled == "1" else "independent"
+        for label, path, headers in (
+            ("/changes since", "/changes", PAST),
+            ("/changes full", "/changes", {}),
+            ("/bookmarks", "/bookmarks", {}),
+        ):
+            with timed(f"{label} {mode}"):
+                _burst(client, path, headers)
+        for endpoint, counts in coalesce.stats().items():
+            print(
+                f"{'':<40} {endpoint}: {counts['computed']} computed, "
+                f"{counts['shared']} shared, ratio {counts['ratio']:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
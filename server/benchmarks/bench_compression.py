@@ -0,0 +1,46 @@
+"""CPU cost vs bytes saved of response compression.
+
+Fetches uncompressed /changes, /bookmarks and NDJSON /export bodies of two
+accounts (with and without favicons) and compresses each with every
+available encoding at a few levels, reporting size, ratio and CPU time.
+"""
+
+import time
+
+from benchmarks._common import bookmark_rows, make_client
+from quiclick_server import compression
+
+BOOKMARKS = 2_000
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 6, 11), "zstd": (1, 6, 19)}
+PATHS = ("/changes", "/bookmarks", "/export?format=ndjson")
+
+
+def _measure(label: str, body: bytes):
+    print(f"-- {label}: {len(body) / 1024:.1f} KiB")
+    for encoding in compression.ENCODINGS:
+        for level in LEVELS[encoding]:
+            start = time.process_time()
+            size = len(compression.compress(body, encoding, level))
+            cpu = time.process_time() - start
+            saved = (len(body) - size) / 1024 / 1024
+            print(
+                f"{encoding + ' ' + str(level):<12} {size / 1024:9.1f} KiB"
+                f"  {len(body) / size:6.1f}x  {cpu * 1000:8.1f} ms CPU"
+                f"  {saved / max(cpu, 1e-9):8.1f} MiB saved/s"
+            )
+
+
+def main():
+    for favicon in (False, True):
+        sub = f"bench-compression-{favicon}"
+        client = make_client(sub)
+        rows = bookmark_rows(BOOKMARKS, favicon=favicon)
+        resp = client.post("/bookmarks/bulk", json={"bookmarks": rows})
+        assert resp.status_code == 200
+        for path in PATHS:
+            body = client.get(path, headers={"Accept-Encoding": "identity"}).content
+            _measure(f"{path} ({'with' if favicon else 'no'} favicons)", body)
+
+
+if __name__ == "__main__":
+    main()
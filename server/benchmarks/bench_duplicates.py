@@ -0,0 +1,64 @@
+"""Duplicate detection on a large account.
+
+Seeds 50k bookmarks, every tenth one a variant of an earlier URL (other
+case, trailing slash, tracking parameters), then compares finding the
+duplicates client-side from a full ``GET /bookmarks`` with the grouped
+``GET /bookmarks/duplicates`` query, and a plain create with one that skips
+an existing URL. Also times a 10k bulk create with and without
+``on_duplicate=skip``.
+"""
+
+from benchmarks._common import bookmark_rows, make_client, timed
+from quiclick_server.urls import normalize_url
+
+BOOKMARKS = 50_000
+BULK = 10_000
+
+
+def _variant(i: int) -> str:
+    return f"HTTPS://Example.com/page/{i}/?utm_source=bench"
+
+
+def main():
+    client = make_client("bench-duplicates")
+    rows = bookmark_rows(BOOKMARKS)
+    for i in range(0, BOOKMARKS, 10):
+        rows[i]["url"] = _variant(i + 1)
+    for start in range(0, BOOKMARKS, 10_000):
+        chunk = rows[start : start + 10_000]
+        resp = client.post("/bookmarks/bulk", json={"bookmarks": chunk})
+        assert resp.status_code == 200
+
+    print(f"-- {BOOKMARKS} bookmarks, {BOOKMARKS // 10} duplicated")
+    with timed("GET /bookmarks + group client-side"):
+        groups = {}
+        for bookmark in client.get("/bookmarks?fields=id,url").json():
+            key = normalize_url(bookmark["url"])
+            groups.setdefault(key, []).append(bookmark["id"])
+        found = [ids for ids in groups.values() if len(ids) > 1]
+    with timed("GET /bookmarks/duplicates"):
+        report = client.get("/bookmarks/duplicates").json()
+    assert len(report) == len(found) == BOOKMARKS // 10
+
+    client.post("/bookmarks", json={"title": "Warm-up", "url": "https://warm.up"})
+    new = {"title": "New", "url": "https://example.com/new"}
+    with timed("POST /bookmarks"):
+        assert client.post("/bookmarks", json=new).status_code == 201
+    existing = {"title": "Again", "url": _variant(7)}
+    with timed("POST /bookmarks?on_duplicate=skip (hit)"):
+        resp = client.post("/bookmarks?on_duplicate=skip", json=existing)
+        assert resp.status_code == 200
+
+    print(f"-- bulk create of {BULK}, half already bookmarked")
+    bulk = [
+        {"title": f"Bulk {i}", "url": f"https://example.com/page/{i * 10 + 5}"}
+        for i in range(BULK)
+    ]
+    for params in ("?on_duplicate=skip", ""):
+        with timed(f"POST /bookmarks/bulk{params}", BULK):
+            resp = client.post(f"/bookmarks/bulk{params}", json={"bookmarks": bulk})
+        print(f"{'':<40} {resp.json()['created']:10} created")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Payload size and encode/decode time of the export formats.
+
+Seeds an account with favicons, then for each format times the export
+(encode), the codec alone on the same structure, and a replacing import
+(decode + validate + insert).
+"""
+
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime
+
+import msgpack
+from sqlalchemy.orm import Session
+
+from benchmarks._common import bookmark_rows, make_client, timed
+from quiclick_server.database import create_user_engine, user_db_path
+from quiclick_server.importer import (
+    MSGPACK_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    import_stream,
+    to_micros,
+)
+from quiclick_server.routes.export_import import (
+    iter_export_msgpack,
+    iter_export_ndjson,
+)
+
+SUB = "bench-formats"
+BOOKMARKS = 20_000
+CHUNK = 64 * 1024
+
+
+def _chunks(body: bytes):
+    async def gen():
+        for start in range(0, len(body), CHUNK):
+            yield body[start : start + CHUNK]
+
+    return gen()
+
+
+def _import(body: bytes, content_type: str):
+    engine = create_user_engine(user_db_path(SUB))
+    try:
+        with Session(engine) as db:
+            asyncio.run(import_stream(db, _chunks(body), content_type))
+    finally:
+        engine.dispose()
+
+
+def _codec(label: str, encode, decode, data):
+    start = time.perf_counter()
+    body = encode(data)
+    encoded = time.perf_counter()
+    decode(body)
+    decoded = time.perf_counter()
+    print(
+        f"{label:<40} {len(body) / 2**20:8.2f} MiB"
+        f"  encode {(encoded - start) * 1000:7.1f} ms"
+        f"  decode {(decoded - encoded) * 1000:7.1f} ms"
+    )
+
+
+def _micros(value: str) -> int:
+    return to_micros(datetime.fromisoformat(value))
+
+
+def _as_msgpack_structure(export: dict) -> dict:
+    """The JSON export with raw favicons and integer timestamps."""
+    bookmarks = []
+    for bm in export["bookmarks"]:
+        header, b64 = bm["favicon"].split(",", 1)
+        bookmarks.append(
+            {
+                **bm,
+                "favicon": base64.b64decode(b64),
+                "favicon_mime": header[5:].split(";")[0],
+                "date_added": _micros(bm["date_added"]),
+            }
+        )
+    return {
+        **export,
+        "export_date": _micros(export["export_date"]),
+        "folders": [
+            {**f, "date_added": _micros(f["date_added"])} for f in export["folders"]
+        ],
+        "bookmarks": bookmarks,
+    }
+
+
+def main():
+    client = make_client(SUB)
+    rows = bookmark_rows(BOOKMARKS, favicon=True)
+    assert client.post("/bookmarks/bulk", json={"bookmarks": rows}).status_code == 200
+
+    print("-- codec only, same ExportData structure")
+    export = client.get("/export").json()
+    _codec(
+        "json",
+        lambda d: json.dumps(d, separators=(",", ":")).encode(),
+        json.loads,
+        export,
+    )
+    packed = _as_msgpack_structure(export)
+    _codec("msgpack", msgpack.packb, msgpack.unpackb, packed)
+
+    print("-- GET /export (encode)")
+    with timed("json", BOOKMARKS):
+        json_body = client.get("/export").content
+    with timed("ndjson", BOOKMARKS):
+        ndjson_body = b"".join(iter_export_ndjson(user_db_path(SUB)))
+    with timed("msgpack", BOOKMARKS):
+        msgpack_body = b"".join(iter_export_msgpack(user_db_path(SUB)))
+    for label, body in (
+        ("json", json_body),
+        ("ndjson", ndjson_body),
+        ("msgpack", msgpack_body),
+    ):
+        print(f"{label + ' size':<40} {len(body) / 2**20:10.2f} MiB")
+
+    print("-- POST /import (decode + insert)")
+    with timed("json", BOOKMARKS):
+        _import(json_body, "application/json")
+    with timed("ndjson", BOOKMARKS):
+        _import(ndjson_body, NDJSON_MEDIA_TYPE)
+    with timed("msgpack", BOOKMARKS):
+        _import(msgpack_body, MSGPACK_MEDIA_TYPE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Peak memory of the JSON export vs. the streaming NDJSON and SQLite exports.
+
+Seeds a 50k-bookmark account (with favicons) and measures the tracemalloc
+peak while producing the full response body. The streaming generators are
+consumed directly: TestClient buffers whole streaming responses, which would
+hide the difference. The JSON export is built in memory either way.
+"""
+
+import tracemalloc
+
+from benchmarks._common import bookmark_rows, make_client, timed
+from quiclick_server.database import user_db_path
+from quiclick_server.routes.export_import import iter_export_ndjson
+from quiclick_server.snapshot import create_snapshot, iter_snapshot
+
+SUB = "bench-export"
+BOOKMARKS = 50_000
+
+
+def _measure(label: str, produce):
+    tracemalloc.start()
+    with timed(label, BOOKMARKS):
+        size = produce()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{'':<40} {size / 2**20:10.1f} MiB body, peak {peak / 2**20:8.1f} MiB")
+
+
+def _json_export() -> int:
+    client = make_client(SUB)
+    return len(client.get("/export").content)
+
+
+def _ndjson_export() -> int:
+    size = 0
+    for chunk in iter_export_ndjson(user_db_path(SUB)):
+        size += len(chunk)
+    return size
+
+
+def _sqlite_export() -> int:
+    size = 0
+    for chunk in iter_snapshot(create_snapshot(user_db_path(SUB))):
+        size += len(chunk)
+    return size
+
+
+def main():
+    client = make_client(SUB)
+    rows = bookmark_rows(BOOKMARKS, favicon=True)
+    resp = client.post("/bookmarks/bulk", json={"bookmarks": rows})
+    assert resp.json()["created"] == BOOKMARKS
+    del rows, resp
+
+    _measure("GET /export (JSON)", _json_export)
+    _measure("GET /export?format=ndjson", _ndjson_export)
+    _measure("GET /export?format=sqlite", _sqlite_export)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Full bookmark listings vs ``?fields=`` projections.
+
+Times ``GET /bookmarks`` and a full ``GET /changes`` pull (sync cache
+disabled) for an account whose bookmarks all carry a favicon, returning
+every field vs only ids and positions.
+"""
+
+import os
+
+from benchmarks._common import bookmark_rows, make_client, timed
+from quiclick_server.config import reset_config
+
+BOOKMARKS = 10_000
+REPEAT = 10
+
+
+def main():
+    client = make_client("bench-field-projection")
+    rows = bookmark_rows(BOOKMARKS, favicon=True)
+    assert client.post("/bookmarks/bulk", json={"bookmarks": rows}).status_code == 200
+    os.environ["QUICLICK_SYNC_CACHE_BYTES"] = "0"
+    reset_config()
+
+    print(f"-- {BOOKMARKS} bookmarks with favicons, {REPEAT} requests each")
+    for path in ("/bookmarks", "/changes"):
+        for query in ("", "?fields=id,position"):
+            size = len(client.get(path + query).content)
+            with timed(f"GET {path}{query} ({size // 1024} KiB)", BOOKMARKS * REPEAT):
+                for _ in range(REPEAT):
+                    client.get(path + query)
+
+
+if __name__ == "__main__":
+    main()
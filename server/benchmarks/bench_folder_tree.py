@@ -0,0 +1,85 @@
+"""Fetching a folder subtree: walking it per folder vs one tree request.
+
+Seeds a tree of folders (``FANOUT`` subfolders per folder, ``DEPTH``
+levels) with ``PER_FOLDER`` bookmarks each, then reads the whole tree below
+the top folder by following ``GET /folders/{id}`` + ``GET /bookmarks``
+folder by folder (what clients had to do) and with one
+``GET /folders/{id}/tree``.
+"""
+
+import sqlite3
+
+from benchmarks._common import make_client, timed
+from quiclick_server.database import user_db_path
+
+SUB = "bench-folder-tree"
+FANOUT = 4
+DEPTH = 4
+PER_FOLDER = 20
+
+
+def _seed(client) -> int:
+    top = client.post("/folders", json={"title": "Top"}).json()["id"]
+    level = [top]
+    for depth in range(DEPTH):
+        # Subfolders first, on the first row of their parent
+        subfolders = []
+        if depth < DEPTH - 1:
+            for parent in level:
+                for i in range(FANOUT):
+                    body = {"title": f"F{i}", "parent_id": parent, "position": [i, 0]}
+                    subfolders.append(client.post("/folders", json=body).json()["id"])
+        rows = [
+            {
+                "title": f"B{i}",
+                "url": f"https://e.com/{parent}/{i}",
+                "parent_id": parent,
+            }
+            for parent in level
+            for i in range(PER_FOLDER)
+        ]
+        resp = client.post("/bookmarks/bulk", json={"bookmarks": rows})
+        assert resp.status_code == 200
+        level = subfolders
+    return top
+
+
+def _walk(client, folder_id: int) -> int:
+    """Bookmarks below a folder, one request per folder (children via SQL)."""
+    count = len(client.get(f"/folders/{folder_id}").json()["bookmarks"])
+    for child in _children(folder_id):
+        count += _walk(client, child)
+    return count
+
+
+def _children(folder_id: int) -> list[int]:
+    # No API lists subfolders of a folder; read them like a client's cache would
+    with sqlite3.connect(user_db_path(SUB)) as conn:
+        rows = conn.execute(
+            "SELECT id FROM items WHERE parent_id = ? AND type = 'folder'"
+            " AND deleted_at IS NULL",
+            (folder_id,),
+        )
+        return [row[0] for row in rows]
+
+
+def _count(node: dict) -> int:
+    return len(node["bookmarks"]) + sum(_count(f) for f in node["folders"])
+
+
+def main():
+    client = make_client(SUB)
+    top = _seed(client)
+    folders = sum(FANOUT**d for d in range(DEPTH))
+    print(f"-- {folders} folders, {folders * PER_FOLDER} bookmarks below the top")
+    with timed("walk GET /folders/{id}"):
+        walked = _walk(client, top)
+    with timed("GET /folders/{id}/tree"):
+        tree = client.get(f"/folders/{top}/tree").json()
+    assert _count(tree) == walked
+    with timed("GET /folders/{id}/tree?depth=1"):
+        client.get(f"/folders/{top}/tree?depth=1")
+
+
+if __name__ == "__main__":
+    main()
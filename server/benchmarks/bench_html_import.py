@@ -0,0 +1,37 @@
+"""POST /import/html with a 20k-entry Netscape bookmark file."""
+
+from benchmarks._common import PNG_DATA_URL, make_client, timed
+
+FOLDERS = 200
+PER_FOLDER = 100
+
+
+def bookmark_file(folders: int, per_folder: int) -> bytes:
+    lines = ["<!DOCTYPE NETSCAPE-Bookmark-file-1>", "<DL><p>"]
+    for f in range(folders):
+        lines.append(f'<DT><H3 ADD_DATE="1700000000">Folder {f}</H3>')
+        lines.append("<DL><p>")
+        for b in range(per_folder):
+            icon = f' ICON="{PNG_DATA_URL}"' if b % 2 else ""
+            lines.append(
+                f'<DT><A HREF="https://example.com/{f}/{b}" '
+                f'ADD_DATE="1700000000"{icon}>Bookmark {f}/{b}</A>'
+            )
+        lines.append("</DL><p>")
+    lines.append("</DL><p>")
+    return "\n".join(lines).encode()
+
+
+def main():
+    client = make_client("bench-html-import")
+    body = bookmark_file(FOLDERS, PER_FOLDER)
+    entries = FOLDERS * (PER_FOLDER + 1)
+    with timed(f"POST /import/html {entries} entries", entries):
+        resp = client.post(
+            "/import/html", content=body, headers={"Content-Type": "text/html"}
+        )
+    assert resp.json()["bookmarks"] == FOLDERS * PER_FOLDER
+
+
+if __name__ == "__main__":
+    main()
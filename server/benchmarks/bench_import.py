@@ -0,0 +1,82 @@
+"""Import throughput and peak memory for each body format.
+
+Exports a 50k-bookmark account (with favicons) once per format, then replays
+it through ``import_stream`` in 64 KiB chunks read from disk, the way the
+route receives it. Throughput is timed without tracing; peak memory comes
+from a second, traced run. Peak RSS of the whole process is printed at the
+end.
+"""
+
+import asyncio
+import json
+import resource
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from benchmarks._common import bookmark_rows, make_client, timed
+from quiclick_server.database import create_user_engine, user_db_path
+from quiclick_server.importer import NDJSON_MEDIA_TYPE, MergeWriter, import_stream
+
+SUB = "bench-import"
+BOOKMARKS = 50_000
+CHUNK = 64 * 1024
+
+
+async def _file_chunks(path: Path):
+    with path.open("rb") as f:
+        while chunk := f.read(CHUNK):
+            yield chunk
+
+
+def _import(path: Path, content_type: str, merge: bool = False):
+    engine = create_user_engine(user_db_path(SUB))
+    try:
+        with Session(engine) as db:
+            writer = MergeWriter(db) if merge else None
+            chunks = _file_chunks(path)
+            writer = asyncio.run(import_stream(db, chunks, content_type, writer))
+        assert writer.bookmarks == BOOKMARKS
+    finally:
+        engine.dispose()
+
+
+def main():
+    client = make_client(SUB)
+    rows = bookmark_rows(BOOKMARKS, favicon=True)
+    assert client.post("/bookmarks/bulk", json={"bookmarks": rows}).status_code == 200
+    del rows
+
+    work = Path(tempfile.mkdtemp(prefix="quiclick-bench-import-"))
+    ndjson = work / "export.ndjson"
+    ndjson.write_bytes(client.get("/export?format=ndjson").content)
+    array = work / "export-array.json"
+    records = [json.loads(line) for line in ndjson.read_bytes().splitlines()]
+    array.write_text(json.dumps(records))
+    legacy = work / "export.json"
+    legacy.write_bytes(client.get("/export").content)
+    del records
+
+    for label, path, content_type, merge in (
+        ("ExportData object (read whole)", legacy, "application/json", False),
+        ("JSON array (streamed)", array, "application/json", False),
+        ("NDJSON (streamed)", ndjson, NDJSON_MEDIA_TYPE, False),
+        ("NDJSON merge, nothing changed", ndjson, NDJSON_MEDIA_TYPE, True),
+    ):
+        with timed(label, BOOKMARKS):
+            _import(path, content_type, merge)
+        tracemalloc.start()
+        _import(path, content_type, merge)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = path.stat().st_size / 2**20
+        print(f"{'':<40} {size:10.1f} MiB body, peak {peak / 2**20:8.1f} MiB")
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"process peak RSS {maxrss:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
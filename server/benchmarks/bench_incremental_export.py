@@ -0,0 +1,37 @@
+"""Bytes and time of full vs incremental NDJSON exports.
+
+Seeds an account with favicons, takes a full export, then compares it with
+incremental exports of an idle account and after touching 1% of the rows.
+"""
+
+import json
+
+from benchmarks._common import bookmark_rows, make_client, timed
+
+SUB = "bench-incremental"
+BOOKMARKS = 20_000
+
+
+def _export(client, label: str, query: str = "") -> bytes:
+    with timed(label):
+        body = client.get(f"/export?format=ndjson{query}").content
+    print(f"{label + ' size':<40} {len(body) / 1024:10.1f} KiB")
+    return body
+
+
+def main():
+    client = make_client(SUB)
+    rows = bookmark_rows(BOOKMARKS, favicon=True)
+    created = client.post("/bookmarks/bulk", json={"bookmarks": rows}).json()
+
+    full = _export(client, "full")
+    marker = json.loads(full.splitlines()[0])["marker"]
+    _export(client, "incremental, idle", f"&since={marker}")
+
+    for row in created["results"][: BOOKMARKS // 100]:
+        client.patch(f"/bookmarks/{row['id']}", json={"title": "Renamed"})
+    _export(client, "incremental, 1% changed", f"&since={marker}")
+
+
+if __name__ == "__main__":
+    main()
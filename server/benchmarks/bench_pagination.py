@@ -0,0 +1,58 @@
+"""Whole listings vs keyset pages on a large account.
+
+Seeds 50k bookmarks (with favicons) and, for ``GET /bookmarks`` and a full
+``GET /changes`` pull (sync cache disabled), measures the time and
+tracemalloc peak of one unpaginated response vs the first page and a page
+deep into the account. Keyset pages cost the same wherever they start.
+"""
+
+import os
+import tracemalloc
+
+from benchmarks._common import bookmark_rows, make_client, timed
+from quiclick_server.config import reset_config
+from quiclick_server.pagination import NEXT_PAGE_HEADER
+
+BOOKMARKS = 50_000
+PAGE = 500
+DEEP_PAGES = 80
+
+
+def _measure(label: str, request):
+    tracemalloc.start()
+    with timed(label):
+        resp = request()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = len(resp.content) / 2**20
+    print(f"{'':<40} {size:10.2f} MiB body, peak {peak / 2**20:8.1f} MiB")
+    return resp
+
+
+def main():
+    client = make_client("bench-pagination")
+    for _ in range(BOOKMARKS // 10_000):
+        rows = bookmark_rows(10_000, favicon=True)
+        resp = client.post("/bookmarks/bulk", json={"bookmarks": rows})
+        assert resp.status_code == 200
+    os.environ["QUICLICK_SYNC_CACHE_BYTES"] = "0"
+    reset_config()
+
+    print(f"-- {BOOKMARKS} bookmarks, pages of {PAGE}")
+    for path in ("/bookmarks", "/changes"):
+        _measure(f"GET {path}", lambda: client.get(path))
+        first = {"limit": PAGE}
+        _measure(f"GET {path} first page", lambda: client.get(path, params=first))
+
+        token = None
+        for _ in range(DEEP_PAGES):
+            params = {"limit": PAGE, "page_token": token} if token else {"limit": PAGE}
+            token = client.get(path, params=params).headers[NEXT_PAGE_HEADER]
+        _measure(
+            f"GET {path} page {DEEP_PAGES + 1}",
+            lambda: client.get(path, params={"limit": PAGE, "page_token": token}),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""ORM vs Core read paths at 100, 1k and 10k bookmarks per account.
+
+Times the query + row-to-dict step of ``GET /bookmarks`` and
+``GET /folders`` both ways: ORM entities (the previous path) and the
+prebuilt statements of ``quiclick_server.queries`` executed on a warm
+shared engine. A tenth of the items are folders. The last column times the
+whole ``GET /bookmarks`` request through the TestClient.
+"""
+
+import time
+
+from sqlalchemy.orm import Session
+
+from benchmarks._common import bookmark_rows, make_client
+from quiclick_server import queries
+from quiclick_server.database import user_db_path, user_engine
+from quiclick_server.models import Bookmark, Folder
+from quiclick_server.serialization import bookmark_dict, folder_dict
+
+SIZES = (100, 1_000, 10_000)
+REPEAT = 20
+
+
+def _orm_bookmarks(db: Session):
+    bookmarks = (
+        db.query(Bookmark)
+        .filter(Bookmark.deleted_at.is_(None))
+        .order_by(Bookmark.position_y, Bookmark.position_x)
+        .all()
+    )
+    return [bookmark_dict(b) for b in bookmarks]
+
+
+def _core_bookmarks(db: Session):
+    rows = db.connection().execute(queries.LIVE_BOOKMARKS)
+    return [bookmark_dict(row) for row in rows]
+
+
+def _orm_folders(db: Session):
+    folders = (
+        db.query(Folder)
+        .filter(Folder.deleted_at.is_(None))
+        .order_by(Folder.position_y, Folder.position_x)
+        .all()
+    )
+    return [folder_dict(f) for f in folders]
+
+
+def _core_folders(db: Session):
+    rows = db.connection().execute(queries.LIVE_FOLDERS)
+    return [folder_dict(row) for row in rows]
+
+
+def _time(engine, func) -> tuple[float, list]:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        # A fresh Session per run, like a request
+        with Session(engine) as db:
+            result = func(db)
+    return (time.perf_counter() - start) / REPEAT * 1000, result
+
+
+def main():
+    print(
+        f"{'items':>7} {'query':<10} {'ORM ms':>9} {'Core ms':>9} {'speedup':>8}"
+        f" {'GET ms':>9}"
+    )
+    for size in SIZES:
+        sub = f"bench-read-{size}"
+        client = make_client(sub)
+        folders = size // 10
+        for i in range(folders):
+            client.post("/folders", json={"title": f"Folder {i}"})
+        rows = bookmark_rows(size - folders)
+        resp = client.post("/bookmarks/bulk", json={"bookmarks": rows})
+        assert resp.status_code == 200
+        engine = user_engine(user_db_path(sub))
+
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            assert client.get("/bookmarks").status_code == 200
+        request_ms = (time.perf_counter() - start) / REPEAT * 1000
+
+        for label, orm, core in (
+            ("bookmarks", _orm_bookmarks, _core_bookmarks),
+            ("folders", _orm_folders, _core_folders),
+        ):
+            orm_ms, expected = _time(engine, orm)
+            core_ms, actual = _time(engine, core)
+            assert actual == expected
+            get_ms = f"{request_ms:9.2f}" if label == "bookmarks" else ""
+            print(
+                f"{size:>7} {label:<10} {orm_ms:9.2f} {core_ms:9.2f}"
+                f" {orm_ms / core_ms:7.1f}x {get_ms}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Full-text search latency on a large account.
+
+Seeds 100k bookmarks with varied titles and URLs and times ``GET /search``
+and its FTS5 query alone for selective, broad (a word in 1/8 of the
+titles) and short-prefix queries, next to the ``LIKE '%word%'`` scan a
+search without the index would run (which stops at 50 unranked hits).
+Also reports bulk insert speed with the index kept up to date.
+"""
+
+import random
+import sqlite3
+import statistics
+import time
+
+from benchmarks._common import make_client, timed
+from quiclick_server import queries
+from quiclick_server.database import user_db_path, user_engine
+from quiclick_server.search import match_expression
+
+SUB = "bench-search"
+BOOKMARKS = 100_000
+REPEAT = 50
+# A few common words (each in ~1/8 of the titles) and many rare ones
+COMMON = "docs news mail github python cloud status admin".split()
+RARE = [f"w{i:04d}x" for i in range(5_000)]
+QUERIES = ("w0042x", "w004", "github w0042x", "python", "gi", "zzz")
+
+
+def _rows(count: int, rng: random.Random) -> list[dict]:
+    rows = []
+    for i in range(count):
+        title = f"{rng.choice(COMMON).title()} {rng.choice(RARE)} {i}"
+        url = f"https://{rng.choice(RARE)}.example.com/{rng.choice(RARE)}"
+        rows.append({"title": title, "url": url})
+    return rows
+
+
+def _median_ms(call) -> float:
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    rng = random.Random(0)
+    client = make_client(SUB)
+    batches = [_rows(10_000, rng) for _ in range(BOOKMARKS // 10_000)]
+    with timed(f"bulk insert {BOOKMARKS} (indexed)", rows=BOOKMARKS):
+        for rows in batches:
+            resp = client.post("/bookmarks/bulk", json={"bookmarks": rows})
+            assert resp.status_code == 200
+
+    db_path = user_db_path(SUB)
+    engine = user_engine(db_path)
+    conn = sqlite3.connect(db_path)
+    print(f"-- {BOOKMARKS} bookmarks, median of {REPEAT}")
+    for q in QUERIES:
+        params = {"query": match_expression(q), "limit": 50}
+        with engine.connect() as c:
+            found = len(c.execute(queries.SEARCH, params).all())
+            sql = _median_ms(lambda: c.execute(queries.SEARCH, params).all())
+        api = _median_ms(lambda: client.get("/search", params={"q": q}))
+        word = q.split()[0]
+        like = _median_ms(
+            lambda: conn.execute(
+                "SELECT id FROM items WHERE deleted_at IS NULL"
+                " AND (title LIKE ? OR url LIKE ?) LIMIT 50",
+                (f"%{word}%", f"%{word}%"),
+            ).fetchall()
+        )
+        print(
+            f"{q!r:<24} {found:3} hits  query {sql:6.2f} ms  GET /search {api:6.2f} ms"
+            f"  LIKE {like:6.2f} ms"
+        )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
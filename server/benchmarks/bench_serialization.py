@@ -0,0 +1,66 @@
+"""Rows/sec of the response serializers.
+
+Loads the bookmarks of a seeded account once, then times only the
+serialization of the list: per-row ``BookmarkResponse`` models dumped with
+``model_dump(mode="json")`` and encoded by the stdlib (the previous
+``/changes`` path) vs ``bookmark_dict`` rows encoded in one pydantic-core
+``to_json`` call.
+"""
+
+import json
+import time
+
+from pydantic_core import to_json
+from sqlalchemy.orm import Session
+
+from benchmarks._common import bookmark_rows, make_client
+from quiclick_server.database import create_user_engine, user_db_path
+from quiclick_server.models import Bookmark
+from quiclick_server.routes.bookmarks import _bookmark_to_response
+from quiclick_server.serialization import bookmark_dict
+
+BOOKMARKS = 10_000
+REPEAT = 5
+
+
+def _models(bookmarks) -> bytes:
+    dumped = [_bookmark_to_response(b).model_dump(mode="json") for b in bookmarks]
+    return json.dumps(dumped, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _fast(bookmarks) -> bytes:
+    return to_json([bookmark_dict(b) for b in bookmarks])
+
+
+def _time(label: str, func, bookmarks):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        body = func(bookmarks)
+    elapsed = (time.perf_counter() - start) / REPEAT
+    print(
+        f"{label:<40} {elapsed * 1000:10.1f} ms"
+        f"  {len(bookmarks) / elapsed:12,.0f} rows/s"
+    )
+    return body
+
+
+def main():
+    for favicon in (False, True):
+        sub = f"bench-serialization-{favicon}"
+        client = make_client(sub)
+        rows = bookmark_rows(BOOKMARKS, favicon=favicon)
+        resp = client.post("/bookmarks/bulk", json={"bookmarks": rows})
+        assert resp.status_code == 200
+        engine = create_user_engine(user_db_path(sub))
+        with Session(engine) as db:
+            bookmarks = db.query(Bookmark).all()
+            label = "with" if favicon else "no"
+            print(f"-- {len(bookmarks)} bookmarks, {label} favicons")
+            slow = _time("pydantic models + json.dumps", _models, bookmarks)
+            fast = _time("bookmark_dict + to_json", _fast, bookmarks)
+            assert json.loads(slow) == json.loads(fast)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Joined-table vs single-table item storage.
+
+Runs the statements behind bookmark reads, inserts and replace-imports
+against two fresh databases: the schema version 1 layout (``items`` +
+``bookmarks`` + ``folders``, read with a JOIN, written with two INSERTs)
+and the current single ``items`` table. Finally times migrating the
+joined-table database with ``_migrate_user_db``.
+"""
+
+import base64
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks._common import PNG_DATA_URL
+from quiclick_server.database import _migrate_user_db, create_user_engine
+from quiclick_server.models import Base
+
+BOOKMARKS = 20_000
+FOLDERS = 200
+REPEAT = 20
+
+_FAVICON = base64.b64decode(PNG_DATA_URL.split(",", 1)[1])
+_NOW = "2025-01-01 00:00:00.000000"
+
+_JOINED_SCHEMA = """
+CREATE TABLE items (
+    id INTEGER PRIMARY KEY NOT NULL, type VARCHAR NOT NULL,
+    title VARCHAR NOT NULL, date_added DATETIME NOT NULL,
+    parent_id INTEGER REFERENCES items(id), position FLOAT NOT NULL DEFAULT 0,
+    last_updated DATETIME NOT NULL, deleted_at DATETIME,
+    position_x INTEGER NOT NULL DEFAULT 0, position_y INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX uq_items_parent_pos
+    ON items (COALESCE(parent_id, 0), position_x, position_y)
+    WHERE deleted_at IS NULL;
+CREATE TABLE bookmarks (
+    id INTEGER NOT NULL PRIMARY KEY REFERENCES items(id), url VARCHAR NOT NULL,
+    favicon BLOB, favicon_mime VARCHAR
+);
+CREATE TABLE folders (id INTEGER NOT NULL PRIMARY KEY REFERENCES items(id));
+PRAGMA user_version = 1;
+"""
+
+_ITEM_COLUMNS = (
+    "id, type, title, date_added, parent_id, position_x, position_y, last_updated"
+)
+
+
+def _rows():
+    folders = [
+        (i, "folder", f"Folder {i}", _NOW, None, i % 8, i // 8, _NOW)
+        for i in range(1, FOLDERS + 1)
+    ]
+    bookmarks = [
+        (
+            i,
+            "bookmark",
+            f"Bookmark {i}",
+            _NOW,
+            1 + i % FOLDERS,
+            (i // FOLDERS) % 8,
+            i // FOLDERS // 8,
+            _NOW,
+        )
+        for i in range(FOLDERS + 1, FOLDERS + BOOKMARKS + 1)
+    ]
+    return folders, bookmarks
+
+
+def _url(bookmark) -> str:
+    return f"https://example.com/{bookmark[0]}"
+
+
+def _insert_joined(conn, folders, bookmarks):
+    placeholders = ", ".join("?" * 8)
+    sql = f"INSERT INTO items ({_ITEM_COLUMNS}) VALUES ({placeholders})"
+    conn.executemany(sql, folders + bookmarks)
+    conn.executemany("INSERT INTO folders (id) VALUES (?)", [(f[0],) for f in folders])
+    conn.executemany(
+        "INSERT INTO bookmarks (id, url, favicon, favicon_mime) VALUES (?, ?, ?, ?)",
+        [(b[0], _url(b), _FAVICON, "image/png") for b in bookmarks],
+    )
+
+
+def _insert_single(conn, folders, bookmarks):
+    placeholders = ", ".join("?" * 8)
+    sql = f"INSERT INTO items ({_ITEM_COLUMNS}) VALUES ({placeholders})"
+    conn.executemany(sql, folders)
+    conn.executemany(
+        f"INSERT INTO items ({_ITEM_COLUMNS}, url, favicon, favicon_mime) "
+        f"VALUES ({placeholders}, ?, ?, ?)",
+        [(*b, _url(b), _FAVICON, "image/png") for b in bookmarks],
+    )
+
+
+_READ_JOINED = (
+    "SELECT i.id, i.title, b.url, b.favicon, i.parent_id, i.position_x, i.position_y "
+    "FROM items i JOIN bookmarks b ON b.id = i.id WHERE i.deleted_at IS NULL "
+    "ORDER BY i.position_y, i.position_x"
+)
+_READ_SINGLE = (
+    "SELECT id, title, url, favicon, parent_id, position_x, position_y FROM items "
+    "WHERE type = 'bookmark' AND deleted_at IS NULL ORDER BY position_y, position_x"
+)
+_READ_FOLDER_JOINED = _READ_JOINED.replace("WHERE", "WHERE i.parent_id = 7 AND")
+_READ_FOLDER_SINGLE = _READ_SINGLE.replace("WHERE", "WHERE parent_id = 7 AND")
+
+
+def _time(func) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    tmp = Path(tempfile.mkdtemp(prefix="quiclick-layout-"))
+    folders, bookmarks = _rows()
+
+    joined_path = tmp / "joined.db"
+    joined = sqlite3.connect(joined_path, isolation_level=None)
+    joined.executescript(_JOINED_SCHEMA)
+
+    single_path = tmp / "single.db"
+    engine = create_user_engine(single_path)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    single = sqlite3.connect(single_path, isolation_level=None)
+
+    def replace(conn, tables, insert):
+        def run():
+            conn.execute("BEGIN")
+            for table in tables:
+                conn.execute(f"DELETE FROM {table}")
+            insert(conn, folders, bookmarks)
+            conn.execute("COMMIT")
+
+        return run
+
+    results = [
+        (
+            "import (delete all + insert)",
+            _time(replace(joined, ("bookmarks", "folders", "items"), _insert_joined)),
+            _time(replace(single, ("items",), _insert_single)),
+        ),
+        (
+            "read all bookmarks",
+            _time(lambda: joined.execute(_READ_JOINED).fetchall()),
+            _time(lambda: single.execute(_READ_SINGLE).fetchall()),
+        ),
+        (
+            "read one folder's bookmarks",
+            _time(lambda: joined.execute(_READ_FOLDER_JOINED).fetchall()),
+            _time(lambda: single.execute(_READ_FOLDER_SINGLE).fetchall()),
+        ),
+    ]
+    assert joined.execute(_READ_JOINED).fetchall() == single.execute(
+        _READ_SINGLE
+    ).fetchall()
+    joined.close()
+    single.close()
+
+    print(f"-- {BOOKMARKS} bookmarks, {FOLDERS} folders")
+    print(f"{'':<32} {'joined ms':>10} {'single ms':>10} {'speedup':>8}")
+    for label, before, after in results:
+        print(f"{label:<32} {before:10.1f} {after:10.1f} {before / after:7.2f}x")
+
+    engine = create_user_engine(joined_path)
+    start = time.perf_counter()
+    _migrate_user_db(engine)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{'migrate joined -> single':<32} {elapsed:10.1f} ms")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Full pulls and JSON exports with a cold vs warm ``sync_cache``.
+
+Cold requests rebuild the body (ORM load, base64 favicons, Pydantic,
+JSON); warm ones are served from the cached body or its gzip variant.
+"""
+
+from benchmarks._common import bookmark_rows, make_client, timed
+from quiclick_server import sync_cache
+
+SUB = "bench-sync-cache"
+BOOKMARKS = 5_000
+REPEAT = 20
+
+
+def _run(client, label: str, path: str, encoding: str):
+    headers = {"Accept-Encoding": encoding}
+    sync_cache.clear()
+    with timed(f"{label} cold"):
+        size = len(client.get(path, headers=headers).content)
+    with timed(f"{label} warm (x{REPEAT})"):
+        for _ in range(REPEAT):
+            client.get(path, headers=headers)
+    print(f"{label + ' body':<40} {size / 1024:10.1f} KiB (decoded)")
+
+
+def main():
+    client = make_client(SUB)
+    rows = bookmark_rows(BOOKMARKS, favicon=True)
+    assert client.post("/bookmarks/bulk", json={"bookmarks": rows}).status_code == 200
+
+    for path in ("/changes", "/export"):
+        _run(client, f"{path} identity", path, "identity")
+        _run(client, f"{path} gzip", path, "gzip")
+
+
+if __name__ == "__main__":
+    main()
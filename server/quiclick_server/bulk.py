@@ -0,0 +1,172 @@
+"""Core-level bulk insertion of bookmarks and folders.
+
+Used by the bulk create and import paths: positions are assigned in one pass
+over scratch occupancy grids, ids are allocated up front, and rows go into
+``items`` with multi-row INSERTs instead of an ORM flush per object.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from quiclick_server import occupancy
+from quiclick_server.leases import next_free_id
+from quiclick_server.models import Item, Position
+from quiclick_server.urls import normalize_url
+
+# Rows per INSERT statement. The full-text index (``search``) is maintained
+# by triggers and FTS5 flushes its pending terms at the end of every
+# statement, so one statement per row (executemany) writes an index segment
+# per row; a few hundred rows per statement amortize that.
+_ROWS_PER_INSERT = 500
+
+# Normalized URLs looked up per query by existing_url_keys
+_KEYS_PER_QUERY = 500
+
+
+def first_unused_id(db: Session) -> int:
+    """Return the first id of an unused range above all items and leases."""
+    start = next_free_id(db)
+    if start is None:
+        start = (db.execute(select(func.max(Item.id))).scalar() or 0) + 1
+    return start
+
+
+def existing_url_keys(db: Session, keys: Iterable[str]) -> dict[str, int]:
+    """Map each of ``keys`` that a live bookmark has to its lowest such id.
+
+    Looked up in ``ix_items_url_key``, ``_KEYS_PER_QUERY`` keys per query;
+    used to skip duplicates when adding many bookmarks.
+    """
+    items = Item.__table__
+    keys = list(keys)
+    found = {}
+    for start in range(0, len(keys), _KEYS_PER_QUERY):
+        rows = db.execute(
+            select(items.c.url_key, func.min(items.c.id))
+            .where(
+                items.c.url_key.in_(keys[start : start + _KEYS_PER_QUERY]),
+                items.c.deleted_at.is_(None),
+            )
+            .group_by(items.c.url_key)
+        )
+        found.update(rows.all())
+    return found
+
+
+class PositionPlanner:
+    """Assign grid cells for many new items, one scratch grid per scope."""
+
+    def __init__(self, db: Session, tiles_per_row: int):
+        self.db = db
+        self.tiles_per_row = tiles_per_row
+        self.grids: dict[int | None, occupancy.ScopeGrid] = {}
+        self.cursors: dict[int | None, tuple[int, int]] = {}
+
+    def _grid(self, parent_id: int | None) -> occupancy.ScopeGrid:
+        grid = self.grids.get(parent_id)
+        if grid is None:
+            grid = self.grids[parent_id] = occupancy.scratch_grid(self.db, parent_id)
+        return grid
+
+    def place(self, parent_id: int | None, requested: Position) -> Position:
+        """Claim ``requested`` or the nearest free cell to it."""
+        grid = self._grid(parent_id)
+        x, y = grid.nearest_free(requested.x, requested.y, self.tiles_per_row)
+        grid.occupy(x, y)
+        return Position(x, y)
+
+    def append(self, parent_id: int | None) -> Position:
+        """Claim the cell after the last occupied one in the scope.
+
+        The first append scans for the last occupied cell; later ones walk on
+        from the previous append, so appending n items is O(n).
+        """
+        grid = self._grid(parent_id)
+        cursor = self.cursors.get(parent_id)
+        if cursor is None:
+            x, y = grid.next_after_last(self.tiles_per_row)
+        else:
+            x, y = self._advance(cursor)
+        while not grid.is_free(x, y):
+            x, y = self._advance((x, y))
+        grid.occupy(x, y)
+        self.cursors[parent_id] = (x, y)
+        return Position(x, y)
+
+    def _advance(self, cell: tuple[int, int]) -> tuple[int, int]:
+        x, y = cell
+        if x + 1 >= self.tiles_per_row:
+            return 0, y + 1
+        return x + 1, y
+
+
+def insert_items(
+    db: Session, bookmarks: list[dict] = (), folders: list[dict] = ()
+) -> None:
+    """Insert prepared rows, ``_ROWS_PER_INSERT`` per statement (not committed).
+
+    Each row needs ``id``, ``title``, ``parent_id``, ``position_x`` and
+    ``position_y``; bookmark rows also ``url``, ``favicon`` and
+    ``favicon_mime``; their ``url_key`` is derived from ``url``.
+    ``date_added`` defaults to now. Folders are inserted first so bookmarks
+    may reference them.
+    """
+    now = datetime.now(timezone.utc)
+    for rows, item_type, columns in (
+        (folders, "folder", ()),
+        (bookmarks, "bookmark", ("url", "favicon", "favicon_mime")),
+    ):
+        if not rows:
+            continue
+        values = [
+            {
+                "id": row["id"],
+                "type": item_type,
+                "title": row["title"],
+                "date_added": row.get("date_added") or now,
+                "parent_id": row["parent_id"],
+                "position_x": row["position_x"],
+                "position_y": row["position_y"],
+                "last_updated": now,
+                **{column: row[column] for column in columns},
+            }
+            for row in rows
+        ]
+        if item_type == "bookmark":
+            for row in values:
+                row["url_key"] = normalize_url(row["url"])
+        # Raw SQL bypasses the Session's DML hook; the cached occupancy
+        # index must still be rebuilt after the commit
+        db.info["occupancy_stale"] = True
+        conn = db.connection()
+        names = tuple(values[0])
+        processors = _bind_processors(conn.dialect, names)
+        for start in range(0, len(values), _ROWS_PER_INSERT):
+            chunk = values[start : start + _ROWS_PER_INSERT]
+            params = []
+            for row in chunk:
+                for name, process in zip(names, processors):
+                    value = row[name]
+                    params.append(value if process is None else process(value))
+            conn.exec_driver_sql(_insert_sql(names, len(chunk)), tuple(params))
+
+
+# SQLAlchemy doesn't cache compiled multi-row INSERTs (it would recompile
+# thousands of bind parameters per statement), so they're built here once
+# and run with the columns' own bind processors.
+@lru_cache(maxsize=16)
+def _insert_sql(names: tuple[str, ...], rows: int) -> str:
+    row = f"({', '.join('?' * len(names))})"
+    return f"INSERT INTO items ({', '.join(names)}) VALUES {', '.join([row] * rows)}"
+
+
+def _bind_processors(dialect, names: tuple[str, ...]) -> list:
+    columns = Item.__table__.c
+    return [
+        columns[name].type.dialect_impl(dialect).bind_processor(dialect)
+        for name in names
+    ]
@@ -0,0 +1,139 @@
+"""Single-flight coalescing of concurrent identical reads.
+
+Every open new-tab page and the extension's background worker may ask for
+the same listing or ``/changes`` of a user at the same instant. Reads are
+keyed by ``(sub, endpoint, validator)``: the first request of a key (the
+leader) computes the response while requests arriving with the same key
+(followers) wait for it and get the same body instead of repeating the
+queries and serialization.
+
+The validator must pin everything the response depends on (the query
+string and conditional headers) together with a stamp of the data taken
+*before* reading it, e.g. ``data_version`` or an ETag derived from it. A
+follower only joins while its stamp equals the leader's, i.e. no write
+committed between the leader's start and the follower's arrival, so the
+shared result is one the follower could have read itself. A ``None``
+validator is never coalesced.
+
+If the leader fails, its followers compute for themselves. Waiting
+followers hold a threadpool worker, as they would while querying.
+
+``computed`` and ``shared`` count, per endpoint, requests that ran the
+computation and requests served by another one's; ``stats()`` reports them
+with the coalescing ratio (``shared / (computed + shared)``); ``GET /metrics``
+serves them.
+"""
+
+import threading
+from collections import Counter
+from collections.abc import Callable
+from typing import TypeVar
+
+from fastapi.responses import Response
+
+from quiclick_server.config import cfg
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """An in-progress computation and, once ``done``, its outcome."""
+
+    __slots__ = ("done", "value", "failed")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.failed = True
+
+
+_lock = threading.Lock()
+_flights: dict[tuple, _Flight] = {}
+computed: Counter[str] = Counter()
+shared: Counter[str] = Counter()
+
+
+def run(sub: str, endpoint: str, validator, compute: Callable[[], T]) -> T:
+    """Return ``compute()``, shared with concurrent calls of the same key.
+
+    The value is handed to every caller as is, so it must not be mutated.
+    """
+    if validator is None or not cfg.coalesce_reads:
+        return compute()
+    key = (sub, endpoint, validator)
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        flight.done.wait()
+        if not flight.failed:
+            with _lock:
+                shared[endpoint] += 1
+            return flight.value
+        with _lock:
+            computed[endpoint] += 1
+        return compute()
+
+    try:
+        flight.value = compute()
+        flight.failed = False
+    finally:
+        with _lock:
+            computed[endpoint] += 1
+            del _flights[key]
+        flight.done.set()
+    return flight.value
+
+
+class _Rendered:
+    """Immutable copy of a rendered response."""
+
+    __slots__ = ("status_code", "raw_headers", "body")
+
+    def __init__(self, response: Response):
+        self.status_code = response.status_code
+        self.raw_headers = tuple(response.raw_headers)
+        self.body = response.body
+
+    def response(self) -> Response:
+        response = Response(self.body, status_code=self.status_code)
+        response.raw_headers = list(self.raw_headers)
+        return response
+
+
+def respond(
+    sub: str, endpoint: str, validator, render: Callable[[], Response]
+) -> Response:
+    """``run`` for routes: each caller gets its own copy of the response.
+
+    Middleware adds to a response's headers while sending it (session
+    cookie, Content-Encoding), so the shared value is a frozen copy of the
+    leader's response taken before it's returned.
+    """
+    if validator is None or not cfg.coalesce_reads:
+        return render()
+    rendered = run(sub, endpoint, validator, lambda: _Rendered(render()))
+    return rendered.response()
+
+
+def stats() -> dict[str, dict]:
+    """Per-endpoint computed/shared counts and coalescing ratio."""
+    with _lock:
+        endpoints = sorted(computed.keys() | shared.keys())
+        return {
+            endpoint: {
+                "computed": computed[endpoint],
+                "shared": shared[endpoint],
+                "ratio": shared[endpoint] / (computed[endpoint] + shared[endpoint]),
+            }
+            for endpoint in endpoints
+        }
+
+
+def clear():
+    """Reset the counters (tests, benchmarks)."""
+    with _lock:
+        computed.clear()
+        shared.clear()
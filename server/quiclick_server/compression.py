@@ -0,0 +1,220 @@
+"""Content-Encoding negotiation and response compression.
+
+``CompressionMiddleware`` compresses JSON, NDJSON and text responses of at
+least ``compression_min_bytes`` with the best encoding the client accepts:
+zstd, brotli or gzip. gzip is always available; zstd needs Python 3.14's
+``compression.zstd`` or the ``zstandard`` package, brotli the ``brotli`` (or
+``brotlicffi``) package. ``compression_level`` applies to every codec,
+clamped to its range. Bodies and stream chunks larger than
+``_OFFLOAD_BYTES`` are compressed in the threadpool so the event loop keeps
+serving other requests. Responses that already carry a Content-Encoding
+(e.g. precompressed ``sync_cache`` bodies) pass through untouched.
+
+A strong ETag of a response it compresses gets the encoding appended
+(``"<tag>-gzip"``), since the encoded bytes are another representation;
+``etags`` accepts both forms in conditional requests.
+"""
+
+import zlib
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from quiclick_server.config import cfg
+
+try:  # Python 3.14+
+    from compression import zstd as _zstd
+except ImportError:
+    try:
+        import zstandard as _zstd
+    except ImportError:
+        _zstd = None
+
+try:
+    import brotli as _brotli
+except ImportError:
+    try:
+        import brotlicffi as _brotli
+    except ImportError:
+        _brotli = None
+
+# Codec level ranges, in order of preference
+_LEVEL_RANGES = {"zstd": (1, 22), "br": (0, 11), "gzip": (1, 9)}
+
+ENCODINGS = tuple(
+    name
+    for name, available in (
+        ("zstd", _zstd is not None),
+        ("br", _brotli is not None),
+        ("gzip", True),
+    )
+    if available
+)
+
+# Compress bodies/chunks larger than this off the event loop
+_OFFLOAD_BYTES = 64 * 1024
+
+_COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Pick the preferred supported encoding the client accepts, if any."""
+    if not accept_encoding:
+        return None
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    for name in ENCODINGS:
+        if accepted.get(name, wildcard) > 0:
+            return name
+    return None
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Tag of the ``encoding``-encoded form of the representation ``etag``."""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def decoded_etag(etag: str) -> str:
+    """Inverse of ``encoded_etag`` (other tags are returned unchanged)."""
+    for encoding in _LEVEL_RANGES:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+def _level(encoding: str, level: int | None) -> int:
+    low, high = _LEVEL_RANGES[encoding]
+    return min(max(cfg.compression_level if level is None else level, low), high)
+
+
+class Compressor:
+    """Incremental encoder: ``compress`` chunks, then ``finish``."""
+
+    def __init__(self, encoding: str, level: int | None = None):
+        level = _level(encoding, level)
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == "br":
+            self._obj = _brotli.Compressor(quality=level)
+        elif encoding == "zstd" and _zstd is not None:
+            if _zstd.__name__ == "zstandard":
+                self._obj = _zstd.ZstdCompressor(level=level).compressobj()
+            else:
+                self._obj = _zstd.ZstdCompressor(level=level)
+        else:
+            raise ValueError(f"Unsupported encoding {encoding!r}")
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def compress(body: bytes, encoding: str, level: int | None = None) -> bytes:
+    """Encode a whole body (``level`` defaults to ``compression_level``)."""
+    compressor = Compressor(encoding, level)
+    return compressor.compress(body) + compressor.finish()
+
+
+async def _run(func, data: bytes) -> bytes:
+    if len(data) > _OFFLOAD_BYTES:
+        return await run_in_threadpool(func, data)
+    return func(data)
+
+
+def _compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    return headers.get("content-type", "").startswith(_COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """Compress eligible responses with the negotiated Content-Encoding."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: dict | None = None
+        compressor: Compressor | None = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                passthrough = message["status"] in (204, 304) or not _compressible(
+                    headers
+                )
+                if _compressible(headers) or "content-encoding" in headers:
+                    MutableHeaders(raw=message["headers"]).add_vary_header(
+                        "Accept-Encoding"
+                    )
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < cfg.compression_min_bytes:
+                    # Small complete body: not worth it
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = Compressor(encoding)
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                if not more_body:
+                    body = await _run(
+                        lambda data: compressor.compress(data) + compressor.finish(),
+                        body,
+                    )
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({**message, "body": body})
+                    return
+                del headers["Content-Length"]
+                await send(start)
+
+            data = await _run(compressor.compress, body)
+            if not more_body:
+                data += compressor.finish()
+            if data or not more_body:
+                await send({**message, "body": data})
+
+        await self.app(scope, receive, compressing_send)
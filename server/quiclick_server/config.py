@@ -9,6 +9,28 @@ class AppConfig:
     server_host: str = environ.var("http://localhost:8000")
     cors_origins: str = environ.var("chrome-extension://fcemlekbbpkogapcgibnfnneknolknib")
     data_dir: str = environ.var("data")
+    # How long stored Idempotency-Key responses are replayed
+    idempotency_ttl_seconds: int = environ.var(86400, converter=int)
+    # Largest request body an Idempotency-Key is accepted on (it is hashed)
+    idempotency_max_body_bytes: int = environ.var(16 * 1024 * 1024, converter=int)
+    # Largest accepted POST /import body
+    import_max_bytes: int = environ.var(256 * 1024 * 1024, converter=int)
+    # Background import/export jobs: worker threads, queued or running jobs
+    # allowed per user, and how long finished jobs and their results are kept
+    job_workers: int = environ.var(2, converter=int)
+    job_max_active_per_user: int = environ.var(2, converter=int)
+    job_result_ttl_seconds: int = environ.var(86400, converter=int)
+    # Response compression: smallest body worth compressing, and the level
+    # for every codec (clamped to gzip 1-9, brotli 0-11, zstd 1-22)
+    compression_min_bytes: int = environ.var(1024, converter=int)
+    compression_level: int = environ.var(6, converter=int)
+    # Memory budget of the full-sync body cache (0 disables it)
+    sync_cache_bytes: int = environ.var(64 * 1024 * 1024, converter=int)
+    # Keyset pagination: rows per page without ?limit=, and the largest limit
+    page_size: int = environ.var(500, converter=int)
+    max_page_size: int = environ.var(5000, converter=int)
+    # Share one computation among concurrent identical reads of a user
+    coalesce_reads: bool = environ.bool_var(True)
 
 
 _cfg = None
@@ -1,11 +1,16 @@
+import os
+import threading
+from collections import OrderedDict
 from collections.abc import Generator
 from pathlib import Path
 
 from fastapi import Depends, Request
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.orm import Session, declarative_base
 
+from quiclick_server import search
 from quiclick_server.config import cfg
+from quiclick_server.urls import normalize_url
 
 Base = declarative_base()
 
@@ -47,11 +52,32 @@ def get_current_user(request: Request) -> str:
 
 # --- Per-user DB dependency ---
 
+# Stored as PRAGMA user_version; bump when _migrate_user_db gains a step.
+# Snapshot restores reject databases from a newer schema.
+USER_SCHEMA_VERSION = 5
+
+
+def get_schema_version(engine) -> int:
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def _set_schema_version(engine):
+    if get_schema_version(engine) != USER_SCHEMA_VERSION:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {USER_SCHEMA_VERSION}")
+
 
 def _migrate_user_db(engine):
     """Add new columns to existing user databases if missing."""
     from sqlalchemy import inspect, text
 
+    from quiclick_server.models import Base as UserBase
+    from quiclick_server.models import Item
+
+    # Create tables added after the DB was first created (e.g. id_leases)
+    UserBase.metadata.create_all(engine)
+
     inspector = inspect(engine)
 
     # Migrate items table
@@ -188,6 +214,37 @@ def _migrate_user_db(engine):
                     )
                 )
 
+    # Flatten the joined-table layout (items + bookmarks + folders) into the
+    # single items table, dropping the legacy float position column
+    if inspector.has_table("bookmarks"):
+        _flatten_items(engine)
+
+    # Normalized URLs of bookmarks written before url_key existed
+    columns = {col["name"] for col in inspect(engine).get_columns("items")}
+    with engine.begin() as conn:
+        if "url_key" not in columns:
+            conn.exec_driver_sql("ALTER TABLE items ADD COLUMN url_key VARCHAR")
+        _fill_url_keys(conn)
+
+    # Indexes added to the model after the items table was created
+    with engine.begin() as conn:
+        existing = set(
+            conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type='index'")
+            ).scalars()
+        )
+        for index in Item.__table__.indexes:
+            if index.name not in existing:
+                index.create(conn)
+
+    # Full-text index of titles and URLs, built from the existing items
+    with engine.begin() as conn:
+        has_search = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'items_fts'")
+        ).scalar()
+        if not has_search:
+            search.create_index(conn)
+
     # Migrate settings table
     if inspector.has_table("settings"):
         existing = {col["name"] for col in inspector.get_columns("settings")}
@@ -200,24 +257,174 @@ def _migrate_user_db(engine):
                     )
                 )
 
+    _set_schema_version(engine)
+
+
+def _flatten_items(engine):
+    """Rebuild ``items`` with the bookmark columns, in one transaction."""
+    from quiclick_server.models import Item
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX IF EXISTS uq_items_parent_pos")
+        conn.exec_driver_sql("ALTER TABLE items RENAME TO items_legacy")
+        Item.__table__.create(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO items "
+            "(id, type, title, date_added, parent_id, position_x, position_y,"
+            " last_updated, deleted_at, url, favicon, favicon_mime) "
+            "SELECT i.id, i.type, i.title, i.date_added, i.parent_id,"
+            " i.position_x, i.position_y, i.last_updated, i.deleted_at,"
+            " b.url, b.favicon, b.favicon_mime "
+            "FROM items_legacy AS i LEFT JOIN bookmarks AS b ON b.id = i.id"
+        )
+        for table in ("bookmarks", "folders", "items_legacy"):
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+
+
+def _fill_url_keys(conn):
+    """Set ``url_key`` of every bookmark that has a URL but no key, if any."""
+    rows = conn.exec_driver_sql(
+        "SELECT id, url FROM items WHERE url IS NOT NULL AND url_key IS NULL"
+    ).fetchall()
+    if rows:
+        conn.exec_driver_sql(
+            "UPDATE items SET url_key = ? WHERE id = ?",
+            [(normalize_url(url), item_id) for item_id, url in rows],
+        )
+
+
+def user_db_path(sub: str) -> Path:
+    """Path of the personal SQLite database for a user."""
+    return Path(cfg.data_dir) / f"{sub}.db"
+
+
+def data_version(db_path: Path) -> tuple | None:
+    """Stamp that changes with every committed write to a user database.
+
+    Combines SQLite's file change counter (header bytes 24-27, bumped by
+    each write transaction in the default rollback-journal mode) with the
+    file's inode, size and mtime, so writes from any connection or process
+    and whole-file swaps (snapshot restores) all change it. ``None`` if the
+    file doesn't exist. Take it before reading the data it should describe.
+    """
+    try:
+        with open(db_path, "rb") as f:
+            header = f.read(28)
+            st = os.fstat(f.fileno())
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns, header[24:28]
 
-def get_db(sub: str = Depends(get_current_user)) -> Generator[Session, None, None]:
-    """Yield a SQLAlchemy Session for the authenticated user's personal DB."""
-    from quiclick_server.models import Base as UserBase
 
-    db_path = Path(cfg.data_dir) / f"{sub}.db"
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    first_time = not db_path.exists()
+def _inode(db_path: Path) -> int | None:
+    try:
+        return os.stat(db_path).st_ino
+    except OSError:
+        return None
+
+
+def create_user_engine(db_path: Path):
+    """Engine for a per-user SQLite database.
+
+    pysqlite's own transaction handling would defer BEGIN until the first
+    DML statement, so SELECTs at the start of a Session would run outside
+    any transaction. Let SQLAlchemy own transaction boundaries and emit
+    BEGIN ourselves.
+
+    Pooled connections opened before the file was replaced (snapshot
+    restores, from any process) are reconnected on checkout.
+    """
     engine = create_engine(
         f"sqlite:///{db_path}",
         connect_args={"check_same_thread": False},
     )
-    try:
+
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        connection_record.info["inode"] = _inode(db_path)
+
+    @event.listens_for(engine, "checkout")
+    def _check_replaced(dbapi_connection, connection_record, connection_proxy):
+        if connection_record.info.get("inode") != _inode(db_path):
+            raise exc.DisconnectionError("Database file was replaced")
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+# Engines of recently used user databases. Reusing them across requests
+# keeps their connection pools and compiled statement caches warm and runs
+# migrations once per process instead of once per request. Setting one up
+# (creating or migrating the file) holds only that database's lock, so a
+# long migration doesn't hold up other users.
+_MAX_USER_ENGINES = 128
+_user_engines: OrderedDict[Path, object] = OrderedDict()
+_user_engines_lock = threading.Lock()
+_setup_locks: dict[Path, threading.Lock] = {}
+
+
+def _cached_engine(db_path: Path):
+    # Called with _user_engines_lock held
+    engine = _user_engines.get(db_path)
+    if engine is not None and db_path.exists():
+        _user_engines.move_to_end(db_path)
+        return engine
+    return None
+
+
+def user_engine(db_path: Path):
+    """Shared engine of a user database, created and migrated on first use."""
+    from quiclick_server.models import Base as UserBase
+
+    with _user_engines_lock:
+        engine = _cached_engine(db_path)
+        if engine is not None:
+            return engine
+        setup_lock = _setup_locks.setdefault(db_path, threading.Lock())
+
+    with setup_lock:
+        with _user_engines_lock:
+            # Set up by the request this one waited for
+            engine = _cached_engine(db_path)
+            if engine is not None:
+                return engine
+            engine = _user_engines.get(db_path)
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        first_time = not db_path.exists()
+        if engine is None:
+            engine = create_user_engine(db_path)
         if first_time:
             UserBase.metadata.create_all(engine)
+            with engine.begin() as conn:
+                search.create_index(conn)
+            _set_schema_version(engine)
         else:
             _migrate_user_db(engine)
-        with Session(engine) as session:
-            yield session
-    finally:
-        engine.dispose()
+
+        with _user_engines_lock:
+            _user_engines[db_path] = engine
+            _user_engines.move_to_end(db_path)
+            _setup_locks.pop(db_path, None)
+            while len(_user_engines) > _MAX_USER_ENGINES:
+                _, evicted = _user_engines.popitem(last=False)
+                evicted.dispose()
+        return engine
+
+
+def dispose_user_engines():
+    """Close every shared user engine (tests, shutdown)."""
+    with _user_engines_lock:
+        for engine in _user_engines.values():
+            engine.dispose()
+        _user_engines.clear()
+
+
+def get_db(sub: str = Depends(get_current_user)) -> Generator[Session, None, None]:
+    """Yield a SQLAlchemy Session for the authenticated user's personal DB."""
+    with Session(user_engine(user_db_path(sub))) as session:
+        yield session
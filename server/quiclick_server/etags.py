@@ -0,0 +1,105 @@
+"""Entity tags and conditional requests.
+
+Listings (``GET /bookmarks``, ``GET /folders``) are tagged with the user
+database's ``data_version`` and the query string, so any committed write
+changes them. A bookmark is tagged with its ``last_updated``; a folder
+(``GET /folders/{id}``, which embeds its children) with its own
+``last_updated``, its children's newest one and their count. Tags are
+strong and describe the uncompressed representation; compressed responses
+carry them with the encoding appended (``compression.encoded_etag``), and
+conditional requests accept either form.
+
+``If-None-Match`` is checked before a listing is queried or serialized.
+``If-Match`` on PUT/PATCH is compared with the item's current tag inside
+the write transaction, so a stale tag gets a 412 instead of overwriting a
+concurrent change.
+"""
+
+import hashlib
+from collections.abc import Callable
+from pathlib import Path
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from quiclick_server import queries
+from quiclick_server.compression import decoded_etag
+from quiclick_server.database import data_version
+
+
+def _tag(*parts) -> str:
+    return f'"{hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()}"'
+
+
+def listing_etag(db: Session, request: Request) -> str | None:
+    """Tag of a listing response; take it before reading the data."""
+    version = data_version(Path(db.get_bind().url.database))
+    if version is None:
+        return None
+    return _tag(version, request.url.path, request.url.query)
+
+
+def bookmark_etag(db: Session, bookmark_id: int) -> str | None:
+    """Current tag of a live bookmark (``None`` if there is none)."""
+    row = db.connection().execute(queries.BOOKMARK_VERSION, {"id": bookmark_id})
+    ts = row.scalar()
+    return None if ts is None else _tag("bookmark", bookmark_id, ts)
+
+
+def folder_etag(
+    db: Session, folder_id: int, fields: tuple[str, ...] | None = None
+) -> str | None:
+    """Current tag of a live folder and its children (``None`` if no folder).
+
+    ``fields`` (a ``?fields=`` selection of the children) tags each
+    projection separately; If-Match compares against the full one.
+    """
+    row = db.connection().execute(queries.FOLDER_VERSION, {"id": folder_id}).first()
+    return None if row is None else _tag("folder", folder_id, fields, *row)
+
+
+def _match(header: str, etag: str, weak: bool) -> str | None:
+    """The tag in ``header`` that matches ``etag``, as sent, if any."""
+    if header.strip() == "*":
+        return etag
+    for sent in header.split(","):
+        sent = sent.strip()
+        tag = sent
+        if tag.startswith("W/"):
+            if not weak:
+                continue
+            tag = tag[2:]
+        if decoded_etag(tag) == etag:
+            return sent
+    return None
+
+
+def not_modified(request: Request, etag: str | None) -> Response | None:
+    """A 304 response if ``If-None-Match`` matches ``etag``.
+
+    It repeats the matching tag as the client sent it, which is the one of
+    the encoding the client got the representation in.
+    """
+    header = request.headers.get("If-None-Match")
+    if etag is None or header is None:
+        return None
+    matched = _match(header, etag, weak=True)
+    if matched is None:
+        return None
+    return Response(status_code=304, headers={"ETag": matched})
+
+
+def check_if_match(request: Request, current: Callable[[], str | None]):
+    """Raise 412 unless ``If-Match`` (if sent) matches the ``current()`` tag.
+
+    A missing item (``None`` tag) is left to the route's 404.
+    """
+    header = request.headers.get("If-Match")
+    if header is None:
+        return
+    etag = current()
+    if etag is not None and _match(header, etag, weak=False) is None:
+        raise HTTPException(
+            status_code=412, detail="Precondition failed: the item has changed"
+        )
@@ -0,0 +1,175 @@
+"""Import of Netscape bookmark files (the HTML every browser exports).
+
+The file is fed to an ``HTMLParser`` chunk by chunk. Each ``<H3>`` becomes a
+``Folder`` and the ``<DL>`` that follows it holds its children, so nesting
+maps directly onto ``parent_id``. Items get their id as soon as their tag is
+parsed; rows are buffered in file order and, per batch, given their grid cell
+(appended after existing items of the same scope) and inserted with
+``bulk.insert_items``; the caller commits once at the end. Bookmarks whose
+normalized URL a live bookmark or an earlier entry of the file already has
+can be skipped before they take a cell, looked up batch by batch so memory
+stays bounded by the batch size.
+"""
+
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+
+from sqlalchemy.orm import Session
+
+from quiclick_server.bulk import (
+    PositionPlanner,
+    existing_url_keys,
+    first_unused_id,
+    insert_items,
+)
+from quiclick_server.schemas import validate_favicon_data_url
+from quiclick_server.serialization import parse_favicon_data_url
+from quiclick_server.urls import normalize_url
+
+# Rows inserted per executemany
+HTML_IMPORT_BATCH = 1000
+
+# Browser-internal entries that can't be opened from a tile
+_SKIPPED_SCHEMES = ("javascript:", "place:", "chrome:", "about:")
+
+
+def _timestamp(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromtimestamp(int(value), timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def _favicon(data_url: str | None) -> tuple[bytes | None, str | None]:
+    """Decode an ``ICON`` data URL; anything the API wouldn't accept is dropped."""
+    if not data_url:
+        return None, None
+    try:
+        validate_favicon_data_url(data_url)
+    except ValueError:
+        return None, None
+    return parse_favicon_data_url(data_url)
+
+
+class NetscapeBookmarkImporter(HTMLParser):
+    """Turn a Netscape bookmark file into folder and bookmark rows."""
+
+    def __init__(
+        self, db: Session, tiles_per_row: int, skip_duplicates: bool = False
+    ):
+        super().__init__(convert_charrefs=True)
+        self.db = db
+        self.planner = PositionPlanner(db, tiles_per_row)
+        self.next_id = first_unused_id(db)
+        # Rows waiting for the next flush, in file order; bookmarks have a url
+        self.rows: list[dict] = []
+        self.bookmark_count = 0
+        self.folder_count = 0
+        self.skipped = 0
+        self.skip_duplicates = skip_duplicates
+        # Folder ids of the open <DL> lists; None is the root
+        self.parents: list[int | None] = [None]
+        # Folder from the last </H3>, waiting for its <DL>
+        self.pending_folder: int | None = None
+        self.tag: str | None = None
+        self.attrs: dict[str, str | None] = {}
+        self.text: list[str] = []
+
+    # --- HTMLParser callbacks ---
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "dl":
+            parent = self.pending_folder
+            self.parents.append(parent if parent is not None else self.parents[-1])
+            self.pending_folder = None
+        elif tag in ("a", "h3"):
+            self.tag = tag
+            self.attrs = dict(attrs)
+            self.text = []
+
+    def handle_endtag(self, tag):
+        if tag == "dl":
+            if len(self.parents) > 1:
+                self.parents.pop()
+        elif tag == self.tag:
+            title = " ".join("".join(self.text).split())
+            if tag == "h3":
+                self.pending_folder = self._add_folder(title)
+            else:
+                self._add_bookmark(title)
+            self.tag = None
+
+    def handle_data(self, data):
+        if self.tag is not None:
+            self.text.append(data)
+
+    # --- Rows ---
+
+    def _item_row(self, title: str) -> dict:
+        row = {
+            "id": self.next_id,
+            "title": title,
+            "date_added": _timestamp(self.attrs.get("add_date")),
+            "parent_id": self.parents[-1],
+        }
+        self.next_id += 1
+        return row
+
+    def _add_folder(self, title: str) -> int:
+        row = self._item_row(title or "Untitled")
+        self.rows.append(row)
+        self.folder_count += 1
+        self._maybe_flush()
+        return row["id"]
+
+    def _add_bookmark(self, title: str):
+        url = (self.attrs.get("href") or "").strip()
+        if not url or url.lower().startswith(_SKIPPED_SCHEMES):
+            return
+        row = self._item_row(title or url)
+        row["url"] = url
+        row["favicon"], row["favicon_mime"] = _favicon(self.attrs.get("icon"))
+        self.rows.append(row)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self.rows) >= HTML_IMPORT_BATCH:
+            self.flush()
+
+    def flush(self):
+        """Place and insert the buffered rows (not committed).
+
+        Rows of earlier batches are already in the session's transaction, so
+        the duplicate lookup sees them like any other live bookmark.
+        """
+        rows = self.rows
+        self.rows = []
+        if self.skip_duplicates:
+            keys = {
+                row["id"]: normalize_url(row["url"]) for row in rows if "url" in row
+            }
+            seen = set(existing_url_keys(self.db, set(keys.values())))
+        bookmarks = []
+        folders = []
+        for row in rows:
+            if "url" in row:
+                if self.skip_duplicates:
+                    key = keys[row["id"]]
+                    if key in seen:
+                        self.skipped += 1
+                        continue
+                    seen.add(key)
+                bookmarks.append(row)
+            else:
+                folders.append(row)
+            position = self.planner.append(row["parent_id"])
+            row["position_x"] = position.x
+            row["position_y"] = position.y
+        self.bookmark_count += len(bookmarks)
+        insert_items(self.db, bookmarks=bookmarks, folders=folders)
+
+    def close(self):
+        super().close()
+        self.flush()
@@ -0,0 +1,182 @@
+"""Idempotency-Key support for mutating routes.
+
+A POST/PUT/PATCH/DELETE sent with an ``Idempotency-Key`` header is executed
+once per user and key; retries replay the stored response without running
+the route again. Records live in the user's own DB and expire after
+``idempotency_ttl_seconds``. The request hash covers the body, which has to
+be read before the route runs, so keys are only accepted on bodies of known
+size up to ``idempotency_max_body_bytes``; large streamed uploads such as
+``POST /import`` are rejected with 413 instead of being buffered.
+
+Two halves cooperate through a holder placed in the ASGI scope:
+
+- ``check_idempotency_key`` (a router dependency) hashes the request, replays
+  a finished record or claims the key with a pending record;
+- ``IdempotencyMiddleware`` captures the response of a claimed request and
+  stores it, or releases the claim if the route failed with a 5xx.
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from quiclick_server.config import cfg
+from quiclick_server.database import (
+    get_current_user,
+    get_db,
+    user_db_path,
+    user_engine,
+)
+from quiclick_server.models import IdempotencyRecord
+
+HEADER = "Idempotency-Key"
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# A pending claim older than this is treated as abandoned (crashed worker)
+PENDING_TIMEOUT = timedelta(minutes=1)
+
+_SCOPE_KEY = "quiclick.idempotency"
+
+
+class IdempotentReplay(Exception):
+    """Raised by the dependency to short-circuit with a stored response."""
+
+    def __init__(self, record: IdempotencyRecord):
+        self.status_code = record.status_code
+        self.media_type = record.media_type
+        self.body = record.body or b""
+
+
+async def replay_handler(request: Request, exc: IdempotentReplay) -> Response:
+    return Response(
+        content=exc.body,
+        status_code=exc.status_code,
+        media_type=exc.media_type,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+def _claim(db: Session, key: str, request_hash: str) -> None:
+    """Replay, reject or claim ``key``. Commits the pending record."""
+    now = datetime.now(timezone.utc)
+    ttl = timedelta(seconds=cfg.idempotency_ttl_seconds)
+    db.execute(
+        delete(IdempotencyRecord).where(IdempotencyRecord.created_at < now - ttl)
+    )
+
+    record = db.get(IdempotencyRecord, key)
+    if record is not None:
+        if record.request_hash != request_hash:
+            raise HTTPException(
+                status_code=422,
+                detail=f"{HEADER} was already used for a different request",
+            )
+        if record.status_code is not None:
+            raise IdempotentReplay(record)
+        if now - _as_utc(record.created_at) < PENDING_TIMEOUT:
+            raise HTTPException(
+                status_code=409,
+                detail=f"A request with this {HEADER} is still in progress",
+            )
+        record.created_at = now
+    else:
+        db.add(IdempotencyRecord(key=key, request_hash=request_hash, created_at=now))
+    db.commit()
+
+
+async def check_idempotency_key(
+    request: Request,
+    db: Session = Depends(get_db),
+    sub: str = Depends(get_current_user),
+):
+    """Router dependency: replay or claim the request's Idempotency-Key."""
+    key = request.headers.get(HEADER)
+    holder = request.scope.get(_SCOPE_KEY)
+    if not key or request.method not in MUTATING_METHODS or holder is None:
+        return
+
+    length = request.headers.get("Content-Length")
+    try:
+        length = int(length) if length is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if "Transfer-Encoding" in request.headers or (
+        length is not None and length > cfg.idempotency_max_body_bytes
+    ):
+        raise HTTPException(
+            status_code=413,
+            detail=f"{HEADER} is only accepted on bodies of known size up to "
+            f"{cfg.idempotency_max_body_bytes} bytes",
+        )
+
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url.path}?{request.url.query}\n".encode())
+    digest.update(await request.body())
+    await run_in_threadpool(_claim, db, key, digest.hexdigest())
+    holder["db_path"] = user_db_path(sub)
+    holder["key"] = key
+
+
+def _finish(holder: dict, status_code: int | None, media_type, body: bytes):
+    """Store the response for a claimed key, or drop the claim on failure."""
+    with Session(user_engine(holder["db_path"])) as session:
+        record = session.get(IdempotencyRecord, holder["key"])
+        if record is None:
+            return
+        if status_code is None or status_code >= 500:
+            session.delete(record)
+        else:
+            record.status_code = status_code
+            record.media_type = media_type
+            record.body = body
+        session.commit()
+
+
+class IdempotencyMiddleware:
+    """Capture responses of requests whose Idempotency-Key was claimed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        holder: dict = {}
+        scope[_SCOPE_KEY] = holder
+        response = {"status": None, "media_type": None, "body": []}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        response["media_type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except Exception:
+            if holder:
+                await run_in_threadpool(_finish, holder, None, None, b"")
+            raise
+        if holder:
+            await run_in_threadpool(
+                _finish,
+                holder,
+                response["status"],
+                response["media_type"],
+                b"".join(response["body"]),
+            )
@@ -0,0 +1,668 @@
+"""Streaming import of export data with bounded memory.
+
+Import bodies are parsed incrementally: NDJSON is split into lines, and JSON
+array and MessagePack bodies are decoded one element at a time, all yielding
+the typed records produced by the NDJSON export. Records are validated and
+written in batches of ``IMPORT_BATCH`` with Core ``executemany``
+(``bulk.insert_items``), so memory is bounded by the batch size rather than
+by the size of the export.
+A legacy ``ExportData`` object body can't be split before it's complete; it
+is read whole (still capped by ``import_max_bytes``) and fed through the same
+writer.
+
+An import replaces all existing data (``ImportWriter``) or merges into it,
+writing only the differences (``MergeWriter``). Either way it runs in one
+transaction: any bad record rolls back everything. Either writer can leave
+out bookmarks whose normalized URL an earlier record of the import already
+has; since the result of both is the imported data, that leaves no
+duplicates.
+"""
+
+import base64
+import binascii
+import codecs
+import hashlib
+import json
+from collections.abc import AsyncIterator, Iterable
+from datetime import datetime, timedelta, timezone
+
+import msgpack
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from quiclick_server.bulk import insert_items
+from quiclick_server.models import Item, Settings
+from quiclick_server.occupancy import Cell
+from quiclick_server.schemas import (
+    ExportBookmarkRecord,
+    ExportData,
+    ExportFolderRecord,
+    ExportHeaderRecord,
+    ExportRecord,
+    ExportSettingsRecord,
+)
+from quiclick_server.serialization import parse_favicon_data_url
+from quiclick_server.urls import normalize_url
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+SUPPORTED_VERSIONS = {1}
+
+# Records validated and inserted per executemany
+IMPORT_BATCH = 1000
+
+_records_adapter = TypeAdapter(list[ExportRecord])
+
+
+async def limit_body(
+    chunks: AsyncIterator[bytes], max_bytes: int
+) -> AsyncIterator[bytes]:
+    """Pass body chunks through, failing with 413 once ``max_bytes`` is exceeded."""
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Import body exceeds the {max_bytes} byte limit",
+            )
+        yield chunk
+
+
+def _bad_json(number: int, error: ValueError) -> HTTPException:
+    return HTTPException(
+        status_code=422, detail=f"Record {number}: invalid JSON ({error})"
+    )
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    """Yield one decoded object per non-empty NDJSON line."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        if b"\n" not in chunk:
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                number += 1
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise _bad_json(number, e)
+    if buffer.strip():
+        try:
+            yield json.loads(buffer)
+        except ValueError as e:
+            raise _bad_json(number + 1, e)
+
+
+async def iter_json_array(
+    chunks: AsyncIterator[bytes], prefix: bytes = b""
+) -> AsyncIterator[dict]:
+    """Yield the elements of a top-level JSON array of objects as they arrive.
+
+    ``prefix`` is the start of the body, already read from ``chunks``.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = utf8.decode(prefix)
+    pos = 0
+    started = False
+    number = 0
+    done = False
+
+    def skip(text: str, i: int) -> int:
+        while i < len(text) and text[i] in " \t\r\n":
+            i += 1
+        return i
+
+    async def more() -> bool:
+        nonlocal buffer, pos
+        async for chunk in chunks:
+            buffer = buffer[pos:] + utf8.decode(chunk)
+            pos = 0
+            return True
+        buffer = buffer[pos:] + utf8.decode(b"", final=True)
+        pos = 0
+        return False
+
+    eof = False
+    while not done:
+        pos = skip(buffer, pos)
+        if pos >= len(buffer):
+            if eof:
+                raise HTTPException(status_code=422, detail="Truncated JSON array")
+            eof = not await more()
+            continue
+        char = buffer[pos]
+        if not started:
+            if char != "[":
+                raise HTTPException(status_code=422, detail="Expected a JSON array")
+            started = True
+            pos += 1
+            continue
+        if char == "]":
+            done = True
+            pos += 1
+            continue
+        if char == "," and number:
+            pos += 1
+            continue
+        if char != "{":
+            raise HTTPException(
+                status_code=422,
+                detail=f"Record {number + 1}: expected a JSON object",
+            )
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except ValueError as e:
+            # Most likely the object continues in the next chunk
+            if eof:
+                raise _bad_json(number + 1, e)
+            eof = not await more()
+            continue
+        number += 1
+        pos = end
+        yield record
+
+    async for chunk in chunks:
+        buffer += utf8.decode(chunk)
+    if buffer[pos:].strip():
+        raise HTTPException(
+            status_code=422, detail="Unexpected data after the JSON array"
+        )
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(ts: datetime) -> int:
+    """Microseconds since the epoch; naive datetimes are taken as UTC."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - _EPOCH) // _MICROSECOND
+
+
+def from_micros(value: int) -> datetime:
+    return _EPOCH + value * _MICROSECOND
+
+
+def _record_from_msgpack(kind: str, obj) -> dict:
+    if not isinstance(obj, dict):
+        raise HTTPException(status_code=422, detail=f"Expected a {kind} map")
+    record = {"type": kind, **obj}
+    if isinstance(record.get("date_added"), int):
+        record["date_added"] = from_micros(record["date_added"])
+    if kind == "bookmark":
+        favicon = record.get("favicon")
+        mime = record.pop("favicon_mime", None)
+        if isinstance(favicon, bytes):
+            # The writer takes the same data URLs as the JSON formats
+            record["favicon"] = (
+                f"data:{mime};base64,{base64.b64encode(favicon).decode()}"
+                if mime
+                else None
+            )
+    return record
+
+
+async def iter_msgpack(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    """Yield export records from a MessagePack ``ExportData`` map as it arrives.
+
+    Walks the top-level map and the ``folders``/``bookmarks`` arrays with
+    header reads, so only one element has to be buffered at a time.
+    """
+    unpacker = msgpack.Unpacker(raw=False)
+
+    async def read(operation):
+        while True:
+            try:
+                return operation()
+            except msgpack.OutOfData:
+                pass
+            except (ValueError, msgpack.UnpackException) as e:
+                raise HTTPException(
+                    status_code=422, detail=f"Invalid MessagePack body ({e})"
+                )
+            chunk = await anext(chunks, None)
+            if chunk is None:
+                raise HTTPException(
+                    status_code=422, detail="Truncated MessagePack body"
+                )
+            unpacker.feed(chunk)
+
+    try:
+        size = await read(unpacker.read_map_header)
+    except HTTPException:
+        raise HTTPException(status_code=422, detail="Expected a MessagePack map")
+    header = {"type": "header"}
+    for _ in range(size):
+        key = await read(unpacker.unpack)
+        if key in ("folders", "bookmarks"):
+            if header is not None:
+                yield header
+                header = None
+            try:
+                count = await read(unpacker.read_array_header)
+            except HTTPException:
+                raise HTTPException(
+                    status_code=422, detail=f"Expected an array of {key}"
+                )
+            for _ in range(count):
+                yield _record_from_msgpack(key[:-1], await read(unpacker.unpack))
+        elif key == "settings":
+            settings = await read(unpacker.unpack)
+            if settings is not None:
+                yield _record_from_msgpack("settings", settings)
+        elif key == "version" and header is not None:
+            header["version"] = await read(unpacker.unpack)
+        else:
+            await read(unpacker.skip)
+    if header is not None:
+        yield header
+
+
+def _records_from_export(data: ExportData) -> Iterable[dict]:
+    yield {"type": "header", "version": data.version}
+    if data.settings is not None:
+        yield {"type": "settings", **data.settings.model_dump()}
+    for f in data.folders:
+        yield {"type": "folder", **f.model_dump()}
+    for bm in data.bookmarks:
+        yield {"type": "bookmark", **bm.model_dump()}
+
+
+async def iter_records(
+    chunks: AsyncIterator[bytes], content_type: str
+) -> AsyncIterator[dict]:
+    """Yield the export records of an import body.
+
+    NDJSON and MessagePack are picked by ``content_type``; a JSON body is a
+    record array or a legacy ``ExportData`` object, told apart by its first
+    non-blank byte.
+    """
+    if content_type.startswith(NDJSON_MEDIA_TYPE):
+        async for record in iter_ndjson(chunks):
+            yield record
+        return
+    if content_type.startswith(_MSGPACK_MEDIA_TYPES):
+        async for record in iter_msgpack(chunks):
+            yield record
+        return
+
+    # Peek at the first non-blank byte to tell an array from an object
+    head = b""
+    async for chunk in chunks:
+        head += chunk
+        if head.strip():
+            break
+    if head.lstrip().startswith(b"["):
+        async for record in iter_json_array(chunks, head):
+            yield record
+        return
+
+    body = head + b"".join([chunk async for chunk in chunks])
+    try:
+        data = ExportData.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422, detail=e.errors(include_url=False, include_context=False)
+        )
+    for record in _records_from_export(data):
+        yield record
+
+
+async def batched(
+    records: AsyncIterator[dict], size: int
+) -> AsyncIterator[list[dict]]:
+    batch = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ImportWriter:
+    """Replace a user's data with validated batches of export records."""
+
+    def __init__(self, db: Session, skip_duplicates: bool = False):
+        self.db = db
+        self.records = 0
+        self.bookmarks = 0
+        self.folders = 0
+        self.skipped = 0
+        self.settings: ExportSettingsRecord | None = None
+        # Normalized URLs of the bookmarks written so far, if skipping
+        self.url_keys: set[str] | None = set() if skip_duplicates else None
+
+    def begin(self):
+        """Delete all existing data (not committed)."""
+        self.db.execute(delete(Item.__table__))
+        self.db.execute(delete(Settings.__table__))
+
+    def write(self, batch: list[dict]):
+        """Validate one batch of records and insert its items."""
+        try:
+            records = _records_adapter.validate_python(batch)
+        except ValidationError as e:
+            error = e.errors(include_url=False)[0]
+            index, *loc = error["loc"]
+            raise HTTPException(
+                status_code=422,
+                detail=f"Record {self.records + index + 1}: "
+                f"{'.'.join(str(part) for part in loc)}: {error['msg']}",
+            )
+
+        bookmarks, folders = [], []
+        for index, record in enumerate(records, self.records + 1):
+            if isinstance(record, ExportHeaderRecord):
+                if record.version not in SUPPORTED_VERSIONS:
+                    raise HTTPException(
+                        status_code=422,
+                        detail=f"Unsupported export version {record.version}",
+                    )
+                if record.since is not None:
+                    raise HTTPException(
+                        status_code=422,
+                        detail="Incremental exports can't be imported; replay "
+                        "them onto their base export first "
+                        "(python -m quiclick_server.replay)",
+                    )
+            elif isinstance(record, ExportSettingsRecord):
+                self.settings = record
+            elif isinstance(record, ExportFolderRecord):
+                folders.append(self._item_row(record))
+            elif isinstance(record, ExportBookmarkRecord):
+                if self.url_keys is not None:
+                    key = normalize_url(record.url)
+                    if key in self.url_keys:
+                        self.skipped += 1
+                        continue
+                    self.url_keys.add(key)
+                row = self._item_row(record)
+                row["url"] = record.url
+                row["favicon"], row["favicon_mime"] = self._favicon(
+                    index, record.favicon
+                )
+                bookmarks.append(row)
+        self.records += len(batch)
+
+        self._write_items(bookmarks, folders)
+        self.bookmarks += len(bookmarks)
+        self.folders += len(folders)
+
+    def _write_items(self, bookmarks: list[dict], folders: list[dict]):
+        insert_items(self.db, bookmarks=bookmarks, folders=folders)
+
+    @staticmethod
+    def _item_row(record: ExportFolderRecord | ExportBookmarkRecord) -> dict:
+        return {
+            "id": record.id,
+            "title": record.title,
+            "date_added": record.date_added,
+            "parent_id": record.parent_id,
+            "position_x": record.position.x,
+            "position_y": record.position.y,
+        }
+
+    @staticmethod
+    def _favicon(index: int, data_url: str | None) -> tuple[bytes | None, str | None]:
+        if not data_url:
+            return None, None
+        try:
+            return parse_favicon_data_url(data_url)
+        except (ValueError, IndexError, binascii.Error):
+            raise HTTPException(
+                status_code=422, detail=f"Record {index}: invalid favicon data URL"
+            )
+
+    def finish(self):
+        """Write the settings record, if any, and commit."""
+        if self.settings is not None:
+            self.db.execute(
+                insert(Settings.__table__),
+                {
+                    "id": 1,
+                    **self.settings.model_dump(exclude={"type"}),
+                },
+            )
+        self.db.commit()
+
+
+def _naive(ts: datetime) -> datetime:
+    # DateTime columns store wall time without an offset
+    return ts.replace(tzinfo=None)
+
+
+def _digest(row: dict, item_type: str) -> bytes:
+    """Content hash of an item row, over every exported field but ``id``."""
+    h = hashlib.blake2b(digest_size=16)
+    for value in (
+        item_type,
+        row["title"],
+        row.get("url"),
+        row.get("favicon_mime"),
+        row["parent_id"],
+        row["position_x"],
+        row["position_y"],
+        _naive(row["date_added"]).isoformat(),
+    ):
+        h.update(repr(value).encode())
+        h.update(b"\0")
+    h.update(row.get("favicon") or b"")
+    return h.digest()
+
+
+class _Current:
+    __slots__ = ("type", "digest", "live", "cell")
+
+    def __init__(self, type: str, digest: bytes, live: bool, cell: Cell):
+        self.type = type
+        self.digest = digest
+        self.live = live
+        self.cell = cell
+
+
+class MergeWriter(ImportWriter):
+    """Merge a snapshot into a user's data, writing only what differs.
+
+    Current items are reduced to a content hash per id up front. Incoming
+    items are inserted when their id is new, updated when the hash differs
+    (or the item was soft-deleted) and left alone otherwise; live items
+    missing from the snapshot are soft-deleted at the end. Only written rows
+    get a new ``last_updated``, so clients pulling ``/changes`` only see the
+    real differences.
+
+    Items whose cell changes are parked on a unique temporary cell while the
+    snapshot streams in and moved to their final cell once everything else
+    is written, so swapped positions don't trip ``uq_items_parent_pos``.
+    """
+
+    def __init__(self, db: Session, skip_duplicates: bool = False):
+        super().__init__(db, skip_duplicates)
+        self.current: dict[int, _Current] = {}
+        self.seen: set[int] = set()
+        self.moves: list[dict] = []
+        self.inserted: list[int] = []
+        self.updated: list[int] = []
+        self.deleted: list[int] = []
+        self.unchanged = 0
+        self.settings_updated = False
+
+    def begin(self):
+        """Hash every current item."""
+        items = Item.__table__
+        query = select(
+            items.c.id,
+            items.c.type,
+            items.c.title,
+            items.c.url,
+            items.c.favicon,
+            items.c.favicon_mime,
+            items.c.date_added,
+            items.c.parent_id,
+            items.c.position_x,
+            items.c.position_y,
+            items.c.deleted_at,
+        )
+        rows = self.db.execute(query.execution_options(yield_per=IMPORT_BATCH))
+        for row in rows.mappings():
+            self.current[row["id"]] = _Current(
+                row["type"],
+                _digest(row, row["type"]),
+                row["deleted_at"] is None,
+                (row["parent_id"], row["position_x"], row["position_y"]),
+            )
+
+    def _write_items(self, bookmarks: list[dict], folders: list[dict]):
+        now = datetime.now(timezone.utc)
+        new_bookmarks, new_folders = [], []
+        changed_bookmarks, changed_folders = [], []
+        for rows, item_type, new, changed in (
+            (folders, "folder", new_folders, changed_folders),
+            (bookmarks, "bookmark", new_bookmarks, changed_bookmarks),
+        ):
+            for row in rows:
+                item_id = row["id"]
+                if item_id in self.seen:
+                    raise HTTPException(
+                        status_code=422, detail=f"Duplicate item id {item_id}"
+                    )
+                self.seen.add(item_id)
+                current = self.current.get(item_id)
+                if current is not None and current.type != item_type:
+                    raise HTTPException(
+                        status_code=422,
+                        detail=f"Item {item_id} is a {current.type}, "
+                        f"not a {item_type}",
+                    )
+                if current is None:
+                    new.append(self._park(row))
+                    self.inserted.append(item_id)
+                elif current.live and current.digest == _digest(row, item_type):
+                    self.unchanged += 1
+                else:
+                    cell = (row["parent_id"], row["position_x"], row["position_y"])
+                    if not current.live or current.cell != cell:
+                        row = self._park(row)
+                    changed.append(row)
+                    self.updated.append(item_id)
+
+        insert_items(self.db, bookmarks=new_bookmarks, folders=new_folders)
+
+        for row in changed_bookmarks:
+            row["url_key"] = normalize_url(row["url"])
+        # Parameter keys other than b_id become the SET clause
+        items = Item.__table__
+        for rows, columns in (
+            (changed_folders, ()),
+            (changed_bookmarks, ("url", "url_key", "favicon", "favicon_mime")),
+        ):
+            if not rows:
+                continue
+            self.db.execute(
+                update(items).where(items.c.id == bindparam("b_id")),
+                [
+                    {
+                        "b_id": row["id"],
+                        "title": row["title"],
+                        "date_added": row["date_added"],
+                        "parent_id": row["parent_id"],
+                        "position_x": row["position_x"],
+                        "position_y": row["position_y"],
+                        "last_updated": now,
+                        "deleted_at": None,
+                        **{column: row[column] for column in columns},
+                    }
+                    for row in rows
+                ],
+            )
+
+    def _park(self, row: dict) -> dict:
+        """Return ``row`` on a temporary cell, remembering its final one."""
+        self.moves.append(
+            {
+                "b_id": row["id"],
+                "position_x": row["position_x"],
+                "position_y": row["position_y"],
+            }
+        )
+        return {**row, "position_x": -row["id"], "position_y": -1}
+
+    def finish(self):
+        """Soft-delete missing items, place parked ones, merge settings, commit."""
+        now = datetime.now(timezone.utc)
+        items = Item.__table__
+        self.deleted = [
+            item_id
+            for item_id, current in self.current.items()
+            if current.live and item_id not in self.seen
+        ]
+        for start in range(0, len(self.deleted), IMPORT_BATCH):
+            chunk = self.deleted[start : start + IMPORT_BATCH]
+            self.db.execute(
+                update(items)
+                .where(items.c.id.in_(chunk))
+                .values(deleted_at=now, last_updated=now)
+            )
+        if self.moves:
+            self.db.execute(
+                update(items).where(items.c.id == bindparam("b_id")), self.moves
+            )
+
+        if self.settings is not None:
+            incoming = self.settings.model_dump(exclude={"type"})
+            current = self.db.execute(
+                select(
+                    Settings.show_titles,
+                    Settings.tiles_per_row,
+                    Settings.tile_gap,
+                    Settings.show_add_button,
+                ).where(Settings.id == 1)
+            ).first()
+            if current is None:
+                self.db.execute(insert(Settings.__table__), {"id": 1, **incoming})
+                self.settings_updated = True
+            elif current._asdict() != incoming:
+                self.db.execute(
+                    update(Settings.__table__)
+                    .where(Settings.__table__.c.id == 1)
+                    .values(**incoming, last_updated=now)
+                )
+                self.settings_updated = True
+        self.db.commit()
+
+
+async def import_stream(
+    db: Session,
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    writer: ImportWriter | None = None,
+) -> ImportWriter:
+    """Write the records in an import body with ``writer``.
+
+    Defaults to replacing all data (``ImportWriter``). DB work runs in the
+    threadpool one batch at a time while the body is still being received.
+    Rolls back on any error.
+    """
+    if writer is None:
+        writer = ImportWriter(db)
+    try:
+        await run_in_threadpool(writer.begin)
+        async for batch in batched(iter_records(chunks, content_type), IMPORT_BATCH):
+            await run_in_threadpool(writer.write, batch)
+        await run_in_threadpool(writer.finish)
+    except BaseException:
+        await run_in_threadpool(db.rollback)
+        raise
+    return writer
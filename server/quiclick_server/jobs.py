@@ -0,0 +1,257 @@
+"""Background import/export jobs.
+
+A job is a row in the shared ``jobs.db`` plus, for imports, the uploaded body
+and, for exports, the result file under ``{data_dir}/jobs``. Jobs run on a
+process-wide thread pool of ``job_workers`` threads; each user may have at
+most ``job_max_active_per_user`` queued or running jobs. Progress is written
+to ``jobs.db`` rather than the user database, so it can be polled (from any
+device) while an import holds the user database's write lock.
+
+Finished jobs and their files are removed ``job_result_ttl_seconds`` after
+they finish, checked whenever a new job is submitted.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from quiclick_server.config import cfg
+from quiclick_server.models import JobRecord, JobRegistryBase
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ACTIVE = (QUEUED, RUNNING)
+
+# Minimum seconds between progress writes of a running job
+PROGRESS_INTERVAL = 0.5
+
+_lock = threading.Lock()
+_engines: dict[Path, object] = {}
+_executor: ThreadPoolExecutor | None = None
+
+
+def jobs_dir() -> Path:
+    """Directory for job uploads and results."""
+    path = Path(cfg.data_dir) / "jobs"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _engine():
+    path = Path(cfg.data_dir) / "jobs.db"
+    with _lock:
+        engine = _engines.get(path)
+        if engine is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            engine = create_engine(
+                f"sqlite:///{path}", connect_args={"check_same_thread": False}
+            )
+            JobRegistryBase.metadata.create_all(engine)
+            _engines[path] = engine
+        return engine
+
+
+def _session() -> Session:
+    return Session(_engine(), expire_on_commit=False)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=cfg.job_workers, thread_name_prefix="quiclick-job"
+            )
+        return _executor
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _pid_alive(pid: int | None) -> bool:
+    if pid is None or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def input_file(job_id: str) -> Path:
+    return jobs_dir() / f"{job_id}.in"
+
+
+def result_file(job_id: str) -> Path:
+    return jobs_dir() / f"{job_id}.out"
+
+
+def _remove_file(path: Path | None):
+    if path is not None:
+        path.unlink(missing_ok=True)
+
+
+def _purge_expired(db: Session):
+    cutoff = _now() - timedelta(seconds=cfg.job_result_ttl_seconds)
+    expired = db.scalars(
+        select(JobRecord).where(
+            JobRecord.status.not_in(ACTIVE), JobRecord.finished_at < cutoff
+        )
+    ).all()
+    for job in expired:
+        _remove_file(result_file(job.id))
+        db.delete(job)
+
+
+def _mark_interrupted(db: Session, job: JobRecord) -> JobRecord:
+    """Fail a job whose worker process is gone (e.g. a server restart)."""
+    if job.status not in ACTIVE or job.pid == os.getpid():
+        return job
+    if not _pid_alive(job.pid):
+        job.status = FAILED
+        job.error = "Interrupted by a server restart"
+        job.finished_at = _now()
+        _remove_file(input_file(job.id))
+        _remove_file(result_file(job.id))
+        db.commit()
+    return job
+
+
+def submit(
+    sub: str,
+    kind: str,
+    params: dict,
+    runner: Callable[["JobRecord", "Progress"], dict | None],
+    *,
+    upload: Path | None = None,
+) -> JobRecord:
+    """Queue ``runner`` as a new job of ``sub``.
+
+    ``runner(job, progress)`` runs on the worker pool and returns the job's
+    ``result``; an export runner writes its output to ``result_file(job.id)``.
+    An ``HTTPException`` or any other error fails the job. ``upload`` is the
+    job's input file; it is moved to ``input_file(job.id)`` and removed
+    when the job ends (or here, if the job is rejected). Raises 429 when the
+    user has too many active jobs.
+    """
+    try:
+        with _session() as db:
+            _purge_expired(db)
+            active = db.scalars(
+                select(JobRecord).where(
+                    JobRecord.sub == sub, JobRecord.status.in_(ACTIVE)
+                )
+            ).all()
+            for job in active:
+                _mark_interrupted(db, job)
+            running = sum(1 for job in active if job.status in ACTIVE)
+            if running >= cfg.job_max_active_per_user:
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"At most {cfg.job_max_active_per_user} "
+                    "jobs can be queued or running at a time",
+                )
+            job = JobRecord(
+                id=uuid.uuid4().hex,
+                sub=sub,
+                kind=kind,
+                status=QUEUED,
+                params=params,
+                total=upload.stat().st_size if upload is not None else None,
+                pid=os.getpid(),
+            )
+            db.add(job)
+            db.commit()
+            if upload is not None:
+                upload = upload.rename(input_file(job.id))
+    except BaseException:
+        _remove_file(upload)
+        raise
+    _get_executor().submit(_run, job, runner, upload)
+    return job
+
+
+class Progress:
+    """Callable reporting how many bytes a job has processed (throttled)."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.processed = 0
+        self.total: int | None = None
+        self._written_at = 0.0
+
+    def __call__(self, processed: int, total: int | None = None):
+        self.processed = processed
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        if now - self._written_at >= PROGRESS_INTERVAL:
+            self._written_at = now
+            self._write()
+
+    def _write(self, **values):
+        with _session() as db:
+            job = db.get(JobRecord, self.job_id)
+            if job is None:
+                return
+            job.processed = self.processed
+            if self.total is not None:
+                job.total = self.total
+            for name, value in values.items():
+                setattr(job, name, value)
+            db.commit()
+
+
+def _run(job: JobRecord, runner, upload: Path | None):
+    progress = Progress(job.id)
+    progress.total = job.total
+    progress._write(status=RUNNING, started_at=_now())
+    try:
+        result = runner(job, progress)
+    except Exception as e:
+        _remove_file(result_file(job.id))
+        if isinstance(e, HTTPException):
+            error = str(e.detail)
+        else:
+            error = f"{type(e).__name__}: {e}"
+        progress._write(status=FAILED, error=error, finished_at=_now())
+    else:
+        if progress.total is None:
+            progress.total = progress.processed
+        progress._write(status=SUCCEEDED, result=result, finished_at=_now())
+    finally:
+        _remove_file(upload)
+
+
+def get_job(sub: str, job_id: str) -> JobRecord:
+    """Return a job of ``sub``, or raise 404."""
+    with _session() as db:
+        job = db.get(JobRecord, job_id)
+        if job is None or job.sub != sub:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return _mark_interrupted(db, job)
+
+
+def list_jobs(sub: str) -> list[JobRecord]:
+    """Return the jobs of ``sub``, newest first."""
+    with _session() as db:
+        jobs = db.scalars(
+            select(JobRecord)
+            .where(JobRecord.sub == sub)
+            .order_by(JobRecord.created_at.desc())
+        ).all()
+        return [_mark_interrupted(db, job) for job in jobs]
@@ -0,0 +1,92 @@
+"""Item id leases.
+
+A device leases a contiguous block of item ids and creates items with final
+ids offline. Leased blocks always start above every existing item id and
+every earlier lease, and server-assigned ids are pushed past the highest
+leased id so the two never collide. Creating an item with a leased id names
+the device in the ``X-Device-Id`` header; only ids leased to that device are
+accepted, so two devices can't claim each other's blocks.
+"""
+
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, Request
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import Session
+
+from quiclick_server.models import IdLease, Item
+
+DEVICE_HEADER = "X-Device-Id"
+
+
+def lease_ids(db: Session, device_id: str, count: int) -> IdLease:
+    """Reserve ``count`` ids for ``device_id`` (not committed).
+
+    The high-water mark is read and the lease written in one statement, so
+    concurrent requests can't be handed overlapping blocks.
+    """
+    result = db.execute(
+        text(
+            "INSERT INTO id_leases (device_id, start_id, end_id, created_at) "
+            "SELECT :device_id, hw + 1, hw + :count, :now FROM ("
+            "  SELECT MAX("
+            "    COALESCE((SELECT MAX(id) FROM items), 0),"
+            "    COALESCE((SELECT MAX(end_id) FROM id_leases), 0)"
+            "  ) AS hw"
+            ")"
+        ),
+        {"device_id": device_id, "count": count, "now": datetime.now(timezone.utc)},
+    )
+    return db.get(IdLease, result.lastrowid)
+
+
+def request_device_id(request: Request) -> str | None:
+    """Device named by the request's ``X-Device-Id`` header, if any."""
+    return request.headers.get(DEVICE_HEADER)
+
+
+def check_leased_id(db: Session, item_id: int, device_id: str | None):
+    """Raise unless ``item_id`` lies in a lease of ``device_id`` and isn't used yet."""
+    if device_id is None:
+        raise HTTPException(
+            status_code=422, detail=f"Creating with an id needs {DEVICE_HEADER}"
+        )
+    leased = db.execute(
+        select(IdLease.id).where(
+            IdLease.device_id == device_id,
+            IdLease.start_id <= item_id,
+            IdLease.end_id >= item_id,
+        )
+    ).first()
+    if leased is None:
+        raise HTTPException(
+            status_code=422, detail=f"Id {item_id} is not leased to this device"
+        )
+    if db.get(Item, item_id) is not None:
+        raise HTTPException(status_code=409, detail=f"Id {item_id} already exists")
+
+
+def next_free_id(db: Session) -> int | None:
+    """First id above all items and leases, or None when SQLite's rowid is safe."""
+    high_water = db.execute(select(func.max(IdLease.end_id))).scalar()
+    if high_water is None:
+        return None
+    max_id = db.execute(select(func.max(Item.id))).scalar() or 0
+    if max_id >= high_water:
+        return None
+    return high_water + 1
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_ids_past_leases(session: Session, flush_context, instances):
+    new_items = [
+        obj for obj in session.new if isinstance(obj, Item) and obj.id is None
+    ]
+    if not new_items:
+        return
+    next_id = next_free_id(session)
+    if next_id is None:
+        return
+    for obj in new_items:
+        obj.id = next_id
+        next_id += 1
@@ -1,13 +1,32 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from quiclick_server import auth
+from quiclick_server.compression import CompressionMiddleware
 from quiclick_server.config import cfg
-from quiclick_server.database import init_users_db
-from quiclick_server.routes import bookmarks, changes, export_import, folders, reorder
+from quiclick_server.database import dispose_user_engines, init_users_db
+from quiclick_server.idempotency import (
+    IdempotencyMiddleware,
+    IdempotentReplay,
+    check_idempotency_key,
+    replay_handler,
+)
+from quiclick_server.leases import DEVICE_HEADER
+from quiclick_server.routes import (
+    batch,
+    bookmarks,
+    changes,
+    export_import,
+    folders,
+    ids,
+    jobs,
+    metrics,
+    reorder,
+    search,
+)
 from quiclick_server.routes import settings as settings_routes
 
 
@@ -16,10 +35,18 @@ async def lifespan(app: FastAPI):
     """Initialize the shared users registry DB on startup."""
     init_users_db()
     yield
+    dispose_user_engines()
 
 
 app = FastAPI(title="QuiClick API", lifespan=lifespan)
 
+# Idempotency-Key response capture (innermost, sees the route's response)
+app.add_middleware(IdempotencyMiddleware)
+app.add_exception_handler(IdempotentReplay, replay_handler)
+
+# Content-Encoding (outside idempotency, so stored responses are uncompressed)
+app.add_middleware(CompressionMiddleware)
+
 # Session middleware (signed cookie)
 app.add_middleware(
     SessionMiddleware,
@@ -34,18 +61,39 @@ app.add_middleware(
     allow_origins=[o.strip() for o in cfg.cors_origins.split(",")],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["Content-Type", "If-Modified-Since"],
-    expose_headers=["Last-Modified"],
+    allow_headers=[
+        "Content-Type",
+        "If-Modified-Since",
+        "If-None-Match",
+        "If-Match",
+        "Idempotency-Key",
+        DEVICE_HEADER,
+    ],
+    expose_headers=[
+        "ETag",
+        "Last-Modified",
+        "Idempotent-Replayed",
+        "X-Export-Marker",
+        "X-Next-Page-Token",
+    ],
 )
 
-# Routers
+# Routers (user-data routers honor Idempotency-Key on mutating requests)
+idempotent = [Depends(check_idempotency_key)]
 app.include_router(auth.router)
-app.include_router(bookmarks.router, prefix="/bookmarks")
-app.include_router(folders.router, prefix="/folders")
-app.include_router(reorder.router)
-app.include_router(settings_routes.router, prefix="/settings")
-app.include_router(export_import.router)
+app.include_router(bookmarks.router, prefix="/bookmarks", dependencies=idempotent)
+app.include_router(folders.router, prefix="/folders", dependencies=idempotent)
+app.include_router(reorder.router, dependencies=idempotent)
+app.include_router(
+    settings_routes.router, prefix="/settings", dependencies=idempotent
+)
+app.include_router(export_import.router, dependencies=idempotent)
 app.include_router(changes.router)
+app.include_router(search.router)
+app.include_router(metrics.router)
+app.include_router(batch.router, dependencies=idempotent)
+app.include_router(ids.router, dependencies=idempotent)
+app.include_router(jobs.router, prefix="/jobs", dependencies=idempotent)
 
 
 @app.get("/")
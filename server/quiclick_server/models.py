@@ -8,15 +8,17 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    JSON,
     Index,
     Integer,
     LargeBinary,
     String,
     text,
 )
-from sqlalchemy.orm import composite, declarative_base, relationship
+from sqlalchemy.orm import composite, declarative_base, relationship, validates
 
 from quiclick_server.database import Base
+from quiclick_server.urls import normalize_url
 
 
 class Position:
@@ -68,7 +70,11 @@ class Position:
 
 
 class Item(Base):
-    """Base table for all positionable items (bookmarks and folders)."""
+    """Single table of all positionable items (bookmarks and folders).
+
+    Subclasses use single-table inheritance on ``type``, so reading or
+    writing an item never joins or touches a second table.
+    """
 
     __tablename__ = "items"
 
@@ -101,6 +107,11 @@ class Item(Base):
             unique=True,
             sqlite_where=text("deleted_at IS NULL"),
         ),
+        # Change cursor: newest change, /changes?since and its keyset pages
+        Index("ix_items_last_updated_id", "last_updated", "id"),
+        # Grid order of listings and their keyset pages, overall and per parent
+        Index("ix_items_grid", "position_y", "position_x", "id"),
+        Index("ix_items_parent_grid", "parent_id", "position_y", "position_x", "id"),
     )
     __mapper_args__ = {
         "polymorphic_on": "type",
@@ -109,24 +120,32 @@ class Item(Base):
 
 
 class Bookmark(Item):
-    """Bookmark-specific columns."""
-
-    __tablename__ = "bookmarks"
+    """Bookmark-specific columns (stored in ``items``, NULL for folders)."""
 
-    id = Column(Integer, ForeignKey("items.id"), primary_key=True)
-    url = Column(String, nullable=False)
+    url = Column(String, nullable=True)
+    # urls.normalize_url(url), kept in step with url (Core writers set both)
+    url_key = Column(String, nullable=True)
     favicon = Column(LargeBinary, nullable=True)
     favicon_mime = Column(String, nullable=True)  # e.g. "image/png"
 
     __mapper_args__ = {"polymorphic_identity": "bookmark"}
 
+    @validates("url")
+    def _set_url_key(self, key, url):
+        self.url_key = normalize_url(url) if url is not None else None
+        return url
 
-class Folder(Item):
-    """Folder-specific columns (extensible)."""
 
-    __tablename__ = "folders"
+# Duplicate detection: live bookmarks by normalized URL
+Index(
+    "ix_items_url_key",
+    Bookmark.__table__.c.url_key,
+    sqlite_where=text("deleted_at IS NULL"),
+)
 
-    id = Column(Integer, ForeignKey("items.id"), primary_key=True)
+
+class Folder(Item):
+    """Folder-specific columns (extensible)."""
 
     __mapper_args__ = {"polymorphic_identity": "folder"}
 
@@ -149,6 +168,45 @@ class Settings(Base):
     )
 
 
+class IdLease(Base):
+    """Block of item ids (start_id..end_id inclusive) reserved for a device.
+
+    Clients create items with ids from their block, so no local -> server id
+    remapping is needed. Server-assigned ids skip past every leased block.
+    """
+
+    __tablename__ = "id_leases"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    device_id = Column(String, nullable=False)
+    start_id = Column(Integer, nullable=False)
+    end_id = Column(Integer, nullable=False)
+    created_at = Column(
+        DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class IdempotencyRecord(Base):
+    """Stored response of a mutating request sent with an Idempotency-Key.
+
+    ``status_code`` is NULL while the original request is still running.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=True)
+    media_type = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(
+        DateTime,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        index=True,
+    )
+
+
 # --- User registry model (stored in users.db) ---
 
 UserRegistryBase = declarative_base()
@@ -162,3 +220,34 @@ class UserRecord(UserRegistryBase):
     sub = Column(String, primary_key=True)
     email = Column(String, nullable=False)
     name = Column(String, nullable=True)
+
+
+# --- Background job registry model (stored in jobs.db) ---
+
+JobRegistryBase = declarative_base()
+
+
+class JobRecord(JobRegistryBase):
+    """Background import/export job of a user (see ``quiclick_server.jobs``).
+
+    Kept outside the user databases so progress can be written while an
+    import holds the user database's write lock.
+    """
+
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)
+    sub = Column(String, nullable=False, index=True)
+    kind = Column(String, nullable=False)  # "import", "import_html", "export"
+    status = Column(String, nullable=False)  # queued, running, succeeded, failed
+    params = Column(JSON, nullable=False, default=dict)
+    processed = Column(Integer, nullable=False, default=0)  # bytes
+    total = Column(Integer, nullable=True)  # bytes, when known up front
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    pid = Column(Integer, nullable=True)  # process running the job
+    created_at = Column(
+        DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True, index=True)
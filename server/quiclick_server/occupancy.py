@@ -0,0 +1,331 @@
+"""In-memory grid occupancy index.
+
+Keeps one bitmap per row for every position scope (root or a folder) of each
+user database, so requested cells can be checked and the nearest free cell
+found without waiting for ``uq_items_parent_pos`` to reject a commit.
+
+The index is loaded lazily from ``items`` and kept coherent by Session events:
+positions touched by a flush are recorded and applied once the transaction
+commits. DML statements on ``items`` executed directly on the Session (bulk
+deletes, Core inserts) can't be tracked cell by cell and simply drop the
+index, which is rebuilt on next use. Writes from other processes are
+detected by comparing the database file's mtime/size stamp; a commit that
+found the stamp current re-stamps the index, so writes of this process to
+other tables (idempotency keys, leases...) keep it.
+"""
+
+import os
+import threading
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from quiclick_server.models import Item, Position
+
+# (parent_id, x, y) of a live item
+Cell = tuple[int | None, int, int]
+
+
+class ScopeGrid:
+    """Occupied cells of a single scope, one int bitmap per row."""
+
+    __slots__ = ("rows",)
+
+    def __init__(self, rows: dict[int, int] | None = None):
+        self.rows = rows if rows is not None else {}
+
+    def copy(self) -> "ScopeGrid":
+        return ScopeGrid(dict(self.rows))
+
+    def is_free(self, x: int, y: int) -> bool:
+        if x < 0 or y < 0:
+            return True
+        return not (self.rows.get(y, 0) >> x) & 1
+
+    def occupy(self, x: int, y: int):
+        if x < 0 or y < 0:
+            return
+        self.rows[y] = self.rows.get(y, 0) | (1 << x)
+
+    def release(self, x: int, y: int):
+        if x < 0 or y < 0:
+            return
+        bits = self.rows.get(y, 0) & ~(1 << x)
+        if bits:
+            self.rows[y] = bits
+        else:
+            self.rows.pop(y, None)
+
+    def next_after_last(self, width: int) -> tuple[int, int]:
+        """Return the cell after the last occupied one in reading order.
+
+        Same rule as appending a new item: the next column of the lowest row,
+        wrapping to a new row at ``width``.
+        """
+        if not self.rows:
+            return 0, 0
+        y = max(self.rows)
+        x = self.rows[y].bit_length() - 1
+        if x + 1 >= width:
+            return 0, y + 1
+        return x + 1, y
+
+    def nearest_free(self, x: int, y: int, width: int) -> tuple[int, int]:
+        """Return the free cell closest to (x, y) by Manhattan distance.
+
+        Candidates are limited to ``0 <= x < width`` (widened to include the
+        requested column) and ``y >= 0``. Ties prefer the same row, then
+        earlier rows, then earlier columns.
+        """
+        x = max(x, 0)
+        y = max(y, 0)
+        width = max(width, x + 1)
+        if self.is_free(x, y):
+            return x, y
+        distance = 1
+        while True:
+            candidates = []
+            for dy in range(-distance, distance + 1):
+                cy = y + dy
+                if cy < 0:
+                    continue
+                dx = distance - abs(dy)
+                for cx in {x - dx, x + dx}:
+                    if 0 <= cx < width:
+                        candidates.append((abs(dy), cy, cx))
+            for _, cy, cx in sorted(candidates):
+                if self.is_free(cx, cy):
+                    return cx, cy
+            distance += 1
+
+
+class OccupancyIndex:
+    """Occupied cells of every scope in one user database."""
+
+    def __init__(self):
+        self.scopes: dict[int | None, ScopeGrid] = {}
+
+    @classmethod
+    def load(cls, db: Session) -> "OccupancyIndex":
+        index = cls()
+        rows = db.execute(
+            select(Item.parent_id, Item.position_x, Item.position_y).where(
+                Item.deleted_at.is_(None)
+            )
+        )
+        for parent_id, x, y in rows:
+            index.grid(parent_id).occupy(x, y)
+        return index
+
+    def grid(self, parent_id: int | None) -> ScopeGrid:
+        grid = self.scopes.get(parent_id)
+        if grid is None:
+            grid = self.scopes[parent_id] = ScopeGrid()
+        return grid
+
+    def apply(self, moves: list[tuple[Cell | None, Cell | None]]):
+        """Apply (old_cell, new_cell) moves: release all, then occupy all."""
+        for old, _ in moves:
+            if old is not None:
+                self.grid(old[0]).release(old[1], old[2])
+        for _, new in moves:
+            if new is not None:
+                self.grid(new[0]).occupy(new[1], new[2])
+
+
+class _Entry:
+    __slots__ = ("index", "stamp")
+
+    def __init__(self, index: OccupancyIndex, stamp):
+        self.index = index
+        self.stamp = stamp
+
+
+_lock = threading.RLock()
+_indexes: dict[str, _Entry] = {}
+
+
+def _db_path(db: Session) -> str | None:
+    return db.get_bind().url.database
+
+
+def _file_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def get_index(db: Session) -> OccupancyIndex:
+    """Return the occupancy index for the Session's database, loading if needed."""
+    path = _db_path(db)
+    stamp = _file_stamp(path)
+    with _lock:
+        entry = _indexes.get(path)
+        if entry is not None and entry.stamp == stamp:
+            return entry.index
+        index = OccupancyIndex.load(db)
+        _indexes[path] = _Entry(index, stamp)
+        return index
+
+
+def discard(db: Session):
+    """Drop the cached index so it's rebuilt from the database on next use."""
+    with _lock:
+        _indexes.pop(_db_path(db), None)
+
+
+def _pending_grid(db: Session, parent_id: int | None) -> ScopeGrid:
+    """Return a copy of a scope's grid with this session's flushed moves applied."""
+    grid = get_index(db).grid(parent_id).copy()
+    for moves in db.info.get("occupancy_moves", ()):
+        for old, _ in moves:
+            if old is not None and old[0] == parent_id:
+                grid.release(old[1], old[2])
+        for _, new in moves:
+            if new is not None and new[0] == parent_id:
+                grid.occupy(new[1], new[2])
+    return grid
+
+
+def resolve_position(
+    db: Session,
+    parent_id: int | None,
+    requested: Position,
+    *,
+    tiles_per_row: int,
+    current: Cell | None = None,
+) -> Position:
+    """Return ``requested`` if free in the scope, else the nearest free cell.
+
+    ``current`` is the cell of the item being moved; it counts as free for
+    that item. Changes already flushed in the session's transaction are taken
+    into account.
+    """
+    if current == (parent_id, requested.x, requested.y):
+        return requested
+    with _lock:
+        grid = _pending_grid(db, parent_id)
+    x, y = grid.nearest_free(requested.x, requested.y, tiles_per_row)
+    return Position(x, y)
+
+
+def scratch_grid(db: Session, parent_id: int | None) -> ScopeGrid:
+    """Return a private copy of a scope's grid for planning multi-item moves."""
+    with _lock:
+        return _pending_grid(db, parent_id)
+
+
+# --- Session event hooks ---
+
+
+def _cell_before(item: Item) -> Cell | None:
+    """Cell the item occupied before pending changes, or None if it didn't."""
+    state = inspect(item)
+    values = {}
+    for name in ("parent_id", "position_x", "position_y", "deleted_at"):
+        history = state.attrs[name].history
+        if history.deleted:
+            values[name] = history.deleted[0]
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        else:
+            values[name] = getattr(item, name)
+    if values["deleted_at"] is not None:
+        return None
+    return values["parent_id"], values["position_x"], values["position_y"]
+
+
+def _cell_after(item: Item) -> Cell | None:
+    if item.deleted_at is not None:
+        return None
+    return item.parent_id, item.position_x or 0, item.position_y or 0
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, flush_context):
+    moves = []
+    for obj in session.new:
+        if isinstance(obj, Item):
+            moves.append((None, _cell_after(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, Item):
+            old, new = _cell_before(obj), _cell_after(obj)
+            if old != new:
+                moves.append((old, new))
+    for obj in session.deleted:
+        if isinstance(obj, Item):
+            moves.append((_cell_before(obj), None))
+    if moves:
+        session.info.setdefault("occupancy_moves", []).append(moves)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_dml(orm_execute_state):
+    # Only DML on items can move cells; keys, leases and settings can't
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ) and orm_execute_state.statement.table.name == Item.__tablename__:
+        orm_execute_state.session.info["occupancy_stale"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _check_stamp(session: Session):
+    if session.in_nested_transaction():
+        return
+    path = _db_path(session)
+    with _lock:
+        entry = _indexes.get(path)
+        # Nothing but this transaction has written since the index was stamped
+        current = entry is not None and entry.stamp == _file_stamp(path)
+    session.info["occupancy_current"] = current
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_commit(session: Session):
+    if session.in_nested_transaction():
+        # Released savepoint; wait for the outer transaction
+        return
+    session.info.pop("occupancy_savepoints", None)
+    flushes = session.info.pop("occupancy_moves", None)
+    stale = session.info.pop("occupancy_stale", False)
+    current = session.info.pop("occupancy_current", False)
+    path = _db_path(session)
+    with _lock:
+        entry = _indexes.get(path)
+        if entry is None:
+            return
+        if stale or not current:
+            del _indexes[path]
+            return
+        for moves in flushes or ():
+            entry.index.apply(moves)
+        entry.stamp = _file_stamp(path)
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _mark_savepoint(session: Session, transaction):
+    if transaction.nested:
+        marks = session.info.setdefault("occupancy_savepoints", {})
+        marks[transaction] = len(session.info.get("occupancy_moves", ()))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction):
+    if previous_transaction.nested:
+        mark = session.info.get("occupancy_savepoints", {}).pop(previous_transaction, 0)
+        del session.info.get("occupancy_moves", [])[mark:]
+        # The index may have been loaded inside the savepoint; rebuild it
+        # once the outer transaction commits.
+        session.info["occupancy_stale"] = True
+        return
+    session.info.pop("occupancy_savepoints", None)
+    flushed = session.info.pop("occupancy_moves", None)
+    stale = session.info.pop("occupancy_stale", False)
+    if flushed or stale:
+        # The index may have been loaded mid-transaction, after the flush
+        with _lock:
+            _indexes.pop(_db_path(session), None)
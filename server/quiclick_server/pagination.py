@@ -0,0 +1,64 @@
+"""Opaque continuation tokens for keyset-paginated responses.
+
+A token is the URL-safe base64 of a small JSON object naming the endpoint
+(and filter) it continues plus the sort key of the last row served, so the
+next page is a plain ``WHERE key > :last ... LIMIT`` on an index, whatever
+the page number. Pages are opt-in (``?limit=`` or ``?page_token=``); the
+token of the next page is sent in the ``X-Next-Page-Token`` header and is
+absent on the last page.
+"""
+
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException
+
+from quiclick_server.config import cfg
+
+NEXT_PAGE_HEADER = "X-Next-Page-Token"
+
+
+def page_size(limit: int | None) -> int:
+    """Rows per page: ``limit`` or ``page_size``, at most ``max_page_size``."""
+    return min(limit or cfg.page_size, cfg.max_page_size)
+
+
+def encode_token(scope: str, after: list[int], **state: int | None) -> str:
+    """Token continuing ``scope`` after the row with sort key ``after``."""
+    payload = {"scope": scope, "after": after, **state}
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_token(token: str, scope: str, key_length: int) -> dict:
+    """State of a token issued for ``scope``; 422 if it's malformed or foreign.
+
+    ``after`` is checked to be a sort key of ``key_length`` integers, every
+    other value to be an integer or null.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        state = None
+    if (
+        not isinstance(state, dict)
+        or state.pop("scope", None) != scope
+        or not _is_key(state.get("after"), key_length)
+        or not all(
+            value is None or type(value) is int
+            for name, value in state.items()
+            if name != "after"
+        )
+    ):
+        raise HTTPException(status_code=422, detail="Invalid page token")
+    return state
+
+
+def _is_key(value, length: int) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) == length
+        and all(type(v) is int for v in value)
+    )
@@ -0,0 +1,217 @@
+"""Core ``select()`` statements of the hot read paths.
+
+Built once at import time with bound parameters, so SQLAlchemy compiles
+each of them once per (shared, see ``database.user_engine``) engine and
+reuses the cached compiled form on every later request. Executed on the
+Session's connection they skip the ORM entirely (no identity map, no
+polymorphic loading) and yield plain row tuples with the column names
+``serialization.bookmark_dict`` / ``folder_dict`` read.
+
+Only statements that return bookmarks select the favicon BLOB column, and
+``project`` narrows any of them to the columns of a ``?fields=`` selection.
+"""
+
+from functools import lru_cache
+
+from sqlalchemy import (
+    DateTime,
+    Select,
+    bindparam,
+    column,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    tuple_,
+)
+
+from quiclick_server.models import Item, Settings
+
+_items = Item.__table__
+
+_ITEM_COLUMNS = (
+    _items.c.id,
+    _items.c.type,
+    _items.c.title,
+    _items.c.date_added,
+    _items.c.parent_id,
+    _items.c.position_x,
+    _items.c.position_y,
+    _items.c.last_updated,
+    _items.c.deleted_at,
+)
+BOOKMARK_COLUMNS = (
+    *_ITEM_COLUMNS,
+    _items.c.url,
+    _items.c.favicon,
+    _items.c.favicon_mime,
+)
+
+_live = _items.c.deleted_at.is_(None)
+_changed = _items.c.last_updated > bindparam("since")
+# Grid order of list responses; /changes keeps its (x, y) order
+_grid_order = (_items.c.position_y, _items.c.position_x)
+_changes_order = (_items.c.position_x, _items.c.position_y)
+
+_bookmarks_q = select(*BOOKMARK_COLUMNS).where(_items.c.type == "bookmark", _live)
+_folders_q = select(*_ITEM_COLUMNS).where(_items.c.type == "folder", _live)
+
+# GET /bookmarks (all, ?folder_id=root, ?folder_id=<id> with :parent_id)
+LIVE_BOOKMARKS = _bookmarks_q.order_by(*_grid_order)
+ROOT_BOOKMARKS = _bookmarks_q.where(_items.c.parent_id.is_(None)).order_by(
+    *_grid_order
+)
+FOLDER_BOOKMARKS = _bookmarks_q.where(
+    _items.c.parent_id == bindparam("parent_id")
+).order_by(*_grid_order)
+
+# GET /folders, GET /folders/{id} (:id)
+LIVE_FOLDERS = _folders_q.order_by(*_grid_order)
+LIVE_FOLDER = _folders_q.where(_items.c.id == bindparam("id"))
+
+# Validators (see ``etags``): a bookmark's last_updated; a folder's plus the
+# newest last_updated and the live count of its children
+_children = _items.alias("children")
+BOOKMARK_VERSION = select(_items.c.last_updated).where(
+    _items.c.id == bindparam("id"), _items.c.type == "bookmark", _live
+)
+FOLDER_VERSION = select(
+    _items.c.last_updated,
+    select(func.max(_children.c.last_updated))
+    .where(_children.c.parent_id == _items.c.id)
+    .scalar_subquery(),
+    select(func.count())
+    .where(_children.c.parent_id == _items.c.id, _children.c.deleted_at.is_(None))
+    .scalar_subquery(),
+).where(_items.c.id == bindparam("id"), _items.c.type == "folder", _live)
+
+
+def _subtree(top) -> Select:
+    """Live items below the ``top`` condition's items, with their depth.
+
+    A recursive CTE collects ids level by level (via ``ix_items_parent_grid``),
+    descending only into folders and at most :max_depth levels (a bound that
+    also stops cycles in malformed data). Rows come parents first.
+    """
+    tree = (
+        select(_items.c.id, _items.c.type, literal(1).label("depth"))
+        .where(top, _live)
+        .cte("tree", recursive=True)
+    )
+    tree = tree.union_all(
+        select(_items.c.id, _items.c.type, tree.c.depth + 1)
+        .join(tree, _items.c.parent_id == tree.c.id)
+        .where(tree.c.type == "folder", tree.c.depth < bindparam("max_depth"), _live)
+    )
+    return (
+        select(*BOOKMARK_COLUMNS, tree.c.depth)
+        .join(tree, _items.c.id == tree.c.id)
+        .order_by(tree.c.depth, *_grid_order, _items.c.id)
+    )
+
+
+# GET /folders/{id}/tree (:parent_id), GET /folders/root/tree
+FOLDER_TREE = _subtree(_items.c.parent_id == bindparam("parent_id"))
+ROOT_TREE = _subtree(_items.c.parent_id.is_(None))
+
+# GET /search: the best :limit live items matching :query
+# (``search.match_expression``), title matches weighing more than URL ones.
+# Ranked inside the index first, so only the hits' rows are read.
+_fts = table("items_fts", column("rowid"))
+_fts_match = literal_column("items_fts")
+_hits = (
+    select(_fts.c.rowid, func.bm25(_fts_match, 10.0, 1.0).label("score"))
+    .where(_fts_match.op("MATCH")(bindparam("query")))
+    .order_by("score")
+    .limit(bindparam("limit"))
+    .subquery("hits")
+)
+SEARCH = (
+    select(*BOOKMARK_COLUMNS)
+    .join(_hits, _hits.c.rowid == _items.c.id)
+    .order_by(_hits.c.score)
+)
+
+# GET /bookmarks/duplicates: live bookmarks grouped by normalized URL
+DUPLICATES = (
+    select(_items.c.url_key, func.json_group_array(_items.c.id).label("ids"))
+    .where(_items.c.url_key.is_not(None), _live)
+    .group_by(_items.c.url_key)
+    .having(func.count() > 1)
+    .order_by(func.min(_items.c.id))
+)
+
+# GET /changes: everything, or rows changed after :since
+MAX_ITEM_UPDATED = select(func.max(_items.c.last_updated))
+SETTINGS = select(Settings.__table__).where(Settings.__table__.c.id == 1)
+ALL_BOOKMARKS = _bookmarks_q.order_by(*_changes_order)
+ALL_FOLDERS = _folders_q.order_by(*_changes_order)
+CHANGED_BOOKMARKS = _bookmarks_q.where(_changed).order_by(*_changes_order)
+CHANGED_FOLDERS = _folders_q.where(_changed).order_by(*_changes_order)
+DELETED_IDS = select(_items.c.id).where(_items.c.deleted_at.is_not(None), _changed)
+
+# Keyset pages (see ``pagination``). Grid pages continue after the row at
+# (:after_y, :after_x, :after_id); change pages walk every item, deleted
+# ones included, in (last_updated, id) order after (:after_ts, :after_id),
+# skipping rows deleted before :start (the start of a full pull).
+_grid_key = (_items.c.position_y, _items.c.position_x, _items.c.id)
+_change_key = (_items.c.last_updated, _items.c.id)
+
+CHANGES_PAGE = (
+    select(*BOOKMARK_COLUMNS)
+    .where(
+        tuple_(*_change_key)
+        > tuple_(bindparam("after_ts", type_=DateTime), bindparam("after_id")),
+        or_(_live, _items.c.last_updated > bindparam("start", type_=DateTime)),
+    )
+    .order_by(*_change_key)
+    .limit(bindparam("limit"))
+)
+
+
+@lru_cache(maxsize=64)
+def grid_page(statement: Select, first: bool) -> Select:
+    """``statement`` as one ``:limit`` rows page in grid order."""
+    page = statement.order_by(None).order_by(*_grid_key).limit(bindparam("limit"))
+    if first:
+        return page
+    return page.where(
+        tuple_(*_grid_key)
+        > tuple_(bindparam("after_y"), bindparam("after_x"), bindparam("after_id"))
+    )
+
+
+# Response field -> columns it is rendered from
+_FIELD_COLUMNS = {
+    "id": (_items.c.id,),
+    "type": (_items.c.type,),
+    "title": (_items.c.title,),
+    "url": (_items.c.url,),
+    "favicon": (_items.c.favicon, _items.c.favicon_mime),
+    "date_added": (_items.c.date_added,),
+    "parent_id": (_items.c.parent_id,),
+    "position": (_items.c.position_x, _items.c.position_y),
+    "last_updated": (_items.c.last_updated,),
+    "deleted_at": (_items.c.deleted_at,),
+}
+
+
+@lru_cache(maxsize=256)
+def project(statement: Select, fields: tuple[str, ...] | None) -> Select:
+    """``statement`` selecting only the columns behind ``fields``.
+
+    Bookmark-only fields are dropped for folder statements. Cached, so each
+    projection is built (and compiled) once.
+    """
+    if fields is None:
+        return statement
+    available = {column.name for column in statement.selected_columns}
+    columns = [
+        column
+        for field in fields
+        for column in _FIELD_COLUMNS[field]
+        if column.name in available
+    ]
+    return statement.with_only_columns(*columns)
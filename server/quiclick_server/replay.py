@@ -0,0 +1,150 @@
+"""Rebuild a full export from a base export and a chain of incremental ones.
+
+::
+
+    python -m quiclick_server.replay base.ndjson inc1.ndjson inc2.ndjson -o out.ndjson
+
+The base is an NDJSON export or an SQLite snapshot
+(``GET /export?format=sqlite``). Each incremental export
+(``GET /export?format=ndjson&since=<marker>``) must continue from the marker
+of the file before it; a full NDJSON export in the chain starts over from
+itself. The result is a full NDJSON export, restorable with ``POST /import``.
+
+Only reading an SQLite base touches server code (and needs its ``QUICLICK_*``
+environment); NDJSON chains replay standalone.
+"""
+
+import argparse
+import json
+import sys
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Same values as routes.export_import.EXPORT_VERSION and snapshot._SQLITE_MAGIC
+EXPORT_VERSION = 1
+_SQLITE_MAGIC = b"SQLite format 3\x00"
+
+
+class ReplayError(Exception):
+    """The chain of exports can't be replayed."""
+
+
+class Replay:
+    """State of a user's data while export files are applied in order."""
+
+    def __init__(self):
+        self.started = False
+        self.marker: str | None = None
+        self.settings: dict | None = None
+        # Folder and bookmark records by id
+        self.items: dict[int, dict] = {}
+
+    def apply(self, lines: Iterable[bytes], name: str = "export"):
+        """Apply one NDJSON export (full or incremental)."""
+        records = (json.loads(line) for line in lines if line.strip())
+        header = next(records, None)
+        if header is None or header.get("type") != "header":
+            raise ReplayError(f"{name}: missing header record")
+        if header.get("version") != EXPORT_VERSION:
+            raise ReplayError(f"{name}: unsupported version {header.get('version')}")
+
+        since = header.get("since")
+        if since is None:
+            self.settings = None
+            self.items = {}
+        elif not self.started:
+            raise ReplayError(f"{name}: incremental export without a base")
+        elif since != self.marker:
+            raise ReplayError(
+                f"{name}: continues from marker {since}, expected {self.marker}"
+            )
+
+        live: set[int] | None = None
+        for record in records:
+            kind = record.get("type")
+            if kind == "settings":
+                self.settings = record
+            elif kind in ("folder", "bookmark"):
+                self.items[record["id"]] = record
+            elif kind == "ids":
+                live = (live or set()).union(record["ids"])
+            else:
+                raise ReplayError(f"{name}: unknown record type {kind!r}")
+        if live is not None:
+            self.items = {id: r for id, r in self.items.items() if id in live}
+
+        self.started = True
+        self.marker = header.get("marker")
+
+    def lines(self) -> Iterator[bytes]:
+        """Yield the replayed data as a full NDJSON export."""
+        yield _line(
+            {
+                "type": "header",
+                "version": EXPORT_VERSION,
+                "export_date": datetime.now(timezone.utc).isoformat(),
+                "marker": self.marker,
+            }
+        )
+        if self.settings is not None:
+            yield _line(self.settings)
+        ordered = [self.items[id] for id in sorted(self.items)]
+        for kind in ("folder", "bookmark"):
+            for record in ordered:
+                if record["type"] == kind:
+                    yield _line(record)
+
+
+def _line(record: dict) -> bytes:
+    line = json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+    return line.encode() + b"\n"
+
+
+def read_export(path: Path) -> Iterable[bytes]:
+    """NDJSON lines of an export file; SQLite snapshots are exported first."""
+    with path.open("rb") as f:
+        is_snapshot = f.read(len(_SQLITE_MAGIC)) == _SQLITE_MAGIC
+    if not is_snapshot:
+        with path.open("rb") as f:
+            yield from f
+        return
+
+    from quiclick_server.routes.export_import import iter_export_ndjson
+
+    for chunk in iter_export_ndjson(path):
+        yield from chunk.splitlines()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m quiclick_server.replay",
+        description="Apply incremental exports onto a base export.",
+    )
+    parser.add_argument("base", type=Path, help="NDJSON export or SQLite snapshot")
+    parser.add_argument(
+        "incrementals", type=Path, nargs="*", help="incremental NDJSON exports"
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, help="output file (default: stdout)"
+    )
+    args = parser.parse_args(argv)
+
+    replay = Replay()
+    try:
+        for path in [args.base, *args.incrementals]:
+            replay.apply(read_export(path), str(path))
+    except (OSError, ValueError, KeyError, ReplayError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    if args.output is None:
+        sys.stdout.buffer.writelines(replay.lines())
+    else:
+        with args.output.open("wb") as f:
+            f.writelines(replay.lines())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
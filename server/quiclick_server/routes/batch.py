@@ -0,0 +1,174 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from quiclick_server.database import get_db
+from quiclick_server.leases import request_device_id
+from quiclick_server.routes.bookmarks import (
+    _bookmark_to_response,
+    _commit,
+    _create_bookmark,
+    _delete_bookmark,
+    _update_bookmark_partial,
+)
+from quiclick_server.routes.folders import (
+    _create_folder,
+    _delete_folder,
+    _folder_to_response,
+    _update_folder,
+)
+from quiclick_server.routes.reorder import _reorder_items
+from quiclick_server.routes.settings import _patch_settings
+from quiclick_server.schemas import (
+    BatchOperation,
+    BatchRequest,
+    BatchResponse,
+    BatchResult,
+    BookmarkCreate,
+    BookmarkUpdate,
+    FolderCreate,
+    ReorderRequest,
+    SettingsPatch,
+    SettingsResponse,
+)
+
+router = APIRouter(tags=["batch"])
+
+
+def _resolve_ref(value: int | str, id_map: dict[str, int]) -> int:
+    """Map a local id created earlier in the batch to its server id."""
+    mapped = id_map.get(str(value))
+    if mapped is not None:
+        return mapped
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPException(status_code=404, detail=f"Unknown id {value!r}")
+
+
+def _target_id(op: BatchOperation, id_map: dict[str, int]) -> int:
+    if op.id is None:
+        raise HTTPException(status_code=422, detail=f"{op.type} requires an id")
+    return _resolve_ref(op.id, id_map)
+
+
+def _resolve_parent(payload: dict, id_map: dict[str, int]) -> dict:
+    if payload.get("parent_id") is None:
+        return payload
+    return {**payload, "parent_id": _resolve_ref(payload["parent_id"], id_map)}
+
+
+def _apply_operation(
+    db: Session, op: BatchOperation, id_map: dict[str, int], device_id: str | None
+) -> BatchResult:
+    """Apply a single operation and flush it (not committed)."""
+    payload = op.payload
+
+    if op.type == "create_bookmark":
+        bookmark = _create_bookmark(
+            db,
+            BookmarkCreate.model_validate(_resolve_parent(payload, id_map)),
+            device_id,
+        )
+        db.flush()
+        if op.local_id is not None:
+            id_map[str(op.local_id)] = bookmark.id
+        data = _bookmark_to_response(bookmark).model_dump(mode="json")
+        return BatchResult(status=201, id=bookmark.id, data=data)
+
+    if op.type == "update_bookmark":
+        body = BookmarkUpdate.model_validate(_resolve_parent(payload, id_map))
+        bookmark = _update_bookmark_partial(db, _target_id(op, id_map), body)
+        db.flush()
+        data = _bookmark_to_response(bookmark).model_dump(mode="json")
+        return BatchResult(status=200, id=bookmark.id, data=data)
+
+    if op.type == "delete_bookmark":
+        bookmark_id = _target_id(op, id_map)
+        _delete_bookmark(db, bookmark_id)
+        db.flush()
+        return BatchResult(status=204, id=bookmark_id)
+
+    if op.type == "create_folder":
+        folder = _create_folder(
+            db,
+            FolderCreate.model_validate(_resolve_parent(payload, id_map)),
+            device_id,
+        )
+        db.flush()
+        if op.local_id is not None:
+            id_map[str(op.local_id)] = folder.id
+        data = _folder_to_response(folder).model_dump(mode="json")
+        return BatchResult(status=201, id=folder.id, data=data)
+
+    if op.type == "update_folder":
+        body = FolderCreate.model_validate(payload)
+        folder = _update_folder(db, _target_id(op, id_map), body)
+        db.flush()
+        data = _folder_to_response(folder).model_dump(mode="json")
+        return BatchResult(status=200, id=folder.id, data=data)
+
+    if op.type == "delete_folder":
+        folder_id = _target_id(op, id_map)
+        _delete_folder(db, folder_id)
+        db.flush()
+        return BatchResult(status=204, id=folder_id)
+
+    if op.type == "reorder":
+        items = [
+            {**entry, "id": _resolve_ref(entry["id"], id_map)}
+            if isinstance(entry, dict) and "id" in entry
+            else entry
+            for entry in payload.get("items", [])
+        ]
+        _reorder_items(db, ReorderRequest.model_validate({**payload, "items": items}))
+        db.flush()
+        return BatchResult(status=200)
+
+    # update_settings
+    settings = _patch_settings(db, SettingsPatch.model_validate(payload))
+    db.flush()
+    data = SettingsResponse.model_validate(settings).model_dump(mode="json")
+    return BatchResult(status=200, data=data)
+
+
+@router.post("/batch", response_model=BatchResponse)
+def apply_batch(
+    body: BatchRequest,
+    device_id: str | None = Depends(request_device_id),
+    db: Session = Depends(get_db),
+):
+    """Apply an ordered list of sync-queue operations in one transaction.
+
+    Each operation runs in its own savepoint: a failing operation is rolled
+    back and reported with its status code while the rest still apply, like
+    the extension skipping a non-retryable queue item. Any other exception is
+    a server error, not a bad operation: the whole transaction is rolled
+    back, operations that already succeeded included, and the request fails
+    with a 500 so the client retries the batch as a whole. Returns
+    per-operation results and the local -> server id mapping for created
+    items.
+    """
+    id_map: dict[str, int] = {}
+    results: list[BatchResult] = []
+    for op in body.operations:
+        try:
+            with db.begin_nested():
+                result = _apply_operation(db, op, id_map, device_id)
+        except HTTPException as e:
+            result = BatchResult(status=e.status_code, detail=e.detail)
+        except ValidationError as e:
+            result = BatchResult(
+                status=422,
+                detail=e.errors(include_url=False, include_context=False),
+            )
+        except IntegrityError:
+            result = BatchResult(status=409, detail="Position conflict")
+        except Exception:
+            db.rollback()
+            raise
+        results.append(result)
+
+    _commit(db)
+    return BatchResponse(results=results, id_map=id_map)
@@ -1,39 +1,51 @@
-import base64
+import json
 from datetime import datetime, timezone
 from functools import partial
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import ValidationError
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from quiclick_server.database import get_db
+from quiclick_server import coalesce, etags, occupancy, pagination, queries
+from quiclick_server.bulk import (
+    PositionPlanner,
+    existing_url_keys,
+    first_unused_id,
+    insert_items,
+)
+from quiclick_server.database import get_current_user, get_db
+from quiclick_server.leases import check_leased_id, request_device_id
 from quiclick_server.models import Bookmark, Item, Position, Settings
 from quiclick_server.schemas import (
+    BookmarkBulkCreate,
+    BookmarkBulkResponse,
     BookmarkCreate,
     BookmarkResponse,
     BookmarkUpdate,
+    BulkRowResult,
+    DuplicateGroup,
+    DuplicatePolicy,
     ReorderItem,
     ReorderRequest,
 )
+from quiclick_server.serialization import (
+    bookmark_dict,
+    favicon_data_url,
+    json_response,
+    parse_favicon_data_url,
+    parse_fields,
+    projected_dict,
+)
+from quiclick_server.urls import normalize_url
 
 router = APIRouter(tags=["bookmarks"])
 
 
 def _favicon_to_data_url(bookmark: Bookmark) -> str | None:
     """Convert stored favicon blob + mime to a data URL string."""
-    if bookmark.favicon is None or bookmark.favicon_mime is None:
-        return None
-    b64 = base64.b64encode(bookmark.favicon).decode()
-    return f"data:{bookmark.favicon_mime};base64,{b64}"
-
-
-def _parse_favicon_data_url(data_url: str) -> tuple[bytes, str]:
-    """Parse a data URL into (raw_bytes, mime_type)."""
-    # Format: data:{mime};base64,{data}
-    header, b64_data = data_url.split(",", 1)
-    mime = header.split(":")[1].split(";")[0]
-    raw = base64.b64decode(b64_data)
-    return raw, mime
+    return favicon_data_url(bookmark.favicon, bookmark.favicon_mime)
 
 
 def _bookmark_to_response(bookmark: Bookmark) -> BookmarkResponse:
@@ -92,36 +104,93 @@ def _next_position(db: Session, parent_id: int | None) -> Position:
     return Position(max_x + 1, max_y)
 
 
-@router.get("", response_model=list[BookmarkResponse])
-def list_bookmarks(
-    folder_id: str | None = None,
-    db: Session = Depends(get_db),
-):
-    """List bookmarks. Optional ?folder_id= filter. Use folder_id=root for root level."""
-    query = db.query(Bookmark).filter(Bookmark.deleted_at.is_(None))
-    if folder_id is not None:
-        if folder_id == "root":
-            query = query.filter(Bookmark.parent_id.is_(None))
-        else:
-            try:
-                fid = int(folder_id)
-            except ValueError:
-                raise HTTPException(
-                    status_code=422, detail="folder_id must be an integer or 'root'"
-                )
-            query = query.filter(Bookmark.parent_id == fid)
-    bookmarks = query.order_by(Bookmark.position_y, Bookmark.position_x).all()
-    return [_bookmark_to_response(b) for b in bookmarks]
+def _item_cell(item: Item) -> occupancy.Cell:
+    return item.parent_id, item.position_x, item.position_y
 
 
-@router.post("", response_model=BookmarkResponse, status_code=201)
-def create_bookmark(
-    body: BookmarkCreate,
-    db: Session = Depends(get_db),
-):
-    """Create a new bookmark."""
+def _resolve_position(
+    db: Session,
+    parent_id: int | None,
+    position: Position,
+    current: occupancy.Cell | None = None,
+) -> Position:
+    """Return position if its cell is free, else the nearest free cell in scope."""
+    return occupancy.resolve_position(
+        db,
+        parent_id,
+        position,
+        tiles_per_row=_get_tiles_per_row(db),
+        current=current,
+    )
+
+
+def _resolve_reorder(
+    db: Session, entries: list[tuple[Item, Position]]
+) -> list[tuple[Item, Position]]:
+    """Resolve requested positions of items that move together.
+
+    Cells vacated by the moved items count as free; a requested cell that is
+    still occupied (or already claimed by an earlier entry) is replaced by the
+    nearest free cell.
+    """
+    tiles_per_row = _get_tiles_per_row(db)
+    grids: dict[int | None, occupancy.ScopeGrid] = {}
+    for item, _ in entries:
+        if item.parent_id not in grids:
+            grids[item.parent_id] = occupancy.scratch_grid(db, item.parent_id)
+        if item.deleted_at is None:
+            grids[item.parent_id].release(item.position_x, item.position_y)
+
+    resolved = []
+    for item, pos in entries:
+        if item.deleted_at is not None:
+            resolved.append((item, pos))
+            continue
+        grid = grids[item.parent_id]
+        x, y = grid.nearest_free(pos.x, pos.y, tiles_per_row)
+        grid.occupy(x, y)
+        resolved.append((item, Position(x, y)))
+    return resolved
+
+
+def _commit(db: Session):
+    """Commit, mapping a unique-index violation the occupancy index missed to 409."""
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        occupancy.discard(db)
+        raise HTTPException(status_code=409, detail="Position conflict")
+
+
+def _get_live_bookmark(db: Session, bookmark_id: int) -> Bookmark:
+    bookmark = db.get(Bookmark, bookmark_id)
+    if not bookmark or bookmark.deleted_at is not None:
+        raise HTTPException(status_code=404, detail="Bookmark not found")
+    return bookmark
+
+
+def _find_duplicate(db: Session, url: str) -> Bookmark | None:
+    """Oldest live bookmark with the normalized URL of ``url``, if any."""
+    return db.scalars(
+        select(Bookmark)
+        .where(Bookmark.url_key == normalize_url(url), Bookmark.deleted_at.is_(None))
+        .order_by(Bookmark.id)
+        .limit(1)
+    ).first()
+
+
+def _create_bookmark(
+    db: Session, body: BookmarkCreate, device_id: str | None
+) -> Bookmark:
+    """Add a new bookmark to the session (not committed).
+
+    A requested id must be leased to ``device_id``.
+    """
+    if body.id is not None:
+        check_leased_id(db, body.id, device_id)
     position = (
-        body.position
+        _resolve_position(db, body.parent_id, body.position)
         if body.position is not None
         else _next_position(db, body.parent_id)
     )
@@ -129,9 +198,10 @@ def create_bookmark(
     favicon_bytes = None
     favicon_mime = None
     if body.favicon:
-        favicon_bytes, favicon_mime = _parse_favicon_data_url(body.favicon)
+        favicon_bytes, favicon_mime = parse_favicon_data_url(body.favicon)
 
     bookmark = Bookmark(
+        id=body.id,
         title=body.title,
         url=body.url,
         favicon=favicon_bytes,
@@ -141,98 +211,356 @@ def create_bookmark(
         position_y=position.y,
     )
     db.add(bookmark)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Position conflict")
-    db.refresh(bookmark)
-    return _bookmark_to_response(bookmark)
-
+    return bookmark
 
-@router.get("/{bookmark_id}", response_model=BookmarkResponse)
-def get_bookmark(
-    bookmark_id: int,
-    db: Session = Depends(get_db),
-):
-    """Get a single bookmark by ID."""
-    bookmark = db.get(Bookmark, bookmark_id)
-    if not bookmark or bookmark.deleted_at is not None:
-        raise HTTPException(status_code=404, detail="Bookmark not found")
-    return _bookmark_to_response(bookmark)
 
+def _update_bookmark_full(
+    db: Session, bookmark_id: int, body: BookmarkCreate
+) -> Bookmark:
+    """Replace all fields of a bookmark (not committed)."""
+    bookmark = _get_live_bookmark(db, bookmark_id)
 
-@router.put("/{bookmark_id}", response_model=BookmarkResponse)
-def update_bookmark_full(
-    bookmark_id: int,
-    body: BookmarkCreate,
-    db: Session = Depends(get_db),
-):
-    """Full update of a bookmark."""
-    bookmark = db.get(Bookmark, bookmark_id)
-    if not bookmark or bookmark.deleted_at is not None:
-        raise HTTPException(status_code=404, detail="Bookmark not found")
+    current = _item_cell(bookmark)
+    requested = body.position if body.position is not None else bookmark.position
+    position = _resolve_position(db, body.parent_id, requested, current)
 
     bookmark.title = body.title
     bookmark.url = body.url
     bookmark.parent_id = body.parent_id
-    if body.position is not None:
-        bookmark.position_x = body.position.x
-        bookmark.position_y = body.position.y
+    bookmark.position_x = position.x
+    bookmark.position_y = position.y
 
     if body.favicon:
-        favicon_bytes, favicon_mime = _parse_favicon_data_url(body.favicon)
+        favicon_bytes, favicon_mime = parse_favicon_data_url(body.favicon)
         bookmark.favicon = favicon_bytes
         bookmark.favicon_mime = favicon_mime
     else:
         bookmark.favicon = None
         bookmark.favicon_mime = None
-
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Position conflict")
-    db.refresh(bookmark)
-    return _bookmark_to_response(bookmark)
+    return bookmark
 
 
-@router.patch("/{bookmark_id}", response_model=BookmarkResponse)
-def update_bookmark_partial(
-    bookmark_id: int,
-    body: BookmarkUpdate,
-    db: Session = Depends(get_db),
-):
-    """Partial update of a bookmark."""
-    bookmark = db.get(Bookmark, bookmark_id)
-    if not bookmark or bookmark.deleted_at is not None:
-        raise HTTPException(status_code=404, detail="Bookmark not found")
+def _update_bookmark_partial(
+    db: Session, bookmark_id: int, body: BookmarkUpdate
+) -> Bookmark:
+    """Apply the provided fields to a bookmark (not committed)."""
+    bookmark = _get_live_bookmark(db, bookmark_id)
 
     provided_fields = body.model_fields_set
     apply_patch = partial(apply_patch_field, bookmark, body, provided_fields)
 
+    # Resolve the target cell before touching attributes (avoids autoflush)
+    requested = bookmark.position
+    if "position" in provided_fields:
+        requested = check_not_none("position", body.position)
+    parent_id = (
+        body.parent_id if "parent_id" in provided_fields else bookmark.parent_id
+    )
+    position = _resolve_position(db, parent_id, requested, _item_cell(bookmark))
+
     apply_patch("title")
     apply_patch("url")
     apply_patch("parent_id", allow_none=True)
-    if "position" in provided_fields:
-        position = check_not_none("position", body.position)
-        bookmark.position_x = position.x
-        bookmark.position_y = position.y
+    bookmark.position_x = position.x
+    bookmark.position_y = position.y
     if "favicon" in provided_fields:
         if body.favicon is None:
             bookmark.favicon = None
             bookmark.favicon_mime = None
         else:
-            favicon_bytes, favicon_mime = _parse_favicon_data_url(body.favicon)
+            favicon_bytes, favicon_mime = parse_favicon_data_url(body.favicon)
             bookmark.favicon = favicon_bytes
             bookmark.favicon_mime = favicon_mime
+    return bookmark
 
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Position conflict")
+
+def _delete_bookmark(db: Session, bookmark_id: int):
+    """Soft-delete a bookmark (not committed)."""
+    bookmark = _get_live_bookmark(db, bookmark_id)
+    now = datetime.now(timezone.utc)
+    bookmark.deleted_at = now
+    bookmark.last_updated = now
+
+
+@router.get("", response_model=list[BookmarkResponse])
+def list_bookmarks(
+    request: Request,
+    folder_id: str | None = None,
+    fields: str | None = None,
+    limit: int | None = Query(None, ge=1),
+    page_token: str | None = None,
+    db: Session = Depends(get_db),
+    sub: str = Depends(get_current_user),
+):
+    """List bookmarks. Optional ?folder_id= filter. Use folder_id=root for root level.
+
+    ``?fields=id,position`` returns only those fields (``id`` always); the
+    other columns, e.g. favicons, aren't read at all.
+
+    ``?limit=`` (or a ``page_token``) returns one page in (position_y,
+    position_x, id) order; ``X-Next-Page-Token`` continues it.
+
+    Tagged with ``etags.listing_etag``; a matching If-None-Match gets a 304.
+    Concurrent requests for the same tag share one response (``coalesce``).
+    """
+    selected = parse_fields(fields)
+    etag = etags.listing_etag(db, request)
+    if (not_modified := etags.not_modified(request, etag)) is not None:
+        return not_modified
+    params = {}
+    if folder_id is None:
+        query = queries.LIVE_BOOKMARKS
+    elif folder_id == "root":
+        query = queries.ROOT_BOOKMARKS
+    else:
+        try:
+            params["parent_id"] = int(folder_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=422, detail="folder_id must be an integer or 'root'"
+            )
+        query = queries.FOLDER_BOOKMARKS
+
+    def render():
+        headers = {"ETag": etag} if etag else {}
+        if limit is None and page_token is None:
+            rows = db.connection().execute(queries.project(query, selected), params)
+            return json_response(_bookmark_dicts(rows, selected), headers=headers)
+
+        # Keyset page: the sort key of the last row makes the next token
+        scope = f"bookmarks?folder_id={folder_id or ''}"
+        size = pagination.page_size(limit)
+        params["limit"] = size + 1
+        if page_token is not None:
+            state = pagination.decode_token(page_token, scope, key_length=3)
+            params["after_y"], params["after_x"], params["after_id"] = state["after"]
+        read = selected
+        if read is not None and "position" not in read:
+            read += ("position",)
+        page = queries.grid_page(query, page_token is None)
+        rows = db.connection().execute(queries.project(page, read), params).all()
+        if len(rows) > size:
+            rows = rows[:size]
+            last = rows[-1]
+            headers[pagination.NEXT_PAGE_HEADER] = pagination.encode_token(
+                scope, [last.position_y, last.position_x, last.id]
+            )
+        return json_response(_bookmark_dicts(rows, selected), headers=headers)
+
+    return coalesce.respond(sub, "bookmarks", etag, render)
+
+
+def _bookmark_dicts(rows, fields: tuple[str, ...] | None) -> list[dict]:
+    if fields is None:
+        return [bookmark_dict(row) for row in rows]
+    return [projected_dict(row, fields) for row in rows]
+
+
+@router.post("", response_model=BookmarkResponse, status_code=201)
+def create_bookmark(
+    body: BookmarkCreate,
+    response: Response,
+    on_duplicate: DuplicatePolicy = "create",
+    device_id: str | None = Depends(request_device_id),
+    db: Session = Depends(get_db),
+):
+    """Create a new bookmark.
+
+    An occupied requested position is moved to the nearest free cell. With
+    ``?on_duplicate=skip``, if a live bookmark already has the same
+    normalized URL (``urls.normalize_url``) the oldest such bookmark is
+    returned instead, with status 200.
+    """
+    if on_duplicate == "skip":
+        existing = _find_duplicate(db, body.url)
+        if existing is not None:
+            response.status_code = 200
+            return _bookmark_to_response(existing)
+    bookmark = _create_bookmark(db, body, device_id)
+    _commit(db)
+    db.refresh(bookmark)
+    return _bookmark_to_response(bookmark)
+
+
+@router.post("/bulk", response_model=BookmarkBulkResponse)
+def create_bookmarks_bulk(
+    body: BookmarkBulkCreate,
+    on_duplicate: DuplicatePolicy = "create",
+    device_id: str | None = Depends(request_device_id),
+    db: Session = Depends(get_db),
+):
+    """Create many bookmarks in one transaction.
+
+    Positions are assigned in one pass (requested cells first, then the rest
+    appended in input order) and rows are inserted with Core executemany.
+    Invalid rows are reported in ``results`` and skipped without aborting
+    the batch.
+
+    With ``?on_duplicate=skip`` rows whose normalized URL a live bookmark or
+    an earlier row already has are not created; their result has status 200
+    and the id of that bookmark.
+    """
+    results: list[BulkRowResult | None] = [None] * len(body.bookmarks)
+    parsed: list[tuple[int, BookmarkCreate]] = []
+    for index, raw in enumerate(body.bookmarks):
+        try:
+            parsed.append((index, BookmarkCreate.model_validate(raw)))
+        except ValidationError as e:
+            results[index] = BulkRowResult(
+                status=422, detail=e.errors(include_url=False, include_context=False)
+            )
+
+    url_keys = None
+    if on_duplicate == "skip":
+        keys = {index: normalize_url(row.url) for index, row in parsed}
+        url_keys = existing_url_keys(db, set(keys.values()))
+    first_rows: dict[str, int] = {}  # url_key -> index of the row creating it
+    duplicates: list[tuple[int, str]] = []
+    valid: list[tuple[int, BookmarkCreate]] = []
+    leased_ids: set[int] = set()
+    for index, row in parsed:
+        key = keys[index] if url_keys is not None else None
+        if key is not None and (key in url_keys or key in first_rows):
+            duplicates.append((index, key))
+            continue
+        try:
+            if row.id is not None:
+                if row.id in leased_ids:
+                    raise HTTPException(
+                        status_code=409, detail=f"Id {row.id} already exists"
+                    )
+                check_leased_id(db, row.id, device_id)
+                leased_ids.add(row.id)
+        except HTTPException as e:
+            results[index] = BulkRowResult(status=e.status_code, detail=e.detail)
+        else:
+            valid.append((index, row))
+            if key is not None:
+                first_rows[key] = index
+
+    planner = PositionPlanner(db, _get_tiles_per_row(db))
+    positions: dict[int, Position] = {}
+    for index, row in valid:
+        if row.position is not None:
+            positions[index] = planner.place(row.parent_id, row.position)
+    for index, row in valid:
+        if row.position is None:
+            positions[index] = planner.append(row.parent_id)
+
+    next_id = first_unused_id(db)
+    rows = []
+    for index, row in valid:
+        if row.id is not None:
+            item_id = row.id
+        else:
+            item_id = next_id
+            next_id += 1
+        favicon_bytes = None
+        favicon_mime = None
+        if row.favicon:
+            favicon_bytes, favicon_mime = parse_favicon_data_url(row.favicon)
+        position = positions[index]
+        rows.append(
+            {
+                "id": item_id,
+                "title": row.title,
+                "url": row.url,
+                "favicon": favicon_bytes,
+                "favicon_mime": favicon_mime,
+                "parent_id": row.parent_id,
+                "position_x": position.x,
+                "position_y": position.y,
+            }
+        )
+        results[index] = BulkRowResult.model_construct(
+            status=201, id=item_id, position=position, detail=None
+        )
+
+    for index, key in duplicates:
+        duplicate_of = url_keys.get(key) or results[first_rows[key]].id
+        results[index] = BulkRowResult(
+            status=200, id=duplicate_of, detail="Duplicate URL"
+        )
+
+    insert_items(db, bookmarks=rows)
+    _commit(db)
+    return BookmarkBulkResponse(created=len(rows), results=results)
+
+
+@router.get("/duplicates", response_model=list[DuplicateGroup])
+def list_duplicates(
+    request: Request,
+    db: Session = Depends(get_db),
+    sub: str = Depends(get_current_user),
+):
+    """Groups of live bookmarks with the same normalized URL.
+
+    One grouped scan of ``ix_items_url_key``; groups are ordered by their
+    oldest bookmark. Tagged like the listings (``etags.listing_etag``).
+    """
+    etag = etags.listing_etag(db, request)
+    if (not_modified := etags.not_modified(request, etag)) is not None:
+        return not_modified
+    headers = {"ETag": etag} if etag else {}
+
+    def render():
+        rows = db.connection().execute(queries.DUPLICATES)
+        groups = [
+            {"url_key": row.url_key, "ids": sorted(json.loads(row.ids))}
+            for row in rows
+        ]
+        return json_response(groups, headers=headers)
+
+    return coalesce.respond(sub, "duplicates", etag, render)
+
+
+@router.get("/{bookmark_id}", response_model=BookmarkResponse)
+def get_bookmark(
+    bookmark_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Get a single bookmark by ID (conditional on If-None-Match)."""
+    etag = etags.bookmark_etag(db, bookmark_id)
+    if (not_modified := etags.not_modified(request, etag)) is not None:
+        return not_modified
+    bookmark = _get_live_bookmark(db, bookmark_id)
+    response.headers["ETag"] = etag
+    return _bookmark_to_response(bookmark)
+
+
+@router.put("/{bookmark_id}", response_model=BookmarkResponse)
+def update_bookmark_full(
+    bookmark_id: int,
+    body: BookmarkCreate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Full update of a bookmark (conditional on If-Match)."""
+    etags.check_if_match(request, lambda: etags.bookmark_etag(db, bookmark_id))
+    bookmark = _update_bookmark_full(db, bookmark_id, body)
+    _commit(db)
+    db.refresh(bookmark)
+    response.headers["ETag"] = etags.bookmark_etag(db, bookmark_id)
+    return _bookmark_to_response(bookmark)
+
+
+@router.patch("/{bookmark_id}", response_model=BookmarkResponse)
+def update_bookmark_partial(
+    bookmark_id: int,
+    body: BookmarkUpdate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Partial update of a bookmark (conditional on If-Match)."""
+    etags.check_if_match(request, lambda: etags.bookmark_etag(db, bookmark_id))
+    bookmark = _update_bookmark_partial(db, bookmark_id, body)
+    _commit(db)
     db.refresh(bookmark)
+    response.headers["ETag"] = etags.bookmark_etag(db, bookmark_id)
     return _bookmark_to_response(bookmark)
 
 
@@ -242,12 +570,7 @@ def delete_bookmark(
     db: Session = Depends(get_db),
 ):
     """Soft-delete a bookmark (set deleted_at instead of removing)."""
-    bookmark = db.get(Bookmark, bookmark_id)
-    if not bookmark or bookmark.deleted_at is not None:
-        raise HTTPException(status_code=404, detail="Bookmark not found")
-    now = datetime.now(timezone.utc)
-    bookmark.deleted_at = now
-    bookmark.last_updated = now
+    _delete_bookmark(db, bookmark_id)
     db.commit()
 
 
@@ -265,6 +588,7 @@ def reorder_bookmarks(
                 status_code=404, detail=f"Bookmark {entry.id} not found"
             )
         items.append((bookmark, entry.position))
+    items = _resolve_reorder(db, items)
 
     # Temporary negative positions to avoid intermediate conflicts
     for idx, (bookmark, _) in enumerate(items):
@@ -276,5 +600,5 @@ def reorder_bookmarks(
         bookmark.position_x = pos.x
         bookmark.position_y = pos.y
 
-    db.commit()
+    _commit(db)
     return {"detail": "Reordered"}
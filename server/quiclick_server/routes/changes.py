@@ -1,16 +1,28 @@
 from datetime import datetime, timezone
 from email.utils import format_datetime, parsedate_to_datetime
+from functools import partial
 
-from fastapi import APIRouter, Depends, Request
-from fastapi.responses import JSONResponse, Response
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
-from quiclick_server.database import get_current_user, get_db
-from quiclick_server.models import Bookmark, Folder, Item, Settings
-from quiclick_server.routes.bookmarks import _bookmark_to_response
-from quiclick_server.routes.folders import _folder_to_response
+from quiclick_server import coalesce, pagination, queries, sync_cache
+from quiclick_server.database import (
+    data_version,
+    get_current_user,
+    get_db,
+    user_db_path,
+)
+from quiclick_server.importer import from_micros, to_micros
 from quiclick_server.schemas import ChangesResponse, SettingsWithTimestamp, UserResponse
+from quiclick_server.serialization import (
+    bookmark_dict,
+    folder_dict,
+    folder_fields,
+    json_response,
+    parse_fields,
+    projected_dict,
+)
 
 router = APIRouter(tags=["changes"])
 
@@ -18,13 +30,27 @@ router = APIRouter(tags=["changes"])
 @router.get("/changes")
 def get_changes(
     request: Request,
+    fields: str | None = None,
+    limit: int | None = Query(None, ge=1),
+    page_token: str | None = None,
     db: Session = Depends(get_db),
     sub: str = Depends(get_current_user),
 ):
     """
     Delta sync endpoint. Returns items changed since If-Modified-Since.
     Returns 304 if nothing changed. Includes user info for auth check.
+
+    ``?fields=`` limits the fields of bookmarks and folders (see
+    ``GET /bookmarks``).
+
+    ``?limit=`` (or a ``page_token``) returns the changes in keyset pages,
+    see ``_changes_page``.
+
+    Full pulls (no If-Modified-Since) are served from ``sync_cache`` while
+    the user's data is unchanged. Concurrent identical requests share one
+    response (``coalesce``).
     """
+    selected = parse_fields(fields)
     # Parse If-Modified-Since header
     since = None
     ims_header = request.headers.get("If-Modified-Since")
@@ -43,15 +69,87 @@ def get_changes(
         email=request.session.get("email", ""),
         name=request.session.get("name"),
     )
+    db_path = user_db_path(sub)
+    version = data_version(db_path)
+    if limit is not None or page_token is not None:
+        render = partial(_changes_page, db, user, since, selected, limit, page_token)
+    elif since is not None:
+        render = partial(_changes_since, db, user, since, selected)
+    else:
+        render = None
+    # Everything the response depends on, stamped before reading
+    validator = None
+    if version is not None:
+        validator = (
+            version,
+            render is None,
+            request.url.query,
+            ims_header,
+            user.email,
+            user.name,
+        )
+    if render is not None:
+        return coalesce.respond(sub, "changes", validator, render)
+
+    cache_version = (version, user.email, user.name)
+    kind = "changes" if selected is None else f"changes?fields={','.join(selected)}"
+    entry = sync_cache.lookup(db_path, kind, cache_version)
+    if entry is None:
+        full_pull = partial(_changes_since, db, user, None, selected)
+        entry = coalesce.run(
+            sub,
+            "changes",
+            validator,
+            lambda: sync_cache.store(db_path, kind, cache_version, full_pull()),
+        )
+    return sync_cache.respond(request, entry)
+
 
+def _latest(conn):
+    """Newest item/settings ``last_updated`` (aware) and the settings row."""
     # Find the max last_updated across all items and settings
-    max_item_ts = db.query(func.max(Item.last_updated)).scalar()
-    settings = db.get(Settings, 1)
+    max_item_ts = conn.execute(queries.MAX_ITEM_UPDATED).scalar()
+    settings = conn.execute(queries.SETTINGS).first()
     max_settings_ts = settings.last_updated if settings else None
 
     # Compute overall max timestamp
     timestamps = [t for t in [max_item_ts, max_settings_ts] if t is not None]
     if not timestamps:
+        return None, settings
+    max_ts = max(timestamps)
+    # Ensure max_ts is timezone-aware for comparison
+    if max_ts.tzinfo is None:
+        max_ts = max_ts.replace(tzinfo=timezone.utc)
+    return max_ts, settings
+
+
+def _settings_since(settings, since: datetime | None):
+    """The settings if changed after ``since`` (always if ``None``)."""
+    if settings is None:
+        return None
+    if since is not None:
+        # Settings: include only if changed since
+        settings_ts = settings.last_updated
+        if settings_ts is None:
+            return None
+        if settings_ts.tzinfo is None:
+            settings_ts = settings_ts.replace(tzinfo=timezone.utc)
+        if settings_ts <= since:
+            return None
+    return SettingsWithTimestamp.model_validate(settings)
+
+
+def _changes_since(
+    db: Session,
+    user: UserResponse,
+    since: datetime | None,
+    fields: tuple[str, ...] | None = None,
+):
+    """Render the changes after ``since`` (everything if ``None``)."""
+    conn = db.connection()
+    folder_selected = folder_fields(fields)
+    max_ts, settings = _latest(conn)
+    if max_ts is None:
         # No data at all — return empty response
         resp = ChangesResponse(
             user=user,
@@ -60,13 +158,7 @@ def get_changes(
             settings=None,
             deleted_ids=[],
         )
-        return resp
-
-    max_ts = max(timestamps)
-
-    # Ensure max_ts is timezone-aware for comparison
-    if max_ts.tzinfo is None:
-        max_ts = max_ts.replace(tzinfo=timezone.utc)
+        return json_response(resp)
 
     # Check if we can return 304
     if since is not None and max_ts <= since:
@@ -74,67 +166,137 @@ def get_changes(
 
     # Query changed items
     if since is not None:
-        changed_bookmarks = (
-            db.query(Bookmark)
-            .filter(Bookmark.last_updated > since, Bookmark.deleted_at.is_(None))
-            .order_by(Bookmark.position)
-            .all()
+        params = {"since": since}
+        changed_bookmarks = conn.execute(
+            queries.project(queries.CHANGED_BOOKMARKS, fields), params
         )
-        changed_folders = (
-            db.query(Folder)
-            .filter(Folder.last_updated > since, Folder.deleted_at.is_(None))
-            .order_by(Folder.position)
-            .all()
+        changed_folders = conn.execute(
+            queries.project(queries.CHANGED_FOLDERS, folder_selected), params
         )
         # Deleted items since the given time
-        deleted_items = (
-            db.query(Item.id)
-            .filter(
-                Item.deleted_at.is_not(None),
-                Item.last_updated > since,
-            )
-            .all()
-        )
-        deleted_ids = [row[0] for row in deleted_items]
+        deleted_ids = list(conn.execute(queries.DELETED_IDS, params).scalars())
 
-        # Settings: include only if changed since
-        changed_settings = None
-        if settings and settings.last_updated is not None:
-            settings_ts = settings.last_updated
-            if settings_ts.tzinfo is None:
-                settings_ts = settings_ts.replace(tzinfo=timezone.utc)
-            if settings_ts > since:
-                changed_settings = SettingsWithTimestamp.model_validate(settings)
+        changed_settings = _settings_since(settings, since)
     else:
         # Full pull — return everything
-        changed_bookmarks = (
-            db.query(Bookmark)
-            .filter(Bookmark.deleted_at.is_(None))
-            .order_by(Bookmark.position)
-            .all()
-        )
-        changed_folders = (
-            db.query(Folder)
-            .filter(Folder.deleted_at.is_(None))
-            .order_by(Folder.position)
-            .all()
+        changed_bookmarks = conn.execute(queries.project(queries.ALL_BOOKMARKS, fields))
+        changed_folders = conn.execute(
+            queries.project(queries.ALL_FOLDERS, folder_selected)
         )
         deleted_ids = []
-        changed_settings = (
-            SettingsWithTimestamp.model_validate(settings) if settings else None
-        )
+        changed_settings = _settings_since(settings, None)
 
-    resp = ChangesResponse(
-        user=user,
-        bookmarks=[_bookmark_to_response(b) for b in changed_bookmarks],
-        folders=[_folder_to_response(f) for f in changed_folders],
-        settings=changed_settings,
-        deleted_ids=deleted_ids,
-    )
+    # Same shape as ChangesResponse, without a model per row
+    if fields is None:
+        bookmarks = [bookmark_dict(b) for b in changed_bookmarks]
+        folders = [folder_dict(f) for f in changed_folders]
+    else:
+        bookmarks = [projected_dict(b, fields) for b in changed_bookmarks]
+        folders = [projected_dict(f, folder_selected) for f in changed_folders]
+    content = {
+        "user": user,
+        "bookmarks": bookmarks,
+        "folders": folders,
+        "settings": changed_settings,
+        "deleted_ids": deleted_ids,
+    }
 
     # Set Last-Modified header
     last_modified = format_datetime(max_ts, usegmt=True)
-    return JSONResponse(
-        content=resp.model_dump(mode="json"),
-        headers={"Last-Modified": last_modified},
-    )
+    return json_response(content, headers={"Last-Modified": last_modified})
+
+
+# Sorts after every id, so a first page after (since, _MAX_ID) starts with
+# the rows updated after ``since``
+_MAX_ID = 2**63 - 1
+
+
+def _changes_page(
+    db: Session,
+    user: UserResponse,
+    since: datetime | None,
+    fields: tuple[str, ...] | None,
+    limit: int | None,
+    page_token: str | None,
+):
+    """Render one page of the changes after ``since`` (everything if ``None``).
+
+    Pages walk every item in (last_updated, id) order; the token carries
+    the position plus the pull's ``since`` and ``start`` (the newest change
+    when a full pull began, older deletions are left out of it). An item
+    changed while paging moves past the cursor and comes again on a later
+    page, so only the last page (without ``X-Next-Page-Token``) completes
+    the pull: it carries the settings and the Last-Modified to send as the
+    next If-Modified-Since.
+    """
+    conn = db.connection()
+    size = pagination.page_size(limit)
+    if page_token is not None:
+        state = pagination.decode_token(page_token, "changes", key_length=2)
+        after_ts, after_id = state["after"]
+        since_us, start_us = state.get("since"), state.get("start")
+        if start_us is None:
+            raise HTTPException(status_code=422, detail="Invalid page token")
+        since = None if since_us is None else from_micros(since_us)
+    else:
+        max_ts, _ = _latest(conn)
+        if since is not None and max_ts is not None and max_ts <= since:
+            return Response(status_code=304)
+        if since is not None:
+            since_us = start_us = to_micros(since)
+            after_ts, after_id = since_us, _MAX_ID
+        else:
+            since_us, start_us = None, to_micros(max_ts) if max_ts else 0
+            after_ts, after_id = 0, 0
+
+    read = fields
+    if read is not None:
+        read += ("type", "last_updated", "deleted_at")
+    rows = conn.execute(
+        queries.project(queries.CHANGES_PAGE, read),
+        {
+            "after_ts": from_micros(after_ts),
+            "after_id": after_id,
+            "start": from_micros(start_us),
+            "limit": size + 1,
+        },
+    ).all()
+
+    folder_selected = folder_fields(fields)
+    bookmarks, folders, deleted_ids = [], [], []
+    for row in rows[:size]:
+        if row.deleted_at is not None:
+            deleted_ids.append(row.id)
+        elif row.type == "bookmark":
+            bookmarks.append(
+                bookmark_dict(row) if fields is None else projected_dict(row, fields)
+            )
+        else:
+            folders.append(
+                folder_dict(row)
+                if fields is None
+                else projected_dict(row, folder_selected)
+            )
+    content = {
+        "user": user,
+        "bookmarks": bookmarks,
+        "folders": folders,
+        "settings": None,
+        "deleted_ids": deleted_ids,
+    }
+
+    headers = {}
+    if len(rows) > size:
+        last = rows[size - 1]
+        headers[pagination.NEXT_PAGE_HEADER] = pagination.encode_token(
+            "changes",
+            [to_micros(last.last_updated), last.id],
+            since=since_us,
+            start=start_us,
+        )
+    else:
+        max_ts, settings = _latest(conn)
+        content["settings"] = _settings_since(settings, since)
+        if max_ts is not None:
+            headers["Last-Modified"] = format_datetime(max_ts, usegmt=True)
+    return json_response(content, headers=headers)
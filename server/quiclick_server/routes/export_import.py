@@ -1,31 +1,470 @@
-import base64
+import codecs
+import json
+from collections.abc import AsyncIterator, Iterator
 from datetime import datetime, timezone
+from pathlib import Path
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException
+import msgpack
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from quiclick_server.database import get_db
+from quiclick_server import occupancy, sync_cache
+from quiclick_server.config import cfg
+from quiclick_server.database import (
+    create_user_engine,
+    data_version,
+    get_current_user,
+    get_db,
+    user_db_path,
+)
+from quiclick_server.html_import import NetscapeBookmarkImporter
+from quiclick_server.importer import (
+    MSGPACK_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    ImportWriter,
+    MergeWriter,
+    from_micros,
+    import_stream,
+    limit_body,
+    to_micros,
+)
 from quiclick_server.models import Bookmark, Folder, Item, Settings
+from quiclick_server.routes.bookmarks import _commit, _get_tiles_per_row
+from quiclick_server.snapshot import (
+    SQLITE_MEDIA_TYPE,
+    create_snapshot,
+    iter_snapshot,
+    receive_snapshot,
+    restore_snapshot,
+)
 from quiclick_server.schemas import (
+    DuplicatePolicy,
     ExportBookmark,
     ExportData,
     ExportFolder,
+    ImportChanges,
+    ImportResponse,
     SettingsResponse,
 )
+from quiclick_server.serialization import favicon_data_url
 
 router = APIRouter(tags=["export_import"])
 
+EXPORT_VERSION = 1
+
+# Rows fetched from the cursor (and encoded into one chunk) at a time
+_STREAM_BATCH = 500
+
 
 def _bookmark_favicon_data_url(bm: Bookmark) -> str | None:
-    if bm.favicon is None or bm.favicon_mime is None:
-        return None
-    b64 = base64.b64encode(bm.favicon).decode()
-    return f"data:{bm.favicon_mime};base64,{b64}"
+    return favicon_data_url(bm.favicon, bm.favicon_mime)
+
+
+def _ndjson_line(record: dict) -> bytes:
+    line = json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+    return line.encode() + b"\n"
+
+
+def _iso(ts: datetime | None) -> str | None:
+    return ts.isoformat() if ts is not None else None
+
+
+_items = Item.__table__
+
+_SETTINGS_QUERY = select(
+    Settings.show_titles,
+    Settings.tiles_per_row,
+    Settings.tile_gap,
+    Settings.show_add_button,
+).where(Settings.id == 1)
+
+_FOLDERS_QUERY = (
+    select(
+        _items.c.id,
+        _items.c.title,
+        _items.c.date_added,
+        _items.c.parent_id,
+        _items.c.position_x,
+        _items.c.position_y,
+    )
+    .where(_items.c.type == "folder", _items.c.deleted_at.is_(None))
+    .order_by(_items.c.id)
+)
+
+_BOOKMARKS_QUERY = (
+    select(
+        _items.c.id,
+        _items.c.title,
+        _items.c.url,
+        _items.c.favicon,
+        _items.c.favicon_mime,
+        _items.c.date_added,
+        _items.c.parent_id,
+        _items.c.position_x,
+        _items.c.position_y,
+    )
+    .where(_items.c.type == "bookmark", _items.c.deleted_at.is_(None))
+    .order_by(_items.c.id)
+)
+
+_LIVE_IDS_QUERY = (
+    select(_items.c.id).where(_items.c.deleted_at.is_(None)).order_by(_items.c.id)
+)
+
+
+def export_marker(conn) -> int | None:
+    """Marker of the data an export reflects, ``None`` for an empty account.
+
+    It is the newest ``last_updated`` of any item (deleted ones included) or
+    the settings, in microseconds. An export taken later with
+    ``since=marker`` only has to contain rows updated after it.
+    """
+    newest = [
+        ts
+        for ts in (
+            conn.scalar(select(func.max(_items.c.last_updated))),
+            conn.scalar(select(Settings.last_updated).where(Settings.id == 1)),
+        )
+        if ts is not None
+    ]
+    return to_micros(max(newest)) if newest else None
+
+
+def _parse_marker(marker: str) -> int:
+    try:
+        value = int(marker)
+        from_micros(value)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=422, detail="Invalid export marker")
+    return value
+
+
+def iter_export_ndjson(
+    db_path: Path, since: int | None = None
+) -> Iterator[bytes]:
+    """Yield a user's data as NDJSON, straight from a DB cursor.
+
+    Records carry a ``type``: one ``header`` (version, export_date, marker),
+    then ``settings`` if present, every ``folder`` and every ``bookmark``, with
+    the same fields as ``ExportFolder``/``ExportBookmark``. Rows are fetched
+    in batches of ``_STREAM_BATCH`` so memory stays constant regardless of
+    account size. Opens its own connection because the response body is
+    produced after the route returns.
+
+    With ``since`` (the marker of an earlier export) the export is
+    incremental: the header repeats ``since``, only settings and items
+    updated after it follow, and if any item changed, ``ids`` records list
+    every live item so deletions (soft or by a replacing import) are implied.
+    An unchanged account yields the header alone. If the data is older than
+    ``since`` (e.g. a snapshot was restored) a full export is produced.
+    """
+    engine = create_user_engine(db_path)
+    try:
+        with engine.connect() as conn:
+            yield from _iter_ndjson(conn, since)
+    finally:
+        engine.dispose()
+
+
+def _is_incremental(marker: int | None, since: int | None) -> bool:
+    return since is not None and marker is not None and marker >= since
+
+
+def _iter_ndjson(conn, since: int | None) -> Iterator[bytes]:
+    """Yield the NDJSON export ``iter_export_ndjson`` describes from ``conn``."""
+    marker = export_marker(conn)
+    header = {
+        "type": "header",
+        "version": EXPORT_VERSION,
+        "export_date": datetime.now(timezone.utc).isoformat(),
+        "marker": str(marker) if marker is not None else None,
+    }
+    if not _is_incremental(marker, since):
+        yield _ndjson_line(header)
+        yield from _iter_ndjson_records(
+            conn, _SETTINGS_QUERY, _FOLDERS_QUERY, _BOOKMARKS_QUERY
+        )
+        return
+
+    yield _ndjson_line({**header, "since": str(since)})
+    if marker == since:
+        return
+    since_ts = from_micros(since).replace(tzinfo=None)
+    yield from _iter_ndjson_records(
+        conn,
+        _SETTINGS_QUERY.where(Settings.last_updated > since_ts),
+        _FOLDERS_QUERY.where(_items.c.last_updated > since_ts),
+        _BOOKMARKS_QUERY.where(_items.c.last_updated > since_ts),
+    )
+    items_changed = conn.scalar(
+        select(_items.c.id).where(_items.c.last_updated > since_ts).limit(1)
+    )
+    if items_changed is not None:
+        streaming = conn.execution_options(yield_per=_STREAM_BATCH)
+        empty = True
+        for rows in streaming.execute(_LIVE_IDS_QUERY).partitions():
+            ids = [row.id for row in rows]
+            yield _ndjson_line({"type": "ids", "ids": ids})
+            empty = False
+        if empty:
+            yield _ndjson_line({"type": "ids", "ids": []})
+
+
+def _iter_ndjson_records(
+    conn, settings_query, folders_query, bookmarks_query
+) -> Iterator[bytes]:
+    """Yield the settings, folder and bookmark records the queries select."""
+    settings = conn.execute(settings_query).first()
+    if settings is not None:
+        yield _ndjson_line({"type": "settings", **settings._asdict()})
+
+    streaming = conn.execution_options(yield_per=_STREAM_BATCH)
+    for rows in streaming.execute(folders_query).partitions():
+        yield b"".join(
+            _ndjson_line(
+                {
+                    "type": "folder",
+                    "id": f.id,
+                    "title": f.title,
+                    "date_added": _iso(f.date_added),
+                    "parent_id": f.parent_id,
+                    "position": [f.position_x, f.position_y],
+                }
+            )
+            for f in rows
+        )
+    for rows in streaming.execute(bookmarks_query).partitions():
+        yield b"".join(
+            _ndjson_line(
+                {
+                    "type": "bookmark",
+                    "id": bm.id,
+                    "title": bm.title,
+                    "url": bm.url,
+                    "favicon": favicon_data_url(bm.favicon, bm.favicon_mime),
+                    "date_added": _iso(bm.date_added),
+                    "parent_id": bm.parent_id,
+                    "position": [bm.position_x, bm.position_y],
+                }
+            )
+            for bm in rows
+        )
+
+
+def iter_export_msgpack(db_path: Path) -> Iterator[bytes]:
+    """Yield a user's data as one MessagePack ``ExportData`` map.
+
+    Same structure as the JSON export, but favicons are raw bytes with a
+    separate ``favicon_mime`` and timestamps are integer microseconds since
+    the epoch (UTC). Streamed from the cursor like ``iter_export_ndjson``:
+    the folder and bookmark counts are read first so the array headers can
+    be written before the rows.
+    """
+    packer = msgpack.Packer()
+    engine = create_user_engine(db_path)
+    try:
+        with engine.connect() as conn:
+            # One read transaction, so the counts match the rows
+            folder_count = conn.scalar(
+                select(func.count()).select_from(_FOLDERS_QUERY.subquery())
+            )
+            bookmark_count = conn.scalar(
+                select(func.count()).select_from(_BOOKMARKS_QUERY.subquery())
+            )
+            settings = conn.execute(_SETTINGS_QUERY).first()
+
+            yield packer.pack_map_header(5) + b"".join(
+                [
+                    packer.pack("version"),
+                    packer.pack(EXPORT_VERSION),
+                    packer.pack("export_date"),
+                    packer.pack(to_micros(datetime.now(timezone.utc))),
+                    packer.pack("settings"),
+                    packer.pack(settings._asdict() if settings is not None else None),
+                    packer.pack("folders"),
+                    packer.pack_array_header(folder_count),
+                ]
+            )
+
+            streaming = conn.execution_options(yield_per=_STREAM_BATCH)
+            for rows in streaming.execute(_FOLDERS_QUERY).partitions():
+                yield b"".join(
+                    packer.pack(
+                        {
+                            "id": f.id,
+                            "title": f.title,
+                            "date_added": to_micros(f.date_added),
+                            "parent_id": f.parent_id,
+                            "position": [f.position_x, f.position_y],
+                        }
+                    )
+                    for f in rows
+                )
+            yield packer.pack("bookmarks") + packer.pack_array_header(bookmark_count)
+            for rows in streaming.execute(_BOOKMARKS_QUERY).partitions():
+                yield b"".join(
+                    packer.pack(
+                        {
+                            "id": bm.id,
+                            "title": bm.title,
+                            "url": bm.url,
+                            "favicon": bm.favicon,
+                            "favicon_mime": bm.favicon_mime,
+                            "date_added": to_micros(bm.date_added),
+                            "parent_id": bm.parent_id,
+                            "position": [bm.position_x, bm.position_y],
+                        }
+                    )
+                    for bm in rows
+                )
+    finally:
+        engine.dispose()
+
+
+EXPORT_FORMATS = {
+    "json": "application/json",
+    "ndjson": NDJSON_MEDIA_TYPE,
+    "msgpack": MSGPACK_MEDIA_TYPE,
+    "sqlite": SQLITE_MEDIA_TYPE,
+}
+
+
+def _export_format(request: Request, format: str | None) -> str:
+    """Pick the export format from ``?format=`` or else the Accept header."""
+    if format is not None:
+        if format not in EXPORT_FORMATS:
+            raise HTTPException(
+                status_code=422, detail=f"Unknown export format {format!r}"
+            )
+        return format
+    accept = request.headers.get("Accept", "")
+    for name, media_type in EXPORT_FORMATS.items():
+        if name != "json" and media_type in accept:
+            return name
+    return "json"
 
 
 @router.get("/export", response_model=ExportData)
-def export_data(db: Session = Depends(get_db)):
-    """Export all user data as JSON."""
+def export_data(
+    request: Request,
+    format: str | None = None,
+    since: str | None = None,
+    db: Session = Depends(get_db),
+    sub: str = Depends(get_current_user),
+):
+    """Export all user data as JSON.
+
+    ``?format=ndjson`` (or ``Accept: application/x-ndjson``) streams the
+    export as NDJSON records with constant memory instead; see
+    ``iter_export_ndjson``. ``?format=sqlite`` (or ``Accept:
+    application/vnd.sqlite3``) streams a consistent copy of the database
+    file, restorable through ``POST /import``. ``?format=msgpack`` (or
+    ``Accept: application/msgpack``) streams the same structure as
+    MessagePack; see ``iter_export_msgpack``. Both stream from a snapshot
+    of the database, so a slow download doesn't block the user's writes.
+
+    The JSON export is served from ``sync_cache`` while the data is
+    unchanged (``export_date`` is then when it was first built).
+
+    Every export carries its marker in ``X-Export-Marker`` (and NDJSON also
+    in the header record). ``?format=ndjson&since=<marker>`` exports only
+    what changed after that marker; ``python -m quiclick_server.replay``
+    applies a chain of such exports onto a full one. Such an export is
+    read in this request's short transaction, without a snapshot, so an
+    unchanged account costs a few indexed reads; only a full export
+    (an unknown or newer marker) falls back to the snapshot.
+    """
+    export_format = _export_format(request, format)
+    db_path = user_db_path(sub)
+    version = data_version(db_path)
+    since_marker = None
+    if since is not None:
+        if export_format != "ndjson":
+            raise HTTPException(
+                status_code=422,
+                detail="Incremental exports are only available as NDJSON",
+            )
+        since_marker = _parse_marker(since)
+        conn = db.connection()
+        marker = export_marker(conn)
+        if _is_incremental(marker, since_marker):
+            return Response(
+                b"".join(_iter_ndjson(conn, since_marker)),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers={"X-Export-Marker": str(marker)},
+            )
+    if export_format == "json":
+        entry = sync_cache.lookup(db_path, "export", version)
+        if entry is not None:
+            return sync_cache.respond(request, entry)
+        # Read in the transaction build_export reads the data in
+        marker = export_marker(db.connection())
+    else:
+        # The body streams from a snapshot after the route returns; don't
+        # keep this request's read transaction (and its lock) open meanwhile.
+        # The marker is read from the same snapshot as the data.
+        db.close()
+        snapshot = create_snapshot(db_path)
+        marker = _snapshot_marker(snapshot)
+    headers = {"X-Export-Marker": str(marker)} if marker is not None else {}
+
+    if export_format == "ndjson":
+        return StreamingResponse(
+            _removing(snapshot, iter_export_ndjson(snapshot, since_marker)),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers,
+        )
+    if export_format == "msgpack":
+        return StreamingResponse(
+            _removing(snapshot, iter_export_msgpack(snapshot)),
+            media_type=MSGPACK_MEDIA_TYPE,
+            headers=headers,
+        )
+    if export_format == "sqlite":
+        return StreamingResponse(
+            iter_snapshot(snapshot),
+            media_type=SQLITE_MEDIA_TYPE,
+            headers={
+                **headers,
+                "Content-Length": str(snapshot.stat().st_size),
+                "Content-Disposition": 'attachment; filename="quiclick.db"',
+            },
+        )
+    body = build_export(db).model_dump_json().encode()
+    response = Response(body, media_type="application/json", headers=headers)
+    entry = sync_cache.store(db_path, "export", version, response)
+    return sync_cache.respond(request, entry)
+
+
+def _snapshot_marker(snapshot: Path) -> int | None:
+    engine = create_user_engine(snapshot)
+    try:
+        with engine.connect() as conn:
+            return export_marker(conn)
+    finally:
+        engine.dispose()
+
+
+def _removing(snapshot: Path, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Yield an export read from ``snapshot``, then remove the snapshot.
+
+    Streamed exports read a private copy of the database: a cursor on the
+    live file would hold its read lock for the whole download, and in
+    rollback-journal mode writers can't commit until it's released.
+    """
+    try:
+        yield from chunks
+    finally:
+        snapshot.unlink(missing_ok=True)
+
+
+def build_export(db: Session) -> ExportData:
+    """Load all live data into an ``ExportData`` (the JSON export)."""
     bookmarks = (
         db.query(Bookmark)
         .filter(Bookmark.deleted_at.is_(None))
@@ -73,74 +512,198 @@ def export_data(db: Session = Depends(get_db)):
         folders=export_folders,
         settings=settings_resp,
         export_date=datetime.now(timezone.utc),
-        version=1,
+        version=EXPORT_VERSION,
     )
 
 
-@router.post("/import", status_code=200)
-def import_data(body: ExportData, db: Session = Depends(get_db)):
-    """Import data from JSON export. Replaces all existing data."""
+def _import_body(request: Request) -> AsyncIterator[bytes]:
+    """Return the request body stream, capped at ``import_max_bytes``."""
+    content_length = request.headers.get("Content-Length")
     try:
-        # Delete all existing data
-        db.query(Bookmark).delete()
-        db.query(Folder).delete()
-        db.query(Item).delete()
-        db.query(Settings).delete()
-        db.flush()
-
-        # Import folders first (they are Items too, but no FK dependencies among them)
-        for f_data in body.folders:
-            folder = Folder(
-                id=f_data.id,
-                title=f_data.title,
-                date_added=f_data.date_added,
-                parent_id=f_data.parent_id,
-                position_x=f_data.position.x,
-                position_y=f_data.position.y,
-            )
-            db.add(folder)
-
-        db.flush()
-
-        # Import bookmarks
-        for bm_data in body.bookmarks:
-            favicon_bytes = None
-            favicon_mime = None
-            if bm_data.favicon:
-                # Parse data URL
-                header, b64_data = bm_data.favicon.split(",", 1)
-                favicon_mime = header.split(":")[1].split(";")[0]
-                favicon_bytes = base64.b64decode(b64_data)
-
-            bookmark = Bookmark(
-                id=bm_data.id,
-                title=bm_data.title,
-                url=bm_data.url,
-                favicon=favicon_bytes,
-                favicon_mime=favicon_mime,
-                date_added=bm_data.date_added,
-                parent_id=bm_data.parent_id,
-                position_x=bm_data.position.x,
-                position_y=bm_data.position.y,
+        content_length = int(content_length) if content_length is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if content_length is not None and content_length > cfg.import_max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Import body exceeds the {cfg.import_max_bytes} byte limit",
+        )
+    return limit_body(request.stream(), cfg.import_max_bytes)
+
+
+def _count_live(db: Session, model) -> int:
+    return db.scalar(
+        select(func.count()).select_from(model).where(model.deleted_at.is_(None))
+    )
+
+
+@router.post(
+    "/import",
+    status_code=200,
+    response_model=ImportResponse,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {
+                    "schema": {"$ref": "#/components/schemas/ExportData"}
+                },
+                NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}},
+                MSGPACK_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+                SQLITE_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+            "required": True,
+        }
+    },
+)
+async def import_data(
+    request: Request,
+    mode: Literal["replace", "merge"] = "replace",
+    on_duplicate: DuplicatePolicy = "create",
+    db: Session = Depends(get_db),
+    sub: str = Depends(get_current_user),
+):
+    """Import data from an export. Replaces all existing data.
+
+    Accepts the JSON export, a JSON array of NDJSON-style records, NDJSON
+    (``Content-Type: application/x-ndjson``) or the MessagePack export
+    (``application/msgpack``). All but the JSON export are parsed and
+    inserted in batches while the body streams in; see
+    ``quiclick_server.importer``.
+
+    ``?mode=merge`` diffs the snapshot against current data instead and only
+    inserts, updates and soft-deletes what differs, reporting the changes.
+
+    ``?on_duplicate=skip`` leaves out bookmarks whose normalized URL an
+    earlier bookmark of the import already has (counted in ``skipped``).
+
+    A database file from ``GET /export?format=sqlite`` (``Content-Type:
+    application/vnd.sqlite3``) is validated and swapped in as a whole.
+    """
+    return await run_import(
+        db,
+        user_db_path(sub),
+        _import_body(request),
+        request.headers.get("Content-Type", ""),
+        mode,
+        on_duplicate,
+    )
+
+
+async def run_import(
+    db: Session,
+    db_path: Path,
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    mode: str = "replace",
+    on_duplicate: str = "create",
+) -> ImportResponse:
+    """Import a body of any supported type (see ``import_data``)."""
+    if content_type.startswith(SQLITE_MEDIA_TYPE):
+        if mode != "replace":
+            raise HTTPException(
+                status_code=422, detail="Snapshots can only replace all data"
             )
-            db.add(bookmark)
-
-        db.flush()
-
-        # Import settings
-        if body.settings:
-            settings = Settings(
-                id=1,
-                show_titles=body.settings.show_titles,
-                tiles_per_row=body.settings.tiles_per_row,
-                tile_gap=body.settings.tile_gap,
-                show_add_button=body.settings.show_add_button,
+        if on_duplicate != "create":
+            raise HTTPException(
+                status_code=422, detail="Snapshots are restored as they are"
             )
-            db.add(settings)
+        upload = await receive_snapshot(db_path, chunks)
+        # Pooled connections still point at the replaced file afterwards
+        await run_in_threadpool(db.close)
+        await run_in_threadpool(restore_snapshot, db_path, upload)
+        db.get_bind().dispose()
+        occupancy.discard(db)
+        return ImportResponse(
+            detail="Import successful",
+            bookmarks=await run_in_threadpool(_count_live, db, Bookmark),
+            folders=await run_in_threadpool(_count_live, db, Folder),
+        )
 
-        db.commit()
+    writer_class = MergeWriter if mode == "merge" else ImportWriter
+    writer = writer_class(db, skip_duplicates=on_duplicate == "skip")
+    try:
+        await import_stream(db, chunks, content_type, writer)
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        if mode == "merge":
+            raise HTTPException(
+                status_code=409,
+                detail="Import conflicts with itself (duplicate positions)",
+            )
+        raise HTTPException(status_code=500, detail=f"Import failed: {e}")
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=f"Import failed: {e}")
 
-    return {"detail": "Import successful"}
+    changes = None
+    if isinstance(writer, MergeWriter):
+        changes = ImportChanges(
+            inserted=writer.inserted,
+            updated=writer.updated,
+            deleted=writer.deleted,
+            unchanged=writer.unchanged,
+            settings_updated=writer.settings_updated,
+        )
+    return ImportResponse(
+        detail="Import successful",
+        bookmarks=writer.bookmarks,
+        folders=writer.folders,
+        changes=changes,
+        skipped=writer.skipped,
+    )
+
+
+@router.post(
+    "/import/html",
+    status_code=200,
+    response_model=ImportResponse,
+    openapi_extra={
+        "requestBody": {
+            "content": {"text/html": {"schema": {"type": "string"}}},
+            "required": True,
+        }
+    },
+)
+async def import_html(
+    request: Request,
+    on_duplicate: DuplicatePolicy = "create",
+    db: Session = Depends(get_db),
+):
+    """Add the bookmarks of a browser bookmark export (Netscape HTML file).
+
+    Existing data is kept. Folders keep their nesting and every item is
+    appended to the grid of its folder (or root) in file order. The file is
+    parsed as it streams in and rows are bulk-inserted in one transaction;
+    see ``quiclick_server.html_import``. ``?on_duplicate=skip`` leaves out
+    bookmarks whose normalized URL a live bookmark or an earlier entry of
+    the file already has.
+    """
+    return await run_html_import(db, _import_body(request), on_duplicate)
+
+
+async def run_html_import(
+    db: Session, chunks: AsyncIterator[bytes], on_duplicate: str = "create"
+) -> ImportResponse:
+    """Add the items of a Netscape bookmark file (see ``import_html``)."""
+    importer = await run_in_threadpool(
+        lambda: NetscapeBookmarkImporter(
+            db, _get_tiles_per_row(db), skip_duplicates=on_duplicate == "skip"
+        )
+    )
+    text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        async for chunk in chunks:
+            await run_in_threadpool(importer.feed, text.decode(chunk))
+        await run_in_threadpool(importer.feed, text.decode(b"", final=True))
+        await run_in_threadpool(importer.close)
+        await run_in_threadpool(_commit, db)
+    except BaseException:
+        await run_in_threadpool(db.rollback)
+        raise
+
+    return ImportResponse(
+        detail="Import successful",
+        bookmarks=importer.bookmark_count,
+        folders=importer.folder_count,
+        skipped=importer.skipped,
+    )
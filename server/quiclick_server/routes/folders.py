@@ -1,24 +1,39 @@
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.exc import IntegrityError
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
-from quiclick_server.database import get_db
+from quiclick_server import coalesce, etags, queries
+from quiclick_server.database import get_current_user, get_db
+from quiclick_server.leases import check_leased_id, request_device_id
 from quiclick_server.models import Bookmark, Folder, Item
 from quiclick_server.routes.bookmarks import (
-    _bookmark_to_response,
+    _commit,
+    _item_cell,
     _next_position,
+    _resolve_position,
 )
 from quiclick_server.schemas import (
     FolderCreate,
     FolderDetailResponse,
     FolderResponse,
+    FolderTreeResponse,
     FolderUpdate,
+    RootTreeResponse,
+)
+from quiclick_server.serialization import (
+    bookmark_dict,
+    folder_dict,
+    json_response,
+    parse_fields,
+    projected_dict,
 )
 
 router = APIRouter(tags=["folders"])
 
+# Deepest level a tree reaches without ?depth= (also bounds malformed cycles)
+_MAX_TREE_DEPTH = 100
+
 
 def _folder_to_response(folder: Folder) -> FolderResponse:
     return FolderResponse(
@@ -38,96 +53,54 @@ def _next_root_position(db: Session):
     return _next_position(db, None)
 
 
-@router.get("", response_model=list[FolderResponse])
-def list_folders(db: Session = Depends(get_db)):
-    """List all folders, ordered by position."""
-    folders = (
-        db.query(Folder)
-        .filter(Folder.deleted_at.is_(None))
-        .order_by(Folder.position_y, Folder.position_x)
-        .all()
-    )
-    return [_folder_to_response(f) for f in folders]
+def _get_live_folder(db: Session, folder_id: int) -> Folder:
+    folder = db.get(Folder, folder_id)
+    if not folder or folder.deleted_at is not None:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    return folder
 
 
-@router.post("", response_model=FolderResponse, status_code=201)
-def create_folder(body: FolderCreate, db: Session = Depends(get_db)):
-    """Create a new folder."""
-    position = body.position if body.position is not None else _next_root_position(db)
+def _create_folder(db: Session, body: FolderCreate, device_id: str | None) -> Folder:
+    """Add a new folder to the session (not committed).
+
+    A requested id must be leased to ``device_id``.
+    """
+    if body.id is not None:
+        check_leased_id(db, body.id, device_id)
+    position = (
+        _resolve_position(db, body.parent_id, body.position)
+        if body.position is not None
+        else _next_root_position(db)
+    )
 
     folder = Folder(
+        id=body.id,
         title=body.title,
         parent_id=body.parent_id,
         position_x=position.x,
         position_y=position.y,
     )
     db.add(folder)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Position conflict")
-    db.refresh(folder)
-    return _folder_to_response(folder)
-
+    return folder
 
-@router.get("/{folder_id}", response_model=FolderDetailResponse)
-def get_folder(folder_id: int, db: Session = Depends(get_db)):
-    """Get a folder and its child bookmarks."""
-    folder = db.get(Folder, folder_id)
-    if not folder or folder.deleted_at is not None:
-        raise HTTPException(status_code=404, detail="Folder not found")
 
-    bookmarks = (
-        db.query(Bookmark)
-        .filter(Bookmark.parent_id == folder_id, Bookmark.deleted_at.is_(None))
-        .order_by(Bookmark.position_y, Bookmark.position_x)
-        .all()
-    )
+def _update_folder(db: Session, folder_id: int, body: FolderCreate) -> Folder:
+    """Rename and/or reposition a folder (not committed)."""
+    folder = _get_live_folder(db, folder_id)
 
-    resp = FolderDetailResponse(
-        id=folder.id,
-        type=folder.type,
-        title=folder.title,
-        date_added=folder.date_added,
-        parent_id=folder.parent_id,
-        position=folder.position,
-        bookmarks=[_bookmark_to_response(b) for b in bookmarks],
-    )
-    return resp
-
-
-@router.put("/{folder_id}", response_model=FolderResponse)
-def update_folder(
-    folder_id: int,
-    body: FolderCreate,
-    db: Session = Depends(get_db),
-):
-    """Full update of a folder (rename and/or reposition)."""
-    folder = db.get(Folder, folder_id)
-    if not folder or folder.deleted_at is not None:
-        raise HTTPException(status_code=404, detail="Folder not found")
-
-    folder.title = body.title
     if body.position is not None:
-        folder.position_x = body.position.x
-        folder.position_y = body.position.y
-
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Position conflict")
-    db.refresh(folder)
-    return _folder_to_response(folder)
+        position = _resolve_position(
+            db, folder.parent_id, body.position, _item_cell(folder)
+        )
+        folder.position_x = position.x
+        folder.position_y = position.y
+    folder.title = body.title
+    return folder
 
 
-@router.delete("/{folder_id}", status_code=204)
-def delete_folder(folder_id: int, db: Session = Depends(get_db)):
-    """Soft-delete a folder. Orphaned bookmarks are moved to root (parent_id=None)."""
-    folder = db.get(Folder, folder_id)
-    if not folder or folder.deleted_at is not None:
-        raise HTTPException(status_code=404, detail="Folder not found")
+def _delete_folder(db: Session, folder_id: int):
+    """Soft-delete a folder and move its bookmarks to root (not committed)."""
+    folder = _get_live_folder(db, folder_id)
 
     now = datetime.now(timezone.utc)
 
@@ -151,4 +124,195 @@ def delete_folder(folder_id: int, db: Session = Depends(get_db)):
         child.last_updated = now
         db.flush()
 
+
+@router.get("", response_model=list[FolderResponse])
+def list_folders(
+    request: Request,
+    db: Session = Depends(get_db),
+    sub: str = Depends(get_current_user),
+):
+    """List all folders, ordered by position (conditional on If-None-Match)."""
+    etag = etags.listing_etag(db, request)
+    if (not_modified := etags.not_modified(request, etag)) is not None:
+        return not_modified
+
+    def render():
+        rows = db.connection().execute(queries.LIVE_FOLDERS)
+        headers = {"ETag": etag} if etag else {}
+        return json_response([folder_dict(row) for row in rows], headers=headers)
+
+    return coalesce.respond(sub, "folders", etag, render)
+
+
+@router.post("", response_model=FolderResponse, status_code=201)
+def create_folder(
+    body: FolderCreate,
+    device_id: str | None = Depends(request_device_id),
+    db: Session = Depends(get_db),
+):
+    """Create a new folder.
+
+    An occupied requested position is moved to the nearest free cell.
+    """
+    folder = _create_folder(db, body, device_id)
+    _commit(db)
+    db.refresh(folder)
+    return _folder_to_response(folder)
+
+
+@router.get("/{folder_id}", response_model=FolderDetailResponse)
+def get_folder(
+    folder_id: int,
+    request: Request,
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+    sub: str = Depends(get_current_user),
+):
+    """Get a folder and its child bookmarks (conditional on If-None-Match).
+
+    ``?fields=`` limits the fields of the child bookmarks (see
+    ``GET /bookmarks``). Concurrent requests for the same tag share one
+    response (``coalesce``).
+    """
+    selected = parse_fields(fields)
+    etag = etags.folder_etag(db, folder_id, selected)
+    if (not_modified := etags.not_modified(request, etag)) is not None:
+        return not_modified
+
+    def render():
+        conn = db.connection()
+        folder = conn.execute(queries.LIVE_FOLDER, {"id": folder_id}).first()
+        if folder is None:
+            raise HTTPException(status_code=404, detail="Folder not found")
+        bookmarks = conn.execute(
+            queries.project(queries.FOLDER_BOOKMARKS, selected),
+            {"parent_id": folder_id},
+        )
+        if selected is None:
+            bookmark_dicts = [bookmark_dict(b) for b in bookmarks]
+        else:
+            bookmark_dicts = [projected_dict(b, selected) for b in bookmarks]
+
+        return json_response(
+            {
+                **folder_dict(folder),
+                # Not part of the detail response so far; kept null
+                "last_updated": None,
+                "deleted_at": None,
+                "bookmarks": bookmark_dicts,
+            },
+            headers={"ETag": etag},
+        )
+
+    return coalesce.respond(sub, "folders/{id}", etag, render)
+
+
+def _tree(rows, top: dict, max_depth: int) -> dict:
+    """Nest ``queries.FOLDER_TREE`` / ``ROOT_TREE`` rows below ``top``.
+
+    Rows come parents first; an item reached again (a cycle) is skipped.
+    """
+    nodes = {top.get("id"): top}
+    for row in rows:
+        if row.id in nodes:
+            continue
+        parent = nodes[row.parent_id]
+        if row.type == "bookmark":
+            parent["bookmarks"].append(bookmark_dict(row))
+            nodes[row.id] = None
+            continue
+        node = folder_dict(row)
+        if row.depth < max_depth:
+            node["bookmarks"], node["folders"] = [], []
+        else:
+            node["bookmarks"] = node["folders"] = None
+        parent["folders"].append(node)
+        nodes[row.id] = node
+    return top
+
+
+@router.get("/root/tree", response_model=RootTreeResponse)
+def get_root_tree(
+    request: Request,
+    depth: int | None = Query(None, ge=1),
+    db: Session = Depends(get_db),
+    sub: str = Depends(get_current_user),
+):
+    """Root-level bookmarks and every folder below the root, nested.
+
+    See ``get_folder_tree``.
+    """
+    etag = etags.listing_etag(db, request)
+    if (not_modified := etags.not_modified(request, etag)) is not None:
+        return not_modified
+
+    def render():
+        max_depth = depth or _MAX_TREE_DEPTH
+        rows = db.connection().execute(queries.ROOT_TREE, {"max_depth": max_depth})
+        top = _tree(rows, {"bookmarks": [], "folders": []}, max_depth)
+        headers = {"ETag": etag} if etag else {}
+        return json_response(top, headers=headers)
+
+    return coalesce.respond(sub, "folders/tree", etag, render)
+
+
+@router.get("/{folder_id}/tree", response_model=FolderTreeResponse)
+def get_folder_tree(
+    folder_id: int,
+    request: Request,
+    depth: int | None = Query(None, ge=1),
+    db: Session = Depends(get_db),
+    sub: str = Depends(get_current_user),
+):
+    """Get a folder with its bookmarks and subfolders, nested, in one query.
+
+    ``?depth=`` limits the levels read below the folder (1 = its direct
+    children, like ``GET /folders/{id}``); folders at the limit come with
+    null ``bookmarks`` and ``folders``. Tagged like the listings
+    (``etags.listing_etag``).
+    """
+    etag = etags.listing_etag(db, request)
+    if (not_modified := etags.not_modified(request, etag)) is not None:
+        return not_modified
+
+    def render():
+        max_depth = depth or _MAX_TREE_DEPTH
+        conn = db.connection()
+        folder = conn.execute(queries.LIVE_FOLDER, {"id": folder_id}).first()
+        if folder is None:
+            raise HTTPException(status_code=404, detail="Folder not found")
+        rows = conn.execute(
+            queries.FOLDER_TREE, {"parent_id": folder_id, "max_depth": max_depth}
+        )
+        top = {**folder_dict(folder), "bookmarks": [], "folders": []}
+        headers = {"ETag": etag} if etag else {}
+        return json_response(_tree(rows, top, max_depth), headers=headers)
+
+    return coalesce.respond(sub, "folders/tree", etag, render)
+
+
+@router.put("/{folder_id}", response_model=FolderResponse)
+def update_folder(
+    folder_id: int,
+    body: FolderCreate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Full update of a folder (rename and/or reposition).
+
+    Conditional on If-Match with the folder's ``GET /folders/{id}`` tag.
+    """
+    etags.check_if_match(request, lambda: etags.folder_etag(db, folder_id))
+    folder = _update_folder(db, folder_id, body)
+    _commit(db)
+    db.refresh(folder)
+    response.headers["ETag"] = etags.folder_etag(db, folder_id)
+    return _folder_to_response(folder)
+
+
+@router.delete("/{folder_id}", status_code=204)
+def delete_folder(folder_id: int, db: Session = Depends(get_db)):
+    """Soft-delete a folder. Orphaned bookmarks are moved to root (parent_id=None)."""
+    _delete_folder(db, folder_id)
     db.commit()
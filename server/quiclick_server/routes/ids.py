@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from quiclick_server.database import get_db
+from quiclick_server.leases import lease_ids
+from quiclick_server.schemas import IdLeaseRequest, IdLeaseResponse
+
+router = APIRouter(tags=["ids"])
+
+
+@router.post("/ids/lease", response_model=IdLeaseResponse, status_code=201)
+def lease_id_block(body: IdLeaseRequest, db: Session = Depends(get_db)):
+    """Lease a contiguous block of item ids to a client device.
+
+    Items created with an id from the block (``id`` in POST /bookmarks,
+    POST /folders or a batch create) keep it, so clients can create items
+    offline with final ids and submit them in any order.
+    """
+    lease = lease_ids(db, body.device_id, body.count)
+    db.commit()
+    return IdLeaseResponse.model_validate(lease)
@@ -0,0 +1,246 @@
+"""Background variants of ``/export``, ``/import`` and ``/import/html``.
+
+Submitting returns ``202`` with the job right away; poll ``GET /jobs/{id}``
+for progress and fetch an export from ``GET /jobs/{id}/result``. See
+``quiclick_server.jobs``.
+"""
+
+import asyncio
+import os
+import tempfile
+from collections.abc import AsyncIterator, Awaitable, Callable
+from functools import partial
+from pathlib import Path
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from quiclick_server import jobs
+from quiclick_server.database import (
+    create_user_engine,
+    get_current_user,
+    user_db_path,
+    user_engine,
+)
+from quiclick_server.routes.export_import import (
+    EXPORT_FORMATS,
+    _import_body,
+    build_export,
+    iter_export_msgpack,
+    iter_export_ndjson,
+    run_html_import,
+    run_import,
+)
+from quiclick_server.schemas import DuplicatePolicy, ImportResponse, JobResponse
+from quiclick_server.snapshot import create_snapshot
+
+router = APIRouter(tags=["jobs"])
+
+_CHUNK = 64 * 1024
+
+_EXPORT_FILENAMES = {
+    "json": "quiclick.json",
+    "ndjson": "quiclick.ndjson",
+    "msgpack": "quiclick.msgpack",
+    "sqlite": "quiclick.db",
+}
+
+
+# --- Runners (executed on the job worker pool) ---
+
+
+def _export_job(db_path: Path, export_format: str, job, progress) -> dict:
+    target = jobs.result_file(job.id)
+    if export_format == "sqlite":
+        os.replace(create_snapshot(db_path), target)
+    elif export_format == "json":
+        engine = create_user_engine(db_path)
+        try:
+            with Session(engine) as db:
+                body = build_export(db).model_dump_json().encode()
+        finally:
+            engine.dispose()
+        target.write_bytes(body)
+    else:
+        chunks = (
+            iter_export_ndjson(db_path)
+            if export_format == "ndjson"
+            else iter_export_msgpack(db_path)
+        )
+        written = 0
+        with target.open("wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+                progress(written)
+    size = target.stat().st_size
+    progress(size, size)
+    return {"media_type": EXPORT_FORMATS[export_format], "size": size}
+
+
+async def _read_upload(path: Path, progress) -> AsyncIterator[bytes]:
+    read = 0
+    with path.open("rb") as f:
+        while chunk := f.read(_CHUNK):
+            read += len(chunk)
+            progress(read)
+            yield chunk
+
+
+def _import_job(
+    db_path: Path,
+    run: Callable[[Session, AsyncIterator[bytes]], Awaitable[ImportResponse]],
+    job,
+    progress,
+) -> dict:
+    engine = create_user_engine(db_path)
+    try:
+        with Session(engine) as db:
+            chunks = _read_upload(jobs.input_file(job.id), progress)
+            response = asyncio.run(run(db, chunks))
+    finally:
+        engine.dispose()
+    return response.model_dump()
+
+
+async def _receive_upload(request: Request) -> Path:
+    """Save the (size-limited) request body to a temporary file."""
+    fd, name = tempfile.mkstemp(suffix=".upload", dir=jobs.jobs_dir())
+    upload = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in _import_body(request):
+                f.write(chunk)
+    except BaseException:
+        upload.unlink(missing_ok=True)
+        raise
+    return upload
+
+
+# --- Routes ---
+
+
+def _ready_db_path(sub: str) -> Path:
+    """Path of the user's DB, created and migrated before a worker opens it."""
+    db_path = user_db_path(sub)
+    user_engine(db_path)
+    return db_path
+
+
+@router.post("/export", status_code=202, response_model=JobResponse)
+def submit_export(
+    format: Literal["json", "ndjson", "msgpack", "sqlite"] = "json",
+    sub: str = Depends(get_current_user),
+):
+    """Start an export in the background (formats as for ``GET /export``)."""
+    runner = partial(_export_job, _ready_db_path(sub), format)
+    return jobs.submit(sub, "export", {"format": format}, runner)
+
+
+@router.post(
+    "/import",
+    status_code=202,
+    response_model=JobResponse,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                content_type: {"schema": {"type": "string", "format": "binary"}}
+                for content_type in EXPORT_FORMATS.values()
+            },
+            "required": True,
+        }
+    },
+)
+async def submit_import(
+    request: Request,
+    mode: Literal["replace", "merge"] = "replace",
+    on_duplicate: DuplicatePolicy = "create",
+    sub: str = Depends(get_current_user),
+):
+    """Start an import in the background (bodies and options as for
+    ``POST /import``).
+
+    The body is stored first; the job's ``result`` is the ``ImportResponse``.
+    """
+    content_type = request.headers.get("Content-Type", "")
+    db_path = await run_in_threadpool(_ready_db_path, sub)
+
+    def run(db, chunks):
+        return run_import(db, db_path, chunks, content_type, mode, on_duplicate)
+
+    upload = await _receive_upload(request)
+    return await run_in_threadpool(
+        jobs.submit,
+        sub,
+        "import",
+        {"mode": mode, "on_duplicate": on_duplicate, "content_type": content_type},
+        partial(_import_job, db_path, run),
+        upload=upload,
+    )
+
+
+@router.post(
+    "/import/html",
+    status_code=202,
+    response_model=JobResponse,
+    openapi_extra={
+        "requestBody": {
+            "content": {"text/html": {"schema": {"type": "string"}}},
+            "required": True,
+        }
+    },
+)
+async def submit_html_import(
+    request: Request,
+    on_duplicate: DuplicatePolicy = "create",
+    sub: str = Depends(get_current_user),
+):
+    """Start a browser bookmark file import (``POST /import/html``) in the
+    background."""
+
+    def run(db, chunks):
+        return run_html_import(db, chunks, on_duplicate)
+
+    db_path = await run_in_threadpool(_ready_db_path, sub)
+    upload = await _receive_upload(request)
+    return await run_in_threadpool(
+        jobs.submit,
+        sub,
+        "import_html",
+        {"on_duplicate": on_duplicate},
+        partial(_import_job, db_path, run),
+        upload=upload,
+    )
+
+
+@router.get("", response_model=list[JobResponse])
+def list_jobs(sub: str = Depends(get_current_user)):
+    """Jobs of the user, newest first, including finished ones not yet expired."""
+    return jobs.list_jobs(sub)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, sub: str = Depends(get_current_user)):
+    """Status and progress of a job."""
+    return jobs.get_job(sub, job_id)
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str, sub: str = Depends(get_current_user)):
+    """Download the file produced by a finished export job."""
+    job = jobs.get_job(sub, job_id)
+    if job.kind != "export":
+        raise HTTPException(status_code=404, detail="Job has no result file")
+    if job.status != jobs.SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    path = jobs.result_file(job.id)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Job result has expired")
+    return FileResponse(
+        path,
+        media_type=job.result["media_type"],
+        filename=_EXPORT_FILENAMES[job.params["format"]],
+    )
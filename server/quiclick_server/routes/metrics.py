@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+
+from quiclick_server import coalesce
+from quiclick_server.database import get_current_user
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+def get_metrics(sub: str = Depends(get_current_user)):
+    """Process-wide counters of the read path (any signed-in user).
+
+    ``coalesce`` has, per endpoint, the requests that ran their computation,
+    those served by a concurrent identical one, and the coalescing ratio
+    (``coalesce.stats``).
+    """
+    return {"coalesce": coalesce.stats()}
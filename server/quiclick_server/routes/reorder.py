@@ -1,23 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from quiclick_server.database import get_db
 from quiclick_server.models import Item
+from quiclick_server.routes.bookmarks import _commit, _resolve_reorder
 from quiclick_server.schemas import ReorderRequest
 
 router = APIRouter(tags=["reorder"])
 
 
-@router.patch("/reorder", status_code=200)
-def reorder_items(body: ReorderRequest, db: Session = Depends(get_db)):
-    """Bulk-update positions for root-level items (folders + bookmarks)."""
+def _reorder_items(db: Session, body: ReorderRequest):
+    """Move items to their requested cells (not committed).
+
+    Requested cells still occupied by items outside the request are replaced
+    by the nearest free cell.
+    """
     items = []
     for entry in body.items:
         item = db.get(Item, entry.id)
         if not item:
             raise HTTPException(status_code=404, detail=f"Item {entry.id} not found")
         items.append((item, entry.position))
+    items = _resolve_reorder(db, items)
 
     # Move all affected items to temporary negative positions to avoid
     # intermediate unique-constraint violations during the swap.
@@ -31,9 +35,10 @@ def reorder_items(body: ReorderRequest, db: Session = Depends(get_db)):
         item.position_x = pos.x
         item.position_y = pos.y
 
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Position conflict")
+
+@router.patch("/reorder", status_code=200)
+def reorder_items(body: ReorderRequest, db: Session = Depends(get_db)):
+    """Bulk-update positions for root-level items (folders + bookmarks)."""
+    _reorder_items(db, body)
+    _commit(db)
     return {"detail": "Reordered"}
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+
+from quiclick_server import coalesce, etags, queries
+from quiclick_server.database import get_current_user, get_db
+from quiclick_server.schemas import BookmarkResponse, FolderResponse
+from quiclick_server.search import match_expression
+from quiclick_server.serialization import (
+    bookmark_dict,
+    folder_dict,
+    folder_fields,
+    json_response,
+    parse_fields,
+    projected_dict,
+)
+
+router = APIRouter(tags=["search"])
+
+
+@router.get("/search", response_model=list[BookmarkResponse | FolderResponse])
+def search_items(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(50, ge=1, le=500),
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+    sub: str = Depends(get_current_user),
+):
+    """Bookmarks and folders whose title or URL contains every word of ``q``.
+
+    Words match word prefixes (``git exp`` finds ``https://gitlab.com/explore``);
+    case and diacritics are ignored. The best ``limit`` matches come first,
+    ranked by BM25 with title matches weighing more than URL ones.
+    ``?fields=`` works as for ``GET /bookmarks``. Tagged like the listings
+    (``etags.listing_etag``).
+    """
+    selected = parse_fields(fields)
+    etag = etags.listing_etag(db, request)
+    if (not_modified := etags.not_modified(request, etag)) is not None:
+        return not_modified
+    headers = {"ETag": etag} if etag else {}
+    query = match_expression(q)
+    if query is None:
+        return json_response([], headers=headers)
+
+    def render():
+        read = selected
+        if read is not None and "type" not in read:
+            read += ("type",)
+        rows = db.connection().execute(
+            queries.project(queries.SEARCH, read), {"query": query, "limit": limit}
+        )
+        if selected is None:
+            items = [
+                bookmark_dict(row) if row.type == "bookmark" else folder_dict(row)
+                for row in rows
+            ]
+        else:
+            folder_selected = folder_fields(selected)
+            items = [
+                projected_dict(
+                    row, selected if row.type == "bookmark" else folder_selected
+                )
+                for row in rows
+            ]
+        return json_response(items, headers=headers)
+
+    return coalesce.respond(sub, "search", etag, render)
@@ -9,13 +9,22 @@ router = APIRouter(tags=["settings"])
 
 
 def _get_or_create_settings(db: Session) -> Settings:
-    """Get the single settings row, creating it with defaults if missing."""
+    """Get the single settings row, adding a default one if missing (not committed)."""
     settings = db.get(Settings, 1)
     if not settings:
         settings = Settings(id=1)
         db.add(settings)
-        db.commit()
-        db.refresh(settings)
+        db.flush()
+    return settings
+
+
+def _patch_settings(db: Session, body: SettingsPatch) -> Settings:
+    """Apply the provided settings fields (not committed)."""
+    settings = _get_or_create_settings(db)
+
+    updates = body.model_dump(exclude_unset=True)
+    for key, value in updates.items():
+        setattr(settings, key, value)
     return settings
 
 
@@ -23,18 +32,14 @@ def _get_or_create_settings(db: Session) -> Settings:
 def get_settings(db: Session = Depends(get_db)):
     """Get user settings (creates defaults if none exist)."""
     settings = _get_or_create_settings(db)
+    db.commit()
     return SettingsResponse.model_validate(settings)
 
 
 @router.patch("", response_model=SettingsResponse)
 def patch_settings(body: SettingsPatch, db: Session = Depends(get_db)):
     """Partial update of user settings."""
-    settings = _get_or_create_settings(db)
-
-    updates = body.model_dump(exclude_unset=True)
-    for key, value in updates.items():
-        setattr(settings, key, value)
-
+    settings = _patch_settings(db, body)
     db.commit()
     db.refresh(settings)
     return SettingsResponse.model_validate(settings)
@@ -1,8 +1,9 @@
 import base64
 import re
 from datetime import datetime
+from typing import Annotated, Any, Literal
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 
 from quiclick_server.models import Position
 
@@ -87,6 +88,7 @@ def validate_favicon_data_url(v: str) -> str:
 
 
 class BookmarkCreate(BaseModel):
+    id: int | None = None  # leased id (see /ids/lease); ignored on PUT
     title: str
     url: str
     favicon: str | None = None
@@ -127,10 +129,43 @@ class BookmarkResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+MAX_BULK_BOOKMARKS = 50000
+
+
+class BookmarkBulkCreate(BaseModel):
+    # Rows are validated one by one so a bad row doesn't reject the request
+    bookmarks: list[dict[str, Any]] = Field(max_length=MAX_BULK_BOOKMARKS)
+
+
+class BulkRowResult(BaseModel):
+    status: int
+    id: int | None = None
+    position: Position | None = None
+    detail: Any = None
+
+
+class BookmarkBulkResponse(BaseModel):
+    created: int
+    results: list[BulkRowResult]
+
+
+# ?on_duplicate= of the create and import paths: "skip" leaves out bookmarks
+# whose normalized URL (urls.normalize_url) a live bookmark already has
+DuplicatePolicy = Literal["create", "skip"]
+
+
+class DuplicateGroup(BaseModel):
+    """Live bookmarks sharing a normalized URL, oldest first."""
+
+    url_key: str
+    ids: list[int]
+
+
 # --- Folder schemas ---
 
 
 class FolderCreate(BaseModel):
+    id: int | None = None  # leased id (see /ids/lease); ignored on PUT
     title: str
     parent_id: int | None = None
     position: Position | None = None
@@ -160,6 +195,23 @@ class FolderDetailResponse(FolderResponse):
     bookmarks: list[BookmarkResponse] = []
 
 
+class FolderTreeResponse(FolderResponse):
+    """Folder with its child bookmarks and (recursively) child folders.
+
+    Both are null for folders at the depth limit, whose contents weren't read.
+    """
+
+    bookmarks: list[BookmarkResponse] | None = None
+    folders: list["FolderTreeResponse"] | None = None
+
+
+class RootTreeResponse(BaseModel):
+    """Root-level bookmarks and folder trees."""
+
+    bookmarks: list[BookmarkResponse]
+    folders: list[FolderTreeResponse]
+
+
 # --- Reorder schemas ---
 
 
@@ -220,6 +272,66 @@ class ExportData(BaseModel):
     version: int = 1
 
 
+# Streaming (NDJSON) export/import: one typed record per line
+
+
+class ExportHeaderRecord(BaseModel):
+    type: Literal["header"]
+    version: int = 1
+    export_date: datetime | None = None
+    # Opaque point in the data's history the export reflects
+    marker: str | None = None
+    # Set on incremental exports: the marker they continue from
+    since: str | None = None
+
+
+class ExportSettingsRecord(SettingsResponse):
+    type: Literal["settings"]
+
+
+class ExportFolderRecord(ExportFolder):
+    type: Literal["folder"]
+
+
+class ExportBookmarkRecord(ExportBookmark):
+    type: Literal["bookmark"]
+
+
+class ExportIdsRecord(BaseModel):
+    """Incremental exports only: ids of all live items (may be split)."""
+
+    type: Literal["ids"]
+    ids: list[int]
+
+
+ExportRecord = Annotated[
+    ExportHeaderRecord
+    | ExportSettingsRecord
+    | ExportFolderRecord
+    | ExportBookmarkRecord
+    | ExportIdsRecord,
+    Field(discriminator="type"),
+]
+
+
+class ImportChanges(BaseModel):
+    """What a merge import wrote (ids of items)."""
+
+    inserted: list[int]
+    updated: list[int]
+    deleted: list[int]
+    unchanged: int
+    settings_updated: bool
+
+
+class ImportResponse(BaseModel):
+    detail: str
+    bookmarks: int
+    folders: int
+    changes: ImportChanges | None = None  # merge mode only
+    skipped: int = 0  # duplicate bookmarks left out (?on_duplicate=skip)
+
+
 # --- Auth schemas ---
 
 
@@ -244,3 +356,89 @@ class ChangesResponse(BaseModel):
     folders: list[FolderResponse]
     settings: SettingsWithTimestamp | None
     deleted_ids: list[int]
+
+
+# --- Id lease schemas ---
+
+MAX_ID_LEASE = 10000
+
+
+class IdLeaseRequest(BaseModel):
+    device_id: str = Field(min_length=1)
+    count: int = Field(default=100, gt=0, le=MAX_ID_LEASE)
+
+
+class IdLeaseResponse(BaseModel):
+    device_id: str
+    start_id: int
+    end_id: int
+
+    model_config = {"from_attributes": True}
+
+
+# --- Batch schemas ---
+
+MAX_BATCH_OPERATIONS = 1000
+
+BatchOperationType = Literal[
+    "create_bookmark",
+    "update_bookmark",
+    "delete_bookmark",
+    "create_folder",
+    "update_folder",
+    "delete_folder",
+    "reorder",
+    "update_settings",
+]
+
+
+class BatchOperation(BaseModel):
+    """One sync-queue operation.
+
+    ``payload`` is the body the matching single-item route takes (PATCH
+    semantics for ``update_bookmark``, PUT for ``update_folder``). ``id``,
+    ``payload.parent_id`` and reorder item ids may refer to the ``local_id``
+    of an item created earlier in the same batch.
+    """
+
+    type: BatchOperationType
+    id: int | str | None = None
+    local_id: int | str | None = None
+    payload: dict[str, Any] = {}
+
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(max_length=MAX_BATCH_OPERATIONS)
+
+
+class BatchResult(BaseModel):
+    status: int
+    id: int | None = None
+    detail: Any = None
+    data: dict[str, Any] | None = None
+
+
+class BatchResponse(BaseModel):
+    results: list[BatchResult]
+    id_map: dict[str, int]
+
+
+# --- Job schemas ---
+
+
+class JobResponse(BaseModel):
+    """A background import/export job; ``processed``/``total`` are bytes."""
+
+    id: str
+    kind: str
+    status: str
+    params: dict[str, Any]
+    processed: int
+    total: int | None
+    result: dict[str, Any] | None
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+    model_config = {"from_attributes": True}
@@ -0,0 +1,62 @@
+"""Full-text index of item titles and URLs.
+
+``items_fts`` is an FTS5 table over ``items.title`` and ``items.url`` of
+live items, using ``items`` as external content, so it stores only the
+index, not a copy of the text. Triggers keep it in sync with inserts,
+deletes and updates of the title, URL or ``deleted_at``; moves and other
+edits don't touch it. Soft-deleted items are dropped from the index, so a
+ranked top-N of the index needs no further filtering (FTS5's ``rebuild``
+would index them too; don't use it).
+
+The ``unicode61`` tokenizer splits URLs into their words (``github``,
+``com``...) and folds case and diacritics. Prefix indexes of 2 and 3
+characters keep short prefix queries cheap.
+"""
+
+import re
+
+from sqlalchemy import Connection
+
+_DELETE_OLD = (
+    " INSERT INTO items_fts (items_fts, rowid, title, url)"
+    " SELECT 'delete', old.id, old.title, old.url WHERE old.deleted_at IS NULL;"
+)
+_INSERT_NEW = (
+    " INSERT INTO items_fts (rowid, title, url)"
+    " SELECT new.id, new.title, new.url WHERE new.deleted_at IS NULL;"
+)
+_DDL = (
+    "CREATE VIRTUAL TABLE items_fts USING fts5("
+    "title, url, content='items', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER items_fts_insert AFTER INSERT ON items BEGIN{_INSERT_NEW} END",
+    f"CREATE TRIGGER items_fts_delete AFTER DELETE ON items BEGIN{_DELETE_OLD} END",
+    "CREATE TRIGGER items_fts_update"
+    " AFTER UPDATE OF title, url, deleted_at ON items"
+    f" BEGIN{_DELETE_OLD}{_INSERT_NEW} END",
+)
+
+# Words of a query, as the tokenizer sees them
+_WORD = re.compile(r"\w+")
+
+
+def create_index(conn: Connection):
+    """Create ``items_fts`` and its triggers, and index the existing items."""
+    for statement in _DDL:
+        conn.exec_driver_sql(statement)
+    conn.exec_driver_sql(
+        "INSERT INTO items_fts (rowid, title, url)"
+        " SELECT id, title, url FROM items WHERE deleted_at IS NULL"
+    )
+
+
+def match_expression(q: str) -> str | None:
+    """FTS5 query matching items that contain every word of ``q`` as a prefix.
+
+    Words are quoted, so FTS5 operators and syntax in ``q`` are plain text.
+    ``None`` if ``q`` has no words.
+    """
+    words = _WORD.findall(q)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
@@ -0,0 +1,132 @@
+"""Bulk JSON rendering of items, bypassing per-row Pydantic models.
+
+Rows (ORM entities or Core rows with the same column names) become plain
+dicts shaped like ``BookmarkResponse``/``FolderResponse`` and the whole
+payload is encoded in one pydantic-core ``to_json`` call, which formats
+datetimes (and nested response models) exactly like the response models
+do. Routes return the bytes as a ``Response``, so ``response_model`` only
+documents them.
+"""
+
+import base64
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic_core import to_json
+
+
+def favicon_data_url(favicon: bytes | None, mime: str | None) -> str | None:
+    """Stored favicon blob + mime as a data URL string."""
+    if favicon is None or mime is None:
+        return None
+    return f"data:{mime};base64,{base64.b64encode(favicon).decode()}"
+
+
+def parse_favicon_data_url(data_url: str) -> tuple[bytes, str]:
+    """Parse a data URL into (raw_bytes, mime_type)."""
+    # Format: data:{mime};base64,{data}
+    header, b64_data = data_url.split(",", 1)
+    mime = header.split(":")[1].split(";")[0]
+    raw = base64.b64decode(b64_data)
+    return raw, mime
+
+
+def bookmark_dict(row) -> dict:
+    """``BookmarkResponse`` fields of a bookmark row."""
+    return {
+        "id": row.id,
+        "type": row.type,
+        "title": row.title,
+        "url": row.url,
+        "favicon": favicon_data_url(row.favicon, row.favicon_mime),
+        "date_added": row.date_added,
+        "parent_id": row.parent_id,
+        "position": [row.position_x, row.position_y],
+        "last_updated": row.last_updated,
+        "deleted_at": row.deleted_at,
+    }
+
+
+def folder_dict(row) -> dict:
+    """``FolderResponse`` fields of a folder row."""
+    return {
+        "id": row.id,
+        "type": row.type,
+        "title": row.title,
+        "date_added": row.date_added,
+        "parent_id": row.parent_id,
+        "position": [row.position_x, row.position_y],
+        "last_updated": row.last_updated,
+        "deleted_at": row.deleted_at,
+    }
+
+
+# Fields selectable with ``?fields=``, in response order; folders lack the
+# bookmark-only ones
+BOOKMARK_FIELDS = (
+    "id",
+    "type",
+    "title",
+    "url",
+    "favicon",
+    "date_added",
+    "parent_id",
+    "position",
+    "last_updated",
+    "deleted_at",
+)
+FOLDER_FIELDS = tuple(f for f in BOOKMARK_FIELDS if f not in ("url", "favicon"))
+
+_FIELD_VALUES = {
+    "id": lambda row: row.id,
+    "type": lambda row: row.type,
+    "title": lambda row: row.title,
+    "url": lambda row: row.url,
+    "favicon": lambda row: favicon_data_url(row.favicon, row.favicon_mime),
+    "date_added": lambda row: row.date_added,
+    "parent_id": lambda row: row.parent_id,
+    "position": lambda row: [row.position_x, row.position_y],
+    "last_updated": lambda row: row.last_updated,
+    "deleted_at": lambda row: row.deleted_at,
+}
+
+
+def parse_fields(value: str | None) -> tuple[str, ...] | None:
+    """Parse a comma-separated ``?fields=`` list (``None``: every field).
+
+    ``id`` is always included; the result is in response order, so equal
+    selections compare (and cache) equal.
+    """
+    if value is None:
+        return None
+    requested = {f.strip() for f in value.split(",") if f.strip()}
+    unknown = requested.difference(BOOKMARK_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    requested.add("id")
+    return tuple(f for f in BOOKMARK_FIELDS if f in requested)
+
+
+def folder_fields(fields: tuple[str, ...] | None) -> tuple[str, ...] | None:
+    """The folder part of a ``parse_fields`` selection."""
+    if fields is None:
+        return None
+    return tuple(f for f in fields if f in FOLDER_FIELDS)
+
+
+def projected_dict(row, fields: tuple[str, ...]) -> dict:
+    """Only ``fields`` of a row selected with ``queries.project``."""
+    return {name: _FIELD_VALUES[name](row) for name in fields}
+
+
+def json_response(content, status_code: int = 200, headers=None) -> Response:
+    """Encode ``content`` (dicts, lists, datetimes, models) as a JSON response."""
+    return Response(
+        to_json(content),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
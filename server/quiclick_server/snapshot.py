@@ -0,0 +1,136 @@
+"""Binary SQLite snapshots of a user database.
+
+Export copies the live database with SQLite's online backup API into a
+temporary file, which is then streamed to the client and removed; readers and
+writers aren't blocked for longer than one backup step. Restore receives a
+database file, checks that it is an intact QuiClick database no newer than
+``USER_SCHEMA_VERSION``, migrates it to the current schema and atomically
+replaces the user's file with it.
+"""
+
+import os
+import sqlite3
+import tempfile
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from quiclick_server.database import (
+    USER_SCHEMA_VERSION,
+    _migrate_user_db,
+    create_user_engine,
+)
+
+SQLITE_MEDIA_TYPE = "application/vnd.sqlite3"
+
+_SQLITE_MAGIC = b"SQLite format 3\x00"
+_REQUIRED_TABLES = {"items"}
+_CHUNK = 64 * 1024
+
+# Pages copied per backup step; the source is only locked during a step
+_BACKUP_PAGES = 1024
+
+
+def _temp_path(db_path: Path, suffix: str) -> Path:
+    # Same directory as the database, so os.replace() is atomic
+    fd, name = tempfile.mkstemp(
+        prefix=f".{db_path.stem}-", suffix=suffix, dir=db_path.parent
+    )
+    os.close(fd)
+    return Path(name)
+
+
+def create_snapshot(db_path: Path) -> Path:
+    """Back up ``db_path`` into a new temporary file and return its path."""
+    target = _temp_path(db_path, ".snapshot")
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst, pages=_BACKUP_PAGES)
+        # Receipts of past requests mean nothing on another copy
+        dst.execute("DELETE FROM idempotency_keys")
+        dst.commit()
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+    finally:
+        dst.close()
+        src.close()
+    return target
+
+
+def iter_snapshot(path: Path) -> Iterator[bytes]:
+    """Yield a snapshot file in chunks, removing it afterwards."""
+    try:
+        with path.open("rb") as f:
+            while chunk := f.read(_CHUNK):
+                yield chunk
+    finally:
+        path.unlink(missing_ok=True)
+
+
+async def receive_snapshot(db_path: Path, chunks: AsyncIterator[bytes]) -> Path:
+    """Write an uploaded snapshot to a temporary file next to ``db_path``."""
+    target = _temp_path(db_path, ".restore")
+    try:
+        with target.open("wb") as f:
+            async for chunk in chunks:
+                f.write(chunk)
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+    return target
+
+
+def _invalid(detail: str) -> HTTPException:
+    return HTTPException(status_code=422, detail=f"Invalid snapshot: {detail}")
+
+
+def _validate(path: Path):
+    with path.open("rb") as f:
+        if f.read(len(_SQLITE_MAGIC)) != _SQLITE_MAGIC:
+            raise _invalid("not an SQLite database")
+    conn = sqlite3.connect(path)
+    try:
+        if conn.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+            raise _invalid("database is corrupt")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > USER_SCHEMA_VERSION:
+            raise _invalid(
+                f"schema version {version} is newer than {USER_SCHEMA_VERSION}"
+            )
+        tables = {
+            name
+            for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        missing = _REQUIRED_TABLES - tables
+        if missing:
+            raise _invalid(f"missing tables {', '.join(sorted(missing))}")
+    except sqlite3.DatabaseError as e:
+        raise _invalid(str(e))
+    finally:
+        conn.close()
+
+
+def restore_snapshot(db_path: Path, upload: Path):
+    """Validate and migrate ``upload``, then atomically make it ``db_path``.
+
+    ``upload`` is consumed: it is moved into place or removed on error.
+    """
+    try:
+        _validate(upload)
+        engine = create_user_engine(upload)
+        try:
+            _migrate_user_db(engine)
+            with engine.begin() as conn:
+                conn.exec_driver_sql("DELETE FROM idempotency_keys")
+        finally:
+            engine.dispose()
+        with upload.open("rb") as f:
+            os.fsync(f.fileno())
+        os.replace(upload, db_path)
+    finally:
+        upload.unlink(missing_ok=True)
@@ -0,0 +1,128 @@
+"""Materialized full-sync response bodies.
+
+A full pull (``GET /changes`` without ``If-Modified-Since``) and the JSON
+``GET /export`` serialize a whole account. Their bodies are cached per user
+database and keyed by ``data_version``, taken before the data was read, so
+any committed write (from any process) makes an entry stale; a stale entry
+is replaced on its next lookup. Compressed variants are added per negotiated
+``Content-Encoding`` on first use. Entries are evicted least recently used
+once bodies and variants together exceed ``sync_cache_bytes`` (0 disables
+caching; responses are still compressed).
+"""
+
+import threading
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from quiclick_server import compression
+from quiclick_server.config import cfg
+
+# Response headers not copied into an entry (recomputed per response)
+_DROPPED_HEADERS = {"content-length", "content-type", "content-encoding"}
+
+
+class CachedBody:
+    """Serialized response body plus its compressed variants."""
+
+    __slots__ = ("key", "version", "media_type", "headers", "body", "variants")
+
+    def __init__(self, key, version, media_type: str, headers: dict, body: bytes):
+        self.key = key
+        self.version = version
+        self.media_type = media_type
+        self.headers = headers
+        self.body = body
+        self.variants: dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.variants.values())
+
+
+_lock = threading.Lock()
+_entries: OrderedDict[tuple[str, str], CachedBody] = OrderedDict()
+_size = 0
+hits = 0
+misses = 0
+
+
+def _evict():
+    global _size
+    while _entries and _size > cfg.sync_cache_bytes:
+        _, entry = _entries.popitem(last=False)
+        _size -= entry.size
+
+
+def lookup(db_path, kind: str, version) -> CachedBody | None:
+    """Return the cached ``kind`` body of a database if still at ``version``."""
+    global hits, misses
+    key = (str(db_path), kind)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None or version is None or entry.version != version:
+            misses += 1
+            return None
+        _entries.move_to_end(key)
+        hits += 1
+        return entry
+
+
+def store(db_path, kind: str, version, response: Response) -> CachedBody:
+    """Cache a rendered response's body (when it fits) and return the entry."""
+    global _size
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name not in _DROPPED_HEADERS
+    }
+    key = (str(db_path), kind)
+    entry = CachedBody(key, version, response.media_type, headers, response.body)
+    if version is None or entry.size > cfg.sync_cache_bytes:
+        return entry
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _size -= old.size
+        _entries[key] = entry
+        _size += entry.size
+        _evict()
+    return entry
+
+
+def _variant(entry: CachedBody, encoding: str) -> bytes:
+    global _size
+    with _lock:
+        body = entry.variants.get(encoding)
+    if body is not None:
+        return body
+    body = compression.compress(entry.body, encoding)
+    with _lock:
+        if encoding not in entry.variants:
+            entry.variants[encoding] = body
+            if _entries.get(entry.key) is entry:
+                _size += len(body)
+                _evict()
+    return body
+
+
+def respond(request: Request, entry: CachedBody) -> Response:
+    """Build the response for ``entry``, compressed if the client accepts it."""
+    headers = {**entry.headers, "Vary": "Accept-Encoding"}
+    encoding = compression.negotiate(request.headers.get("Accept-Encoding"))
+    if encoding is None or len(entry.body) < cfg.compression_min_bytes:
+        return Response(entry.body, media_type=entry.media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(
+        _variant(entry, encoding), media_type=entry.media_type, headers=headers
+    )
+
+
+def clear():
+    """Drop every entry (tests, config changes)."""
+    global _size, hits, misses
+    with _lock:
+        _entries.clear()
+        _size = 0
+        hits = misses = 0
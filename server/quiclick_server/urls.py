@@ -0,0 +1,58 @@
+"""Normalized URLs, the key duplicate bookmarks are detected by.
+
+``normalize_url`` maps URLs that open the same page to one string: the
+scheme and host are lowercased, default ports, a trailing slash and
+tracking parameters (``utm_*``, click ids...) are dropped. Everything else,
+including the order and encoding of the remaining query parameters and the
+fragment (single-page apps route on it), is kept as written. Bookmarks store
+it in ``items.url_key``, indexed for live bookmarks.
+"""
+
+from urllib.parse import urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+_TRACKING_PREFIXES = ("utm_",)
+_TRACKING_PARAMS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "dclid",
+        "gbraid",
+        "wbraid",
+        "msclkid",
+        "yclid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "_ga",
+        "_gl",
+    }
+)
+
+
+def _is_tracking(param: str) -> bool:
+    name = param.partition("=")[0].lower()
+    return name in _TRACKING_PARAMS or name.startswith(_TRACKING_PREFIXES)
+
+
+def normalize_url(url: str) -> str:
+    """Duplicate-detection key of ``url``.
+
+    URLs ``urlsplit`` can't parse are only stripped of surrounding space.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    userinfo, at, host = parts.netloc.rpartition("@")
+    host = host.lower()
+    default_port = _DEFAULT_PORTS.get(scheme)
+    if default_port and host.endswith(default_port):
+        host = host[: -len(default_port)]
+    path = parts.path.rstrip("/")
+    query = "&".join(
+        param for param in parts.query.split("&") if param and not _is_tracking(param)
+    )
+    return urlunsplit((scheme, userinfo + at + host, path, query, parts.fragment))
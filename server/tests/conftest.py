@@ -16,10 +16,16 @@ def _env_setup(tmp_path):
     os.environ["QUICLICK_DATA_DIR"] = str(tmp_path / "data")
 
     # Reset config cache so it picks up the new env vars
+    from quiclick_server import coalesce, sync_cache
     from quiclick_server.config import reset_config
 
     reset_config()
+    sync_cache.clear()
+    coalesce.clear()
 
     yield
 
+    from quiclick_server.database import dispose_user_engines
+
+    dispose_user_engines()
     reset_config()
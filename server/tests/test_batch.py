@@ -0,0 +1,138 @@
+"""Tests for the batch mutation endpoint."""
+
+from starlette.testclient import TestClient
+
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+from quiclick_server.routes import batch
+
+TEST_SUB = "test-user-batch"
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def test_batch_resolves_local_ids():
+    client = _authenticated_client()
+    resp = client.post(
+        "/batch",
+        json={
+            "operations": [
+                {
+                    "type": "create_folder",
+                    "local_id": 1700000000001,
+                    "payload": {"title": "Work"},
+                },
+                {
+                    "type": "create_bookmark",
+                    "local_id": 1700000000002,
+                    "payload": {
+                        "title": "GH",
+                        "url": "https://github.com",
+                        "parent_id": 1700000000001,
+                    },
+                },
+                {
+                    "type": "update_bookmark",
+                    "id": 1700000000002,
+                    "payload": {"title": "GitHub"},
+                },
+                {"type": "update_settings", "payload": {"tiles_per_row": 6}},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [r["status"] for r in data["results"]] == [201, 201, 200, 200]
+    fid = data["id_map"]["1700000000001"]
+    bid = data["id_map"]["1700000000002"]
+
+    bookmark = client.get(f"/bookmarks/{bid}").json()
+    assert bookmark["title"] == "GitHub"
+    assert bookmark["parent_id"] == fid
+    assert client.get("/settings").json()["tiles_per_row"] == 6
+    _cleanup()
+
+
+def test_batch_creates_at_same_cell_do_not_conflict():
+    client = _authenticated_client()
+    ops = [
+        {
+            "type": "create_bookmark",
+            "local_id": f"l{i}",
+            "payload": {
+                "title": f"B{i}",
+                "url": f"https://{i}.com",
+                "position": [0, 0],
+            },
+        }
+        for i in range(3)
+    ]
+    resp = client.post("/batch", json={"operations": ops})
+    positions = [r["data"]["position"] for r in resp.json()["results"]]
+    assert positions == [[0, 0], [1, 0], [0, 1]]
+    assert len(client.get("/bookmarks").json()) == 3
+    _cleanup()
+
+
+def test_batch_failed_operation_is_rolled_back_alone():
+    client = _authenticated_client()
+    bid = client.post(
+        "/bookmarks", json={"title": "Keep", "url": "https://keep.com"}
+    ).json()["id"]
+
+    resp = client.post(
+        "/batch",
+        json={
+            "operations": [
+                {
+                    "type": "update_bookmark",
+                    "id": bid,
+                    "payload": {"title": "Changed", "url": None},
+                },
+                {"type": "delete_bookmark", "id": 9999},
+                {"type": "create_folder", "payload": {}},
+                {
+                    "type": "create_bookmark",
+                    "payload": {"title": "New", "url": "https://new.com"},
+                },
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    assert [r["status"] for r in resp.json()["results"]] == [422, 404, 422, 201]
+
+    # The half-applied update was rolled back, the create went through
+    assert client.get(f"/bookmarks/{bid}").json()["title"] == "Keep"
+    assert len(client.get("/bookmarks").json()) == 2
+    _cleanup()
+
+
+def test_batch_unexpected_error_rolls_back_everything(monkeypatch):
+    def broken_reorder(db, body):
+        raise RuntimeError("bug")
+
+    monkeypatch.setattr(batch, "_reorder_items", broken_reorder)
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    client = TestClient(app, raise_server_exceptions=False)
+    resp = client.post(
+        "/batch",
+        json={
+            "operations": [
+                {
+                    "type": "create_bookmark",
+                    "payload": {"title": "New", "url": "https://new.com"},
+                },
+                {"type": "reorder", "payload": {"items": []}},
+            ]
+        },
+    )
+    assert resp.status_code == 500
+    assert client.get("/bookmarks").json() == []
+    _cleanup()
@@ -283,11 +283,50 @@ def test_bookmark_with_favicon():
     _cleanup()
 
 
-# --- Position conflict (make_room) ---
+def test_field_projection():
+    from quiclick_server import queries
+
+    client = _authenticated_client()
+    folder = client.post("/folders", json={"title": "Work"}).json()
+    favicon = "data:image/png;base64,iVBORw0KGgo="
+    for parent_id in (None, folder["id"]):
+        client.post(
+            "/bookmarks",
+            json={
+                "title": "GH",
+                "url": "https://github.com",
+                "favicon": favicon,
+                "parent_id": parent_id,
+            },
+        )
+
+    resp = client.get("/bookmarks?fields=position,title")
+    assert [list(b) for b in resp.json()] == [["id", "title", "position"]] * 2
+    detail = client.get(f"/folders/{folder['id']}?fields=favicon").json()
+    assert detail["title"] == "Work"
+    child = detail["bookmarks"][0]
+    assert child == {"id": child["id"], "favicon": favicon}
+
+    changes = client.get("/changes?fields=url").json()
+    assert changes["folders"] == [{"id": folder["id"]}]
+    assert {b["url"] for b in changes["bookmarks"]} == {"https://github.com"}
+    assert "favicon" in client.get("/changes").json()["bookmarks"][0]
+
+    resp = client.get("/bookmarks?fields=id,secret")
+    assert resp.status_code == 422
+    assert resp.json()["detail"] == "Unknown fields: secret"
+
+    # Unselected columns aren't read at all
+    sql = str(queries.project(queries.LIVE_BOOKMARKS, ("id", "position")))
+    assert "favicon" not in sql and "url" not in sql
+    _cleanup()
+
+
+# --- Position conflict (nearest free cell) ---
 
 
-def test_create_bookmark_at_occupied_position_returns_409():
-    """Creating a bookmark at an occupied cell should return 409."""
+def test_create_bookmark_at_occupied_position_gets_nearest_free_cell():
+    """Creating a bookmark at an occupied cell places it at the nearest free one."""
     client = _authenticated_client()
 
     r1 = client.post(
@@ -296,11 +335,107 @@ def test_create_bookmark_at_occupied_position_returns_409():
     )
     assert r1.status_code == 201
 
-    # Creating another at the same position should conflict
+    # Creating another at the same position is resolved server-side
     r2 = client.post(
         "/bookmarks",
         json={"title": "B", "url": "https://b.com", "position": [0, 0]},
     )
-    assert r2.status_code == 409
-    assert r2.json()["detail"] == "Position conflict"
+    assert r2.status_code == 201
+    assert r2.json()["position"] == [1, 0]
+    _cleanup()
+
+
+def test_move_bookmark_to_occupied_position_gets_nearest_free_cell():
+    client = _authenticated_client()
+
+    for x in range(3):
+        client.post(
+            "/bookmarks",
+            json={"title": f"R{x}", "url": f"https://r{x}.com", "position": [x, 0]},
+        )
+    r = client.post(
+        "/bookmarks",
+        json={"title": "M", "url": "https://m.com", "position": [5, 2]},
+    )
+    bid = r.json()["id"]
+
+    resp = client.patch(f"/bookmarks/{bid}", json={"position": [1, 0]})
+    assert resp.status_code == 200
+    assert resp.json()["position"] == [1, 1]
+
+    # Moving onto its own cell is not a conflict
+    resp = client.patch(f"/bookmarks/{bid}", json={"position": [1, 1]})
+    assert resp.json()["position"] == [1, 1]
+    _cleanup()
+
+
+def test_deleted_bookmark_frees_its_cell():
+    client = _authenticated_client()
+
+    r1 = client.post(
+        "/bookmarks",
+        json={"title": "A", "url": "https://a.com", "position": [2, 0]},
+    )
+    client.delete(f"/bookmarks/{r1.json()['id']}")
+
+    r2 = client.post(
+        "/bookmarks",
+        json={"title": "B", "url": "https://b.com", "position": [2, 0]},
+    )
+    assert r2.json()["position"] == [2, 0]
+    _cleanup()
+
+
+# --- Bulk create ---
+
+
+def test_bulk_create_assigns_positions_and_reports_bad_rows():
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "Existing", "url": "https://e.com"})
+
+    resp = client.post(
+        "/bookmarks/bulk",
+        json={
+            "bookmarks": [
+                {"title": "A", "url": "https://a.com"},
+                {"title": "Missing URL"},
+                {"title": "B", "url": "https://b.com", "position": [0, 0]},
+                {"title": "C", "url": "https://c.com"},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["created"] == 3
+    assert [r["status"] for r in data["results"]] == [201, 422, 201, 201]
+    # Requested cells are placed first, the rest appended after them
+    assert data["results"][2]["position"] == [1, 0]
+    assert data["results"][0]["position"] == [2, 0]
+    assert data["results"][3]["position"] == [3, 0]
+
+    bookmarks = client.get("/bookmarks").json()
+    assert [b["title"] for b in bookmarks] == ["Existing", "B", "A", "C"]
+
+    # Single creates still see the bulk-inserted cells
+    resp = client.post("/bookmarks", json={"title": "D", "url": "https://d.com"})
+    assert resp.json()["position"] == [4, 0]
+    _cleanup()
+
+
+def test_bulk_create_invalidates_occupancy_index(monkeypatch):
+    from quiclick_server import occupancy
+
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "Existing", "url": "https://e.com"})
+    # Only the commit hooks may tell the cached index about the bulk rows
+    monkeypatch.setattr(occupancy, "_file_stamp", lambda path: "fixed")
+
+    bulk = {"bookmarks": [{"title": "A", "url": "https://a.com", "position": [5, 5]}]}
+    assert client.post("/bookmarks/bulk", json=bulk).status_code == 200
+    resp = client.post(
+        "/bookmarks",
+        json={"title": "B", "url": "https://b.com", "position": [5, 5]},
+    )
+    assert resp.status_code == 201
+    assert resp.json()["position"] == [4, 5]
     _cleanup()
@@ -0,0 +1,136 @@
+"""Tests for single-flight coalescing of concurrent identical reads."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from starlette.testclient import TestClient
+
+from quiclick_server import coalesce
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+
+TEST_SUB = "test-user-coalesce"
+PAST = {"If-Modified-Since": "Wed, 01 Jan 2020 00:00:00 GMT"}
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def _concurrently(count: int, call) -> list:
+    with ThreadPoolExecutor(count) as pool:
+        return list(pool.map(lambda _: call(), range(count)))
+
+
+def test_run_shares_one_computation():
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(coalesce.run, "u", "e", 1, compute) for _ in range(4)]
+        time.sleep(0.2)
+        release.set()
+        values = {id(f.result()) for f in futures}
+    assert len(calls) == 1 and len(values) == 1
+    assert coalesce.stats() == {"e": {"computed": 1, "shared": 3, "ratio": 0.75}}
+
+    # Other keys, and no validator, aren't shared
+    assert coalesce.run("u", "e", 2, lambda: 2) == 2
+    assert coalesce.run("u", "e", None, lambda: 3) == 3
+    assert coalesce.stats()["e"]["computed"] == 2
+
+
+def test_followers_retry_after_leader_fails():
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            raise RuntimeError("boom")
+        return "ok"
+
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(coalesce.run, "u", "e", 1, compute) for _ in range(3)]
+        time.sleep(0.2)
+        release.set()
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except RuntimeError:
+                outcomes.append("failed")
+    assert sorted(outcomes) == ["failed", "ok", "ok"]
+
+
+def test_concurrent_changes_share_one_response(monkeypatch):
+    from quiclick_server.routes import changes
+
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+    calls = []
+    changes_since = changes._changes_since
+
+    def slow(*args):
+        calls.append(1)
+        time.sleep(0.3)
+        return changes_since(*args)
+
+    monkeypatch.setattr(changes, "_changes_since", slow)
+    responses = _concurrently(4, lambda: client.get("/changes", headers=PAST))
+    assert len(calls) == 1
+    assert {r.content for r in responses} == {responses[0].content}
+    assert all(r.headers["Last-Modified"] for r in responses)
+    assert responses[0].json()["bookmarks"][0]["title"] == "GH"
+    assert coalesce.stats()["changes"]["shared"] == 3
+    metrics = client.get("/metrics").json()["coalesce"]
+    assert metrics["changes"] == {"computed": 1, "shared": 3, "ratio": 0.75}
+
+    # A write in between starts a new computation
+    client.post("/bookmarks", json={"title": "New", "url": "https://new.com"})
+    assert len(client.get("/changes", headers=PAST).json()["bookmarks"]) == 2
+    assert len(calls) == 2
+    _cleanup()
+
+
+@pytest.mark.parametrize("enabled", ["1", "0"])
+def test_concurrent_listings(monkeypatch, enabled):
+    monkeypatch.setenv("QUICLICK_COALESCE_READS", enabled)
+    from quiclick_server.config import reset_config
+    from quiclick_server.routes import bookmarks
+
+    reset_config()
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+    calls = []
+    bookmark_dicts = bookmarks._bookmark_dicts
+
+    def slow(*args):
+        calls.append(1)
+        time.sleep(0.3)
+        return bookmark_dicts(*args)
+
+    monkeypatch.setattr(bookmarks, "_bookmark_dicts", slow)
+    responses = _concurrently(3, lambda: client.get("/bookmarks?fields=title"))
+    assert [r.json() for r in responses] == [[{"id": 1, "title": "GH"}]] * 3
+    assert len({r.headers["ETag"] for r in responses}) == 1
+    assert len(calls) == (1 if enabled == "1" else 3)
+    _cleanup()
+
+
+def test_metrics_need_a_session():
+    resp = TestClient(app).get("/metrics")
+    assert resp.status_code == 401
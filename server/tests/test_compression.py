@@ -0,0 +1,92 @@
+"""Tests for response compression."""
+
+import gzip
+from pathlib import Path
+
+from starlette.testclient import TestClient
+
+from quiclick_server import compression
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+
+TEST_SUB = "test-user-compression"
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def _raw(client: TestClient, path: str, encoding: str):
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as resp:
+        return resp.headers, b"".join(resp.iter_raw())
+
+
+def _seed(client: TestClient):
+    rows = [{"title": f"B{i}", "url": f"https://b{i}.com"} for i in range(50)]
+    client.post("/bookmarks/bulk", json={"bookmarks": rows})
+
+
+def test_negotiate():
+    assert compression.negotiate("gzip, deflate") == "gzip"
+    assert compression.negotiate("gzip;q=0, deflate") is None
+    assert compression.negotiate("identity") is None
+    assert compression.negotiate("*") == compression.ENCODINGS[0]
+    assert compression.negotiate("*, gzip;q=0") in (None, "zstd", "br")
+    assert compression.negotiate(None) is None
+
+
+def test_json_response_is_compressed(monkeypatch):
+    client = _authenticated_client()
+    _seed(client)
+    plain_headers, plain = _raw(client, "/bookmarks", "identity")
+    assert "content-encoding" not in plain_headers
+
+    # Large bodies go through the threadpool; same output
+    for offload in (compression._OFFLOAD_BYTES, 0):
+        monkeypatch.setattr(compression, "_OFFLOAD_BYTES", offload)
+        headers, body = _raw(client, "/bookmarks", "gzip")
+        assert headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in headers["vary"]
+        assert int(headers["content-length"]) == len(body) < len(plain)
+        assert gzip.decompress(body) == plain
+    _cleanup()
+
+
+def test_small_and_binary_responses_are_not_compressed():
+    client = _authenticated_client()
+    _seed(client)
+    headers, _ = _raw(client, "/settings", "gzip")
+    assert "content-encoding" not in headers
+    headers, body = _raw(client, "/export?format=sqlite", "gzip")
+    assert "content-encoding" not in headers
+    assert body.startswith(b"SQLite format 3\x00")
+    _cleanup()
+
+
+def test_streamed_response_is_compressed():
+    client = _authenticated_client()
+    _seed(client)
+    _, plain = _raw(client, "/export?format=ndjson", "identity")
+    headers, body = _raw(client, "/export?format=ndjson", "gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    # Only the export_date of the header record differs
+    assert gzip.decompress(body).split(b"\n")[1:] == plain.split(b"\n")[1:]
+    _cleanup()
+
+
+def test_compression_level(monkeypatch):
+    from quiclick_server.config import reset_config
+
+    body = Path(compression.__file__).read_bytes()
+    sizes = []
+    for level in ("1", "9"):
+        monkeypatch.setenv("QUICLICK_COMPRESSION_LEVEL", level)
+        reset_config()
+        sizes.append(len(compression.compress(body, "gzip")))
+    assert sizes[1] < sizes[0]
@@ -0,0 +1,165 @@
+"""Tests for normalized URLs and duplicate detection."""
+
+import json
+
+from starlette.testclient import TestClient
+
+from quiclick_server import bulk, html_import
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+from quiclick_server.urls import normalize_url
+
+TEST_SUB = "test-user-duplicates"
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def test_normalize_url():
+    assert normalize_url(" HTTPS://GitHub.COM:443/ ") == "https://github.com"
+    assert normalize_url("http://ex.com:80/a/?utm_source=x&b=2&fbclid=1&a=1") == (
+        "http://ex.com/a?b=2&a=1"
+    )
+    # Path case, other ports, fragments and schemes are significant
+    url = "https://ex.com:8443/A#/route"
+    assert normalize_url(url) == url
+    assert normalize_url("http://ex.com") != normalize_url("https://ex.com")
+    assert normalize_url("http://[::1") == "http://[::1"
+
+
+def test_create_skip_and_report():
+    client = _authenticated_client()
+    first = client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+    again = {"title": "GH 2", "url": "https://GitHub.com/?utm_medium=email"}
+
+    resp = client.post("/bookmarks?on_duplicate=skip", json=again)
+    assert resp.status_code == 200 and resp.json() == first.json()
+    second = client.post("/bookmarks", json=again)
+    assert second.status_code == 201
+    other = client.post("/bookmarks", json={"title": "O", "url": "https://o.com"})
+
+    resp = client.get("/bookmarks/duplicates")
+    ids = [first.json()["id"], second.json()["id"]]
+    assert resp.json() == [{"url_key": "https://github.com", "ids": ids}]
+    etag = resp.headers["ETag"]
+    resp = client.get("/bookmarks/duplicates", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+    # Updates move bookmarks between groups; deleted ones leave them
+    oid = other.json()["id"]
+    client.patch(f"/bookmarks/{oid}", json={"url": "http://github.com"})
+    client.put(f"/bookmarks/{oid}", json={"title": "O", "url": "https://github.com/"})
+    groups = client.get("/bookmarks/duplicates").json()
+    assert groups == [{"url_key": "https://github.com", "ids": [*ids, oid]}]
+    client.delete(f"/bookmarks/{ids[0]}")
+    resp = client.post("/bookmarks?on_duplicate=skip", json=again)
+    assert resp.json()["id"] == ids[1]
+    client.delete(f"/bookmarks/{ids[1]}")
+    assert client.get("/bookmarks/duplicates").json() == []
+    _cleanup()
+
+
+def test_bulk_skip():
+    client = _authenticated_client()
+    gh = {"title": "GH", "url": "https://github.com"}
+    existing = client.post("/bookmarks", json=gh)
+    rows = [
+        {"title": "A", "url": "https://a.com/"},
+        {"title": "GH", "url": "https://github.com/?gclid=1"},
+        {"title": "A again", "url": "HTTPS://A.COM"},
+        {"title": "B", "url": "https://b.com"},
+    ]
+    resp = client.post("/bookmarks/bulk?on_duplicate=skip", json={"bookmarks": rows})
+    body = resp.json()
+    assert body["created"] == 2
+    statuses = [(r["status"], r["id"]) for r in body["results"]]
+    a_id = statuses[0][1]
+    assert statuses[1] == (200, existing.json()["id"])
+    assert statuses[2] == (200, a_id)
+    assert statuses[3][0] == 201
+    # Skipped rows don't take a cell
+    positions = [b["position"] for b in client.get("/bookmarks").json()]
+    assert positions == [[0, 0], [1, 0], [2, 0]]
+    assert client.get("/bookmarks/duplicates").json() == []
+    _cleanup()
+
+
+def test_import_skip():
+    client = _authenticated_client()
+    records = [
+        {"type": "header", "version": 1},
+        *(
+            {
+                "type": "bookmark",
+                "id": item_id,
+                "title": url,
+                "url": url,
+                "favicon": None,
+                "date_added": "2025-01-01T00:00:00",
+                "parent_id": None,
+                "position": [item_id, 0],
+            }
+            for item_id, url in enumerate(
+                ["https://a.com", "https://a.com/", "https://b.com"], 1
+            )
+        ),
+    ]
+    ndjson = "".join(json.dumps(record) + "\n" for record in records)
+    headers = {"Content-Type": "application/x-ndjson"}
+    for mode in ("replace", "merge"):
+        resp = client.post(
+            f"/import?mode={mode}&on_duplicate=skip", content=ndjson, headers=headers
+        )
+        assert resp.json()["bookmarks"] == 2 and resp.json()["skipped"] == 1
+        assert [b["id"] for b in client.get("/bookmarks").json()] == [1, 3]
+
+    # Merging without skipping adds the duplicate back
+    resp = client.post("/import?mode=merge", content=ndjson, headers=headers)
+    assert resp.json()["changes"]["inserted"] == [2]
+    assert client.get("/bookmarks/duplicates").json() == [
+        {"url_key": "https://a.com", "ids": [1, 2]}
+    ]
+
+    html = (
+        "<DL><p><DT><A HREF='https://B.com/'>B</A>"
+        "<DT><A HREF='https://c.com'>C</A><DT><A HREF='https://c.com/'>C</A></DL>"
+    )
+    resp = client.post(
+        "/import/html?on_duplicate=skip",
+        content=html,
+        headers={"Content-Type": "text/html"},
+    )
+    assert resp.json()["bookmarks"] == 1 and resp.json()["skipped"] == 2
+    titles = [b["title"] for b in client.get("/bookmarks").json()]
+    assert titles == ["https://a.com", "https://a.com/", "https://b.com", "C"]
+    _cleanup()
+
+
+def test_skip_across_batches(monkeypatch):
+    monkeypatch.setattr(bulk, "_KEYS_PER_QUERY", 2)
+    monkeypatch.setattr(html_import, "HTML_IMPORT_BATCH", 2)
+    client = _authenticated_client()
+    urls = [f"https://site{i}.com" for i in range(5)]
+    rows = [{"title": url, "url": url} for url in urls]
+    client.post("/bookmarks/bulk", json={"bookmarks": rows[:3]})
+
+    resp = client.post("/bookmarks/bulk?on_duplicate=skip", json={"bookmarks": rows})
+    assert [r["status"] for r in resp.json()["results"]] == [200, 200, 200, 201, 201]
+
+    # Duplicates of earlier batches are skipped and take no cell
+    entries = "".join(f"<DT><A HREF='{url}/'>x</A>" for url in urls[2:] + ["b", "b"])
+    resp = client.post(
+        "/import/html?on_duplicate=skip",
+        content=f"<DL><p><DT><A HREF='https://new.com'>N</A>{entries}</DL>",
+        headers={"Content-Type": "text/html"},
+    )
+    assert resp.json()["bookmarks"] == 2 and resp.json()["skipped"] == 4
+    positions = [b["position"] for b in client.get("/bookmarks").json()]
+    assert positions == [[x, 0] for x in range(7)]
+    _cleanup()
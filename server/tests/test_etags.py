@@ -0,0 +1,139 @@
+"""Tests for ETags, If-None-Match and If-Match."""
+
+from starlette.testclient import TestClient
+
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+
+TEST_SUB = "test-user-etags"
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def test_listing_not_modified(monkeypatch):
+    from quiclick_server.routes import bookmarks
+
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+    resp = client.get("/bookmarks")
+    etag = resp.headers["ETag"]
+    assert etag.startswith('"') and resp.json()
+
+    # Answered before any listing query runs
+    def fail(*args):
+        raise AssertionError("listing was queried")
+
+    with monkeypatch.context() as m:
+        m.setattr(bookmarks.queries, "project", fail)
+        resp = client.get("/bookmarks", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["ETag"] == etag and resp.content == b""
+        weak = client.get("/bookmarks", headers={"If-None-Match": f'"x", W/{etag}'})
+        assert weak.status_code == 304
+
+    # Other query strings are other representations
+    assert client.get("/bookmarks?fields=id").headers["ETag"] != etag
+    folders = client.get("/folders")
+    assert folders.headers["ETag"] != etag
+    resp = client.get("/folders", headers={"If-None-Match": folders.headers["ETag"]})
+    assert resp.status_code == 304
+
+    client.post("/bookmarks", json={"title": "New", "url": "https://new.com"})
+    resp = client.get("/bookmarks", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert len(resp.json()) == 2
+    _cleanup()
+
+
+def test_bookmark_if_match():
+    client = _authenticated_client()
+    bm = client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+    other = client.post("/bookmarks", json={"title": "O", "url": "https://o.com"})
+    bid = bm.json()["id"]
+    etag = client.get(f"/bookmarks/{bid}").headers["ETag"]
+
+    # Row tags ignore changes to other rows
+    client.patch(f"/bookmarks/{other.json()['id']}", json={"title": "O2"})
+    resp = client.get(f"/bookmarks/{bid}", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+    resp = client.patch(
+        f"/bookmarks/{bid}", json={"title": "Mine"}, headers={"If-Match": etag}
+    )
+    assert resp.status_code == 200
+    new_etag = resp.headers["ETag"]
+    assert new_etag != etag
+
+    # A writer holding the old tag loses
+    resp = client.put(
+        f"/bookmarks/{bid}",
+        json={"title": "Theirs", "url": "https://github.com"},
+        headers={"If-Match": etag},
+    )
+    assert resp.status_code == 412
+    assert client.get(f"/bookmarks/{bid}").json()["title"] == "Mine"
+    assert client.get(f"/bookmarks/{bid}").headers["ETag"] == new_etag
+    any_tag = {"If-Match": "*"}
+    resp = client.patch(f"/bookmarks/{bid}", json={"title": "Any"}, headers=any_tag)
+    assert resp.status_code == 200
+    resp = client.patch("/bookmarks/999", json={"title": "x"}, headers=any_tag)
+    assert resp.status_code == 404
+    _cleanup()
+
+
+def test_folder_tag_covers_children():
+    client = _authenticated_client()
+    folder = client.post("/folders", json={"title": "Work"}).json()
+    child = client.post(
+        "/bookmarks",
+        json={"title": "GH", "url": "https://github.com", "parent_id": folder["id"]},
+    ).json()
+    etag = client.get(f"/folders/{folder['id']}").headers["ETag"]
+    resp = client.get(f"/folders/{folder['id']}", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+    client.patch(f"/bookmarks/{child['id']}", json={"parent_id": None})
+    resp = client.get(f"/folders/{folder['id']}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.json()["bookmarks"] == []
+
+    resp = client.put(
+        f"/folders/{folder['id']}", json={"title": "Old"}, headers={"If-Match": etag}
+    )
+    assert resp.status_code == 412
+    current = client.get(f"/folders/{folder['id']}").headers["ETag"]
+    resp = client.put(
+        f"/folders/{folder['id']}", json={"title": "New"}, headers={"If-Match": current}
+    )
+    assert resp.status_code == 200
+    current = client.get(f"/folders/{folder['id']}").headers["ETag"]
+    assert resp.headers["ETag"] == current
+    _cleanup()
+
+
+def test_compressed_representation_has_own_tag():
+    client = _authenticated_client()
+    rows = [{"title": f"B{i}", "url": f"https://b{i}.com"} for i in range(50)]
+    client.post("/bookmarks/bulk", json={"bookmarks": rows})
+
+    plain = client.get("/bookmarks", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/bookmarks", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    etag = plain.headers["ETag"]
+    assert gzipped.headers["ETag"] == etag[:-1] + '-gzip"'
+
+    # Either form validates the listing; the 304 repeats the one sent
+    for tag in (etag, gzipped.headers["ETag"]):
+        resp = client.get(
+            "/bookmarks",
+            headers={"If-None-Match": tag, "Accept-Encoding": "gzip"},
+        )
+        assert resp.status_code == 304 and resp.headers["ETag"] == tag
+    _cleanup()
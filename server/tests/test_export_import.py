@@ -1,5 +1,8 @@
 """Tests for export/import endpoints."""
 
+import json
+import os
+
 from starlette.testclient import TestClient
 
 from quiclick_server.database import get_current_user
@@ -7,6 +10,11 @@ from quiclick_server.main import app
 
 TEST_SUB = "test-user-export"
 
+PNG_DATA_URL = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4"
+    "nGP4DwABAQEABRjYTgAAAABJRU5ErkJggg=="
+)
+
 
 def _authenticated_client() -> TestClient:
     app.dependency_overrides[get_current_user] = lambda: TEST_SUB
@@ -77,3 +85,560 @@ def test_import_round_trip():
     settings = client.get("/settings").json()
     assert settings["tile_gap"] == 4
     _cleanup()
+
+
+def test_export_ndjson_matches_json_export():
+    client = _authenticated_client()
+    folder = client.post("/folders", json={"title": "Work"}).json()
+    client.post(
+        "/bookmarks",
+        json={
+            "title": "GH",
+            "url": "https://github.com",
+            "favicon": PNG_DATA_URL,
+            "parent_id": folder["id"],
+        },
+    )
+    client.patch("/settings", json={"tiles_per_row": 5})
+    full = client.get("/export").json()
+
+    resp = client.get("/export?format=ndjson")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in resp.text.splitlines()]
+
+    assert [r["type"] for r in records] == ["header", "settings", "folder", "bookmark"]
+    assert records[0]["version"] == 1
+    assert records[1]["tiles_per_row"] == 5
+    folder_rec = {k: v for k, v in records[2].items() if k != "type"}
+    bookmark_rec = {k: v for k, v in records[3].items() if k != "type"}
+    assert folder_rec["position"] == full["folders"][0]["position"]
+    assert folder_rec["id"] == full["folders"][0]["id"]
+    assert bookmark_rec["favicon"] == full["bookmarks"][0]["favicon"]
+    assert bookmark_rec["parent_id"] == folder["id"]
+
+    # Accept header selects the same format
+    resp = client.get("/export", headers={"Accept": "application/x-ndjson"})
+    assert len(resp.text.splitlines()) == 4
+    assert client.get("/export?format=xml").status_code == 422
+    _cleanup()
+
+
+def test_streamed_export_does_not_block_writes(monkeypatch):
+    import sqlite3
+
+    from quiclick_server.database import user_db_path
+    from quiclick_server.routes import export_import
+
+    client = _authenticated_client()
+    client.post("/folders", json={"title": "Work"})
+    client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+    live = user_db_path(TEST_SUB)
+    records = export_import._iter_ndjson_records
+    writes = []
+
+    def write_midway(*args):
+        for chunk in records(*args):
+            yield chunk
+            # A writer on the live file while the export is still streaming
+            conn = sqlite3.connect(live, timeout=0.2)
+            try:
+                with conn:
+                    conn.execute("UPDATE settings SET tile_gap = tile_gap")
+                writes.append(True)
+            except sqlite3.OperationalError:
+                writes.append(False)
+            finally:
+                conn.close()
+
+    monkeypatch.setattr(export_import, "_iter_ndjson_records", write_midway)
+    resp = client.get("/export?format=ndjson")
+    assert len(resp.text.splitlines()) == 3
+    assert writes and all(writes)
+    # The snapshot it streamed from is gone
+    assert not list(live.parent.glob(f".{live.stem}-*"))
+    _cleanup()
+
+
+def test_export_marker_header_matches_body(monkeypatch):
+    import sqlite3
+    from datetime import datetime
+
+    from quiclick_server.importer import to_micros
+    from quiclick_server.routes import export_import
+
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+    create_snapshot = export_import.create_snapshot
+
+    def write_first(db_path):
+        # A write committed while the export request is being handled
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("UPDATE items SET last_updated = '2030-01-01 00:00:00'")
+        conn.close()
+        return create_snapshot(db_path)
+
+    monkeypatch.setattr(export_import, "create_snapshot", write_first)
+    resp = client.get("/export?format=ndjson")
+    header = json.loads(resp.text.splitlines()[0])
+    assert resp.headers["X-Export-Marker"] == header["marker"]
+    assert header["marker"] == str(to_micros(datetime(2030, 1, 1)))
+    _cleanup()
+
+
+def test_import_ndjson_round_trip():
+    client = _authenticated_client()
+    folder = client.post("/folders", json={"title": "Work"}).json()
+    client.post(
+        "/bookmarks",
+        json={"title": "GH", "url": "https://github.com", "parent_id": folder["id"]},
+    )
+    client.post("/bookmarks", json={"title": "Root", "url": "https://root.com"})
+    client.patch("/settings", json={"tile_gap": 4})
+    ndjson = client.get("/export?format=ndjson").content
+
+    client.post("/bookmarks", json={"title": "Gone", "url": "https://gone.com"})
+    resp = client.post(
+        "/import",
+        content=ndjson,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "detail": "Import successful",
+        "bookmarks": 2,
+        "folders": 1,
+        "changes": None,
+        "skipped": 0,
+    }
+
+    titles = {b["title"]: b for b in client.get("/bookmarks").json()}
+    assert set(titles) == {"GH", "Root"}
+    assert titles["GH"]["parent_id"] == folder["id"]
+    assert client.get("/settings").json()["tile_gap"] == 4
+    _cleanup()
+
+
+def test_import_json_array_streamed_in_chunks():
+    client = _authenticated_client()
+    records = [
+        {"type": "header", "version": 1},
+        {
+            "type": "folder",
+            "id": 1,
+            "title": "F",
+            "date_added": "2025-01-01T00:00:00",
+            "parent_id": None,
+            "position": [0, 0],
+        },
+    ] + [
+        {
+            "type": "bookmark",
+            "id": i,
+            "title": f"B{i} ✓",
+            "url": f"https://example.com/{i}",
+            "favicon": None,
+            "date_added": "2025-01-01T00:00:00",
+            "parent_id": 1,
+            "position": [i, 0],
+        }
+        for i in range(2, 30)
+    ]
+    body = json.dumps(records, ensure_ascii=False).encode()
+
+    def chunks():
+        # Small chunks split objects and multi-byte characters
+        for start in range(0, len(body), 7):
+            yield body[start : start + 7]
+
+    resp = client.post(
+        "/import", content=chunks(), headers={"Content-Type": "application/json"}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["bookmarks"] == 28
+    detail = client.get("/folders/1").json()
+    assert len(detail["bookmarks"]) == 28
+    assert detail["bookmarks"][0]["title"] == "B2 ✓"
+    _cleanup()
+
+
+def test_import_invalid_record_keeps_existing_data():
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "Keep", "url": "https://keep.com"})
+
+    body = (
+        b'{"type":"header","version":1}\n'
+        b'{"type":"bookmark","id":5,"title":"No url","favicon":null,'
+        b'"date_added":"2025-01-01T00:00:00","parent_id":null,"position":[0,0]}\n'
+    )
+    resp = client.post(
+        "/import", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert resp.status_code == 422
+    assert resp.json()["detail"].startswith("Record 2: bookmark.url")
+
+    resp = client.post(
+        "/import",
+        content=b'{"type":"header","version":2}\n',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 422
+
+    assert [b["title"] for b in client.get("/bookmarks").json()] == ["Keep"]
+    _cleanup()
+
+
+def test_import_body_size_limit(monkeypatch):
+    from quiclick_server.config import reset_config
+
+    monkeypatch.setenv("QUICLICK_IMPORT_MAX_BYTES", "64")
+    reset_config()
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "Keep", "url": "https://keep.com"})
+
+    body = b'{"type":"header","version":1}\n' * 10
+    resp = client.post(
+        "/import", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert resp.status_code == 413
+
+    # Without Content-Length the limit is enforced while streaming
+    resp = client.post(
+        "/import",
+        content=iter([body[:40], body[40:]]),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 413
+    resp = client.post(
+        "/import",
+        content=iter([body[:40]]),
+        headers={"Content-Type": "application/x-ndjson", "Content-Length": "abc"},
+    )
+    assert resp.status_code == 400
+    assert len(client.get("/bookmarks").json()) == 1
+    _cleanup()
+
+
+def test_import_merge_writes_only_differences():
+    client = _authenticated_client()
+    folder = client.post("/folders", json={"title": "Work"}).json()
+    a = client.post("/bookmarks", json={"title": "A", "url": "https://a.com"}).json()
+    b = client.post("/bookmarks", json={"title": "B", "url": "https://b.com"}).json()
+    c = client.post("/bookmarks", json={"title": "C", "url": "https://c.com"}).json()
+    client.patch("/settings", json={"tile_gap": 2})
+    records = [
+        json.loads(line)
+        for line in client.get("/export?format=ndjson").text.splitlines()
+    ]
+    before = {x["id"]: x for x in client.get("/bookmarks").json()}
+
+    by_id = {r.get("id"): r for r in records if r["type"] == "bookmark"}
+    # Rename A, swap the cells of A and B, drop C, add D
+    by_id[a["id"]]["title"] = "A2"
+    by_id[a["id"]]["position"], by_id[b["id"]]["position"] = (
+        by_id[b["id"]]["position"],
+        by_id[a["id"]]["position"],
+    )
+    del by_id[c["id"]]
+    by_id[100] = {
+        **by_id[b["id"]],
+        "id": 100,
+        "title": "D",
+        "parent_id": folder["id"],
+        "position": [0, 0],
+    }
+    body = [r for r in records if r["type"] != "bookmark"] + list(by_id.values())
+
+    resp = client.post("/import?mode=merge", json=body)
+    assert resp.status_code == 200
+    changes = resp.json()["changes"]
+    assert changes["inserted"] == [100]
+    assert sorted(changes["updated"]) == sorted([a["id"], b["id"]])
+    assert changes["deleted"] == [c["id"]]
+    assert changes["unchanged"] == 1  # the folder
+    assert changes["settings_updated"] is False
+
+    after = {x["id"]: x for x in client.get("/bookmarks").json()}
+    assert set(after) == {a["id"], b["id"], 100}
+    assert after[a["id"]]["title"] == "A2"
+    assert after[a["id"]]["position"] == before[b["id"]]["position"]
+    assert after[b["id"]]["position"] == before[a["id"]]["position"]
+    assert after[100]["parent_id"] == folder["id"]
+
+    # Re-importing the same snapshot is a no-op
+    resp = client.post("/import?mode=merge", json=body)
+    changes = resp.json()["changes"]
+    assert changes["inserted"] == changes["updated"] == changes["deleted"] == []
+    assert changes["unchanged"] == 4
+
+    # A soft-deleted item present in the snapshot is restored
+    export = client.get("/export?format=ndjson").text
+    snapshot = [json.loads(line) for line in export.splitlines()]
+    client.delete(f"/bookmarks/{a['id']}")
+    changes = client.post("/import?mode=merge", json=snapshot).json()["changes"]
+    assert changes["updated"] == [a["id"]]
+    assert client.get(f"/bookmarks/{a['id']}").status_code == 200
+    _cleanup()
+
+
+def test_import_merge_rejects_conflicting_positions():
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "A", "url": "https://a.com"})
+    records = [
+        json.loads(line)
+        for line in client.get("/export?format=ndjson").text.splitlines()
+    ]
+    clash = {**records[-1], "id": 50, "title": "Clash"}
+
+    resp = client.post("/import?mode=merge", json=records + [clash])
+    assert resp.status_code == 409
+    assert [x["title"] for x in client.get("/bookmarks").json()] == ["A"]
+    _cleanup()
+
+
+def test_sqlite_snapshot_round_trip():
+    client = _authenticated_client()
+    folder = client.post("/folders", json={"title": "Work"}).json()
+    client.post(
+        "/bookmarks",
+        json={"title": "GH", "url": "https://github.com", "parent_id": folder["id"]},
+    )
+    client.patch("/settings", json={"tile_gap": 4})
+
+    resp = client.get("/export?format=sqlite")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/vnd.sqlite3"
+    snapshot = resp.content
+    assert snapshot.startswith(b"SQLite format 3\x00")
+    assert int(resp.headers["content-length"]) == len(snapshot)
+    accept = client.get("/export", headers={"Accept": "application/vnd.sqlite3"})
+    assert accept.content.startswith(b"SQLite format 3\x00")
+
+    client.post("/bookmarks", json={"title": "Later", "url": "https://later.com"})
+    client.delete(f"/folders/{folder['id']}")
+
+    resp = client.post(
+        "/import",
+        content=snapshot,
+        headers={"Content-Type": "application/vnd.sqlite3"},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["bookmarks"] == 1
+    assert resp.json()["folders"] == 1
+
+    detail = client.get(f"/folders/{folder['id']}").json()
+    assert [b["title"] for b in detail["bookmarks"]] == ["GH"]
+    assert client.get("/settings").json()["tile_gap"] == 4
+    # The restored database is fully usable
+    resp = client.post("/bookmarks", json={"title": "New", "url": "https://new.com"})
+    assert resp.status_code == 201
+    _cleanup()
+
+
+def test_database_replaced_by_another_process(tmp_path):
+    """Pooled connections of the shared engine follow a swapped file."""
+    import os
+
+    from quiclick_server.database import user_db_path
+
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+    snapshot = tmp_path / "snapshot.db"
+    snapshot.write_bytes(client.get("/export?format=sqlite").content)
+    client.post("/bookmarks", json={"title": "Later", "url": "https://later.com"})
+    assert len(client.get("/bookmarks").json()) == 2
+
+    os.replace(snapshot, user_db_path(TEST_SUB))
+    assert [b["title"] for b in client.get("/bookmarks").json()] == ["GH"]
+    _cleanup()
+
+
+def test_sqlite_snapshot_restore_validation(tmp_path):
+    import sqlite3
+
+    from quiclick_server.database import USER_SCHEMA_VERSION
+
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "Keep", "url": "https://keep.com"})
+    headers = {"Content-Type": "application/vnd.sqlite3"}
+
+    resp = client.post("/import", content=b"not a database", headers=headers)
+    assert resp.status_code == 422
+
+    other = tmp_path / "other.db"
+    conn = sqlite3.connect(other)
+    conn.execute("CREATE TABLE unrelated (id INTEGER)")
+    conn.commit()
+    conn.close()
+    resp = client.post("/import", content=other.read_bytes(), headers=headers)
+    assert resp.status_code == 422
+    assert "missing tables" in resp.json()["detail"]
+
+    newer = client.get("/export?format=sqlite").content
+    newer_path = tmp_path / "newer.db"
+    newer_path.write_bytes(newer)
+    conn = sqlite3.connect(newer_path)
+    conn.execute(f"PRAGMA user_version = {USER_SCHEMA_VERSION + 1}")
+    conn.commit()
+    conn.close()
+    resp = client.post("/import", content=newer_path.read_bytes(), headers=headers)
+    assert resp.status_code == 422
+    assert "newer" in resp.json()["detail"]
+
+    resp = client.post("/import?mode=merge", content=newer, headers=headers)
+    assert resp.status_code == 422
+
+    assert [b["title"] for b in client.get("/bookmarks").json()] == ["Keep"]
+    # No temporary files are left behind
+    from quiclick_server.config import cfg
+
+    assert not [p for p in os.listdir(cfg.data_dir) if p.startswith(".")]
+    _cleanup()
+
+
+def test_msgpack_export_import_round_trip():
+    import msgpack
+
+    client = _authenticated_client()
+    folder = client.post("/folders", json={"title": "Work"}).json()
+    client.post(
+        "/bookmarks",
+        json={
+            "title": "GH",
+            "url": "https://github.com",
+            "favicon": PNG_DATA_URL,
+            "parent_id": folder["id"],
+        },
+    )
+    client.patch("/settings", json={"tiles_per_row": 5})
+    full = client.get("/export").json()
+
+    resp = client.get("/export", headers={"Accept": "application/msgpack"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/msgpack"
+    data = msgpack.unpackb(resp.content)
+    assert data["settings"]["tiles_per_row"] == 5
+    assert isinstance(data["export_date"], int)
+    bookmark = data["bookmarks"][0]
+    assert bookmark["favicon"].startswith(b"\x89PNG")
+    assert bookmark["favicon_mime"] == "image/png"
+    assert isinstance(bookmark["date_added"], int)
+
+    # Merging the same snapshot back changes nothing: timestamps are exact
+    packed = resp.content
+    resp = client.post(
+        "/import?mode=merge",
+        content=(packed[i : i + 5] for i in range(0, len(packed), 5)),
+        headers={"Content-Type": "application/msgpack"},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["changes"]["unchanged"] == 2
+
+    client.post("/bookmarks", json={"title": "Later", "url": "https://later.com"})
+    resp = client.post(
+        "/import", content=packed, headers={"Content-Type": "application/msgpack"}
+    )
+    assert resp.status_code == 200
+    after = client.get("/export").json()
+    assert after["bookmarks"] == full["bookmarks"]
+    assert after["folders"] == full["folders"]
+    assert after["settings"] == full["settings"]
+
+    resp = client.post(
+        "/import", content=packed[:-3], headers={"Content-Type": "application/msgpack"}
+    )
+    assert resp.status_code == 422
+    _cleanup()
+
+
+def test_incremental_export_replays_onto_base(tmp_path):
+    from quiclick_server.replay import main as replay
+
+    client = _authenticated_client()
+    folder = client.post("/folders", json={"title": "Work"}).json()
+    kept = client.post(
+        "/bookmarks",
+        json={"title": "GH", "url": "https://github.com", "parent_id": folder["id"]},
+    ).json()
+    gone = client.post("/bookmarks", json={"title": "Old", "url": "https://old.com"})
+
+    resp = client.get("/export?format=sqlite")
+    marker = resp.headers["x-export-marker"]
+    (tmp_path / "base.db").write_bytes(resp.content)
+
+    # Nothing changed: just the header
+    resp = client.get(f"/export?format=ndjson&since={marker}")
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(records) == 1
+    assert records[0]["since"] == records[0]["marker"] == marker
+
+    client.patch(f"/bookmarks/{kept['id']}", json={"title": "GitHub"})
+    client.delete(f"/bookmarks/{gone.json()['id']}")
+    client.post("/bookmarks", json={"title": "New", "url": "https://new.com"})
+    inc1 = client.get(f"/export?format=ndjson&since={marker}").content
+    records = [json.loads(line) for line in inc1.splitlines()]
+    assert [r["type"] for r in records] == ["header", "bookmark", "bookmark", "ids"]
+    assert gone.json()["id"] not in records[-1]["ids"]
+
+    client.patch("/settings", json={"tile_gap": 3})
+    inc2 = client.get(f"/export?format=ndjson&since={records[0]['marker']}").content
+    assert [json.loads(line)["type"] for line in inc2.splitlines()] == [
+        "header",
+        "settings",
+    ]
+    (tmp_path / "inc1.ndjson").write_bytes(inc1)
+    (tmp_path / "inc2.ndjson").write_bytes(inc2)
+
+    out = tmp_path / "out.ndjson"
+    paths = [str(tmp_path / name) for name in ("base.db", "inc1.ndjson", "inc2.ndjson")]
+    assert replay([*paths, "-o", str(out)]) == 0
+    replayed = [json.loads(line) for line in out.read_text().splitlines()]
+    current = [
+        json.loads(line)
+        for line in client.get("/export?format=ndjson").text.splitlines()
+    ]
+    assert replayed[1:] == current[1:]
+    assert replayed[0]["marker"] == current[0]["marker"]
+
+    # The chain must be contiguous
+    assert replay([paths[0], paths[2]]) == 1
+    # Incrementals aren't importable on their own
+    resp = client.post(
+        "/import", content=inc1, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert resp.status_code == 422
+    assert client.get(f"/export?since={marker}").status_code == 422
+    assert client.get("/export?format=ndjson&since=abc").status_code == 422
+    _cleanup()
+
+
+def test_incremental_export_skips_snapshot(monkeypatch):
+    from quiclick_server.routes import export_import
+
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "A", "url": "https://a.com"})
+    marker = client.get("/export?format=ndjson").headers["x-export-marker"]
+
+    snapshots = []
+    create_snapshot = export_import.create_snapshot
+    monkeypatch.setattr(
+        export_import,
+        "create_snapshot",
+        lambda path: snapshots.append(path) or create_snapshot(path),
+    )
+    resp = client.get(f"/export?format=ndjson&since={marker}")
+    assert len(resp.text.splitlines()) == 1
+    client.post("/bookmarks", json={"title": "B", "url": "https://b.com"})
+    resp = client.get(f"/export?format=ndjson&since={marker}")
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["type"] for r in records] == ["header", "bookmark", "ids"]
+    assert resp.headers["x-export-marker"] == records[0]["marker"]
+    assert snapshots == []
+
+    # A marker newer than the data gets a full export, from a snapshot
+    future = str(int(marker) + 10**9)
+    resp = client.get(f"/export?format=ndjson&since={future}")
+    assert "since" not in json.loads(resp.text.splitlines()[0])
+    assert len(snapshots) == 1
+    _cleanup()
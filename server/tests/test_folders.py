@@ -1,8 +1,10 @@
 """Tests for folder CRUD operations."""
 
+import sqlite3
+
 from starlette.testclient import TestClient
 
-from quiclick_server.database import get_current_user
+from quiclick_server.database import get_current_user, user_db_path
 from quiclick_server.main import app
 
 TEST_SUB = "test-user-folders"
@@ -119,3 +121,97 @@ def test_delete_folder_not_found():
     resp = client.delete("/folders/9999")
     assert resp.status_code == 404
     _cleanup()
+
+
+def _nest(client: TestClient) -> dict:
+    """Work > Dev > Tools, with a bookmark on each level and one at root."""
+    ids = {}
+    parent = None
+    for title in ("Work", "Dev", "Tools"):
+        folder = client.post("/folders", json={"title": title, "parent_id": parent})
+        ids[title] = parent = folder.json()["id"]
+        client.post(
+            "/bookmarks",
+            json={"title": f"{title} BM", "url": "https://a.com", "parent_id": parent},
+        )
+    client.post("/bookmarks", json={"title": "Root BM", "url": "https://r.com"})
+    return ids
+
+
+def _titles(node: dict) -> dict:
+    """``{title: nested titles}`` of a tree node (``None`` if not read)."""
+    if node["folders"] is None:
+        return None
+    return {
+        "bookmarks": [b["title"] for b in node["bookmarks"]],
+        "folders": {f["title"]: _titles(f) for f in node["folders"]},
+    }
+
+
+def test_folder_tree():
+    client = _authenticated_client()
+    ids = _nest(client)
+
+    resp = client.get(f"/folders/{ids['Work']}/tree")
+    assert resp.status_code == 200
+    tree = resp.json()
+    assert tree["title"] == "Work"
+    assert _titles(tree) == {
+        "bookmarks": ["Work BM"],
+        "folders": {
+            "Dev": {
+                "bookmarks": ["Dev BM"],
+                "folders": {"Tools": {"bookmarks": ["Tools BM"], "folders": {}}},
+            }
+        },
+    }
+    dev = tree["folders"][0]
+    assert dev["bookmarks"][0]["url"] == "https://a.com"
+    assert dev["parent_id"] == ids["Work"]
+
+    # Folders at the depth limit aren't read
+    shallow = client.get(f"/folders/{ids['Work']}/tree?depth=1").json()
+    assert _titles(shallow) == {"bookmarks": ["Work BM"], "folders": {"Dev": None}}
+    assert shallow["folders"][0]["bookmarks"] is None
+
+    root = client.get("/folders/root/tree?depth=2").json()
+    assert _titles(root) == {
+        "bookmarks": ["Root BM"],
+        "folders": {"Work": {"bookmarks": ["Work BM"], "folders": {"Dev": None}}},
+    }
+
+    # Deleted items are left out (the folder's bookmarks move to root)
+    client.delete(f"/folders/{ids['Tools']}")
+    tree = client.get(f"/folders/{ids['Dev']}/tree").json()
+    assert _titles(tree) == {"bookmarks": ["Dev BM"], "folders": {}}
+    root = client.get("/folders/root/tree?depth=1").json()
+    assert [b["title"] for b in root["bookmarks"]] == ["Root BM", "Tools BM"]
+
+    assert client.get("/folders/9999/tree").status_code == 404
+    assert client.get(f"/folders/{ids['Work']}/tree?depth=0").status_code == 422
+    _cleanup()
+
+
+def test_folder_tree_survives_cycles():
+    client = _authenticated_client()
+    ids = _nest(client)
+    conn = sqlite3.connect(user_db_path(TEST_SUB))
+    with conn:
+        conn.execute(
+            "UPDATE items SET parent_id = ? WHERE id = ?", (ids["Tools"], ids["Dev"])
+        )
+    plan = " ".join(
+        row[3]
+        for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM items WHERE parent_id = 1"
+        )
+    )
+    conn.close()
+    assert "ix_items_parent_grid" in plan
+
+    tree = client.get(f"/folders/{ids['Dev']}/tree").json()
+    assert _titles(tree) == {
+        "bookmarks": ["Dev BM"],
+        "folders": {"Tools": {"bookmarks": ["Tools BM"], "folders": {}}},
+    }
+    _cleanup()
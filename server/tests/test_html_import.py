@@ -0,0 +1,88 @@
+"""Tests for the Netscape bookmark file import."""
+
+from starlette.testclient import TestClient
+
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+
+TEST_SUB = "test-user-html-import"
+
+PNG_DATA_URL = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4"
+    "nGP4DwABAQEABRjYTgAAAABJRU5ErkJggg=="
+)
+
+BOOKMARKS_HTML = f"""<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<!-- This is an automatically generated file. -->
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3 ADD_DATE="1700000000" PERSONAL_TOOLBAR_FOLDER="true">Bookmarks bar</H3>
+    <DL><p>
+        <DT><A HREF="https://github.com/" ADD_DATE="1700000100"
+            ICON="{PNG_DATA_URL}">GitHub</A>
+        <DT><H3>Dev &amp; Ops</H3>
+        <DL><p>
+            <DT><A HREF="https://docs.python.org/">Python  docs</A>
+            <DT><A HREF="javascript:alert(1)">Bookmarklet</A>
+        </DL><p>
+        <DT><A HREF="https://news.ycombinator.com/"
+            ICON="data:image/png;base64,bm90IGEgcG5n">HN</A>
+    </DL><p>
+    <DT><A HREF="https://example.com/">Example – ünïcode</A>
+</DL><p>
+"""
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def test_import_html_nested_folders():
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "Existing", "url": "https://e.com"})
+
+    body = BOOKMARKS_HTML.encode()
+    resp = client.post(
+        "/import/html",
+        # Small chunks split tags and multi-byte characters
+        content=(body[i : i + 11] for i in range(0, len(body), 11)),
+        headers={"Content-Type": "text/html"},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["bookmarks"] == 4
+    assert resp.json()["folders"] == 2
+
+    folders = {f["title"]: f for f in client.get("/folders").json()}
+    bar, dev = folders["Bookmarks bar"], folders["Dev & Ops"]
+    assert bar["parent_id"] is None
+    assert dev["parent_id"] == bar["id"]
+
+    root = [b for b in client.get("/bookmarks").json() if b["parent_id"] is None]
+    assert [b["title"] for b in root] == ["Existing", "Example – ünïcode"]
+    # Existing root item keeps [0,0]; imported root items follow it
+    assert bar["position"] == [1, 0]
+    assert root[1]["position"] == [2, 0]
+
+    in_bar = client.get(f"/folders/{bar['id']}").json()["bookmarks"]
+    assert [b["title"] for b in in_bar] == ["GitHub", "HN"]
+    assert in_bar[0]["favicon"] == PNG_DATA_URL
+    assert in_bar[0]["date_added"].startswith("2023-11-14T22:")
+    assert in_bar[1]["favicon"] is None  # not a real PNG, dropped
+    # GitHub [0,0], Dev & Ops folder [1,0], HN [2,0]
+    assert dev["position"] == [1, 0]
+    assert in_bar[1]["position"] == [2, 0]
+
+    in_dev = client.get(f"/folders/{dev['id']}").json()["bookmarks"]
+    assert [b["title"] for b in in_dev] == ["Python docs"]
+
+    # New items get fresh ids after the imported ones
+    resp = client.post("/bookmarks", json={"title": "After", "url": "https://a.com"})
+    assert resp.status_code == 201
+    _cleanup()
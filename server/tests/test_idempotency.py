@@ -0,0 +1,136 @@
+"""Tests for Idempotency-Key replay on mutating routes."""
+
+from starlette.testclient import TestClient
+
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+
+TEST_SUB = "test-user-idempotency"
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def test_retried_create_is_replayed():
+    client = _authenticated_client()
+    body = {"title": "Once", "url": "https://once.com"}
+    headers = {"Idempotency-Key": "create-1"}
+
+    first = client.post("/bookmarks", json=body, headers=headers)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    retry = client.post("/bookmarks", json=body, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+
+    assert len(client.get("/bookmarks").json()) == 1
+    _cleanup()
+
+
+def test_replayed_delete_keeps_status():
+    client = _authenticated_client()
+    bid = client.post("/bookmarks", json={"title": "X", "url": "https://x.com"}).json()[
+        "id"
+    ]
+    headers = {"Idempotency-Key": "delete-1"}
+
+    assert client.delete(f"/bookmarks/{bid}", headers=headers).status_code == 204
+    retry = client.delete(f"/bookmarks/{bid}", headers=headers)
+    assert retry.status_code == 204
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    _cleanup()
+
+
+def test_key_reused_for_different_request_rejected():
+    client = _authenticated_client()
+    headers = {"Idempotency-Key": "same-key"}
+    client.post(
+        "/bookmarks", json={"title": "A", "url": "https://a.com"}, headers=headers
+    )
+    resp = client.post(
+        "/bookmarks", json={"title": "B", "url": "https://b.com"}, headers=headers
+    )
+    assert resp.status_code == 422
+    _cleanup()
+
+
+def test_requests_without_key_are_not_stored():
+    client = _authenticated_client()
+    body = {"title": "Twice", "url": "https://twice.com"}
+    client.post("/bookmarks", json=body)
+    client.post("/bookmarks", json=body)
+    assert len(client.get("/bookmarks").json()) == 2
+    _cleanup()
+
+
+def test_expired_keys_are_evicted(monkeypatch):
+    from quiclick_server.config import reset_config
+
+    monkeypatch.setenv("QUICLICK_IDEMPOTENCY_TTL_SECONDS", "0")
+    reset_config()
+
+    client = _authenticated_client()
+    body = {"title": "Again", "url": "https://again.com"}
+    headers = {"Idempotency-Key": "short-lived"}
+    client.post("/bookmarks", json=body, headers=headers)
+    retry = client.post("/bookmarks", json=body, headers=headers)
+    assert "Idempotent-Replayed" not in retry.headers
+    assert len(client.get("/bookmarks").json()) == 2
+    _cleanup()
+
+
+def test_key_rejected_on_large_body(monkeypatch):
+    from quiclick_server.config import reset_config
+
+    monkeypatch.setenv("QUICLICK_IDEMPOTENCY_MAX_BODY_BYTES", "64")
+    reset_config()
+
+    client = _authenticated_client()
+    ndjson = '{"type": "header", "version": 1}\n' * 4
+    ndjson_type = {"Content-Type": "application/x-ndjson"}
+    resp = client.post(
+        "/import", content=ndjson, headers={**ndjson_type, "Idempotency-Key": "big"}
+    )
+    assert resp.status_code == 413
+
+    # Small bodies still take keys; large ones are accepted without one
+    body = {"title": "S", "url": "https://s.com"}
+    headers = {"Idempotency-Key": "small"}
+    assert client.post("/bookmarks", json=body, headers=headers).status_code == 201
+    resp = client.post("/import", content=ndjson, headers=ndjson_type)
+    assert resp.status_code != 413
+    _cleanup()
+
+
+def test_keyed_requests_keep_occupancy_index(monkeypatch):
+    from quiclick_server import occupancy
+
+    loads = []
+    load = occupancy.OccupancyIndex.load
+    monkeypatch.setattr(
+        occupancy.OccupancyIndex,
+        "load",
+        classmethod(lambda cls, db: loads.append(1) or load(db)),
+    )
+    client = _authenticated_client()
+    for i in range(5):
+        body = {"title": f"K{i}", "url": f"https://k{i}.com", "position": [0, 0]}
+        headers = {"Idempotency-Key": f"k{i}"}
+        assert client.post("/bookmarks", json=body, headers=headers).status_code == 201
+    assert len(loads) == 1
+    _cleanup()
+
+
+def test_invalid_content_length_rejected():
+    client = _authenticated_client()
+    headers = {"Idempotency-Key": "bad-length", "Content-Length": "abc"}
+    assert client.delete("/bookmarks/1", headers=headers).status_code == 400
+    _cleanup()
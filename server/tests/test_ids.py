@@ -0,0 +1,112 @@
+"""Tests for item id leases."""
+
+from starlette.testclient import TestClient
+
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+
+TEST_SUB = "test-user-ids"
+LAPTOP = {"X-Device-Id": "laptop"}
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def test_lease_blocks_do_not_overlap():
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "A", "url": "https://a.com"})
+
+    first = client.post("/ids/lease", json={"device_id": "laptop", "count": 10})
+    assert first.status_code == 201
+    assert first.json() == {"device_id": "laptop", "start_id": 2, "end_id": 11}
+
+    second = client.post("/ids/lease", json={"device_id": "phone", "count": 5})
+    assert second.json()["start_id"] == 12
+    assert second.json()["end_id"] == 16
+    _cleanup()
+
+
+def test_create_with_leased_ids_in_any_order():
+    client = _authenticated_client()
+    lease = client.post("/ids/lease", json={"device_id": "laptop", "count": 3}).json()
+    start = lease["start_id"]
+
+    bm = client.post(
+        "/bookmarks",
+        json={"id": start + 2, "title": "Last", "url": "https://last.com"},
+        headers=LAPTOP,
+    )
+    assert bm.status_code == 201
+    assert bm.json()["id"] == start + 2
+
+    folder = client.post(
+        "/folders", json={"id": start, "title": "First"}, headers=LAPTOP
+    )
+    assert folder.json()["id"] == start
+
+    # Reusing a leased id conflicts
+    dup = client.post(
+        "/bookmarks",
+        json={"id": start + 2, "title": "Dup", "url": "https://dup.com"},
+        headers=LAPTOP,
+    )
+    assert dup.status_code == 409
+    _cleanup()
+
+
+def test_create_with_unleased_id_rejected():
+    client = _authenticated_client()
+    resp = client.post(
+        "/bookmarks", json={"id": 42, "title": "X", "url": "https://x.com"}
+    )
+    assert resp.status_code == 422
+    _cleanup()
+
+
+def test_create_with_other_devices_id_rejected():
+    client = _authenticated_client()
+    lease = client.post("/ids/lease", json={"device_id": "laptop", "count": 3}).json()
+    body = {"id": lease["start_id"], "title": "X", "url": "https://x.com"}
+
+    for headers in ({}, {"X-Device-Id": "phone"}):
+        assert client.post("/bookmarks", json=body, headers=headers).status_code == 422
+        bulk = {"bookmarks": [body]}
+        resp = client.post("/bookmarks/bulk", json=bulk, headers=headers)
+        assert resp.json()["results"][0]["status"] == 422
+        folder = {"id": lease["start_id"], "title": "F"}
+        batch = {"operations": [{"type": "create_folder", "payload": folder}]}
+        resp = client.post("/batch", json=batch, headers=headers)
+        assert resp.json()["results"][0]["status"] == 422
+
+    assert client.post("/bookmarks", json=body, headers=LAPTOP).status_code == 201
+    _cleanup()
+
+
+def test_device_header_allowed_cross_origin():
+    client = _authenticated_client()
+    resp = client.options(
+        "/bookmarks",
+        headers={
+            "Origin": "chrome-extension://fcemlekbbpkogapcgibnfnneknolknib",
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "content-type,x-device-id",
+        },
+    )
+    assert resp.status_code == 200
+    assert "x-device-id" in resp.headers["Access-Control-Allow-Headers"].lower()
+    _cleanup()
+
+
+def test_server_assigned_ids_skip_leased_blocks():
+    client = _authenticated_client()
+    lease = client.post("/ids/lease", json={"device_id": "laptop", "count": 50}).json()
+
+    resp = client.post("/bookmarks", json={"title": "Server", "url": "https://s.com"})
+    assert resp.json()["id"] == lease["end_id"] + 1
+    _cleanup()
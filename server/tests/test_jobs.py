@@ -0,0 +1,136 @@
+"""Tests for background import/export jobs."""
+
+import json
+import time
+
+from starlette.testclient import TestClient
+
+from quiclick_server import jobs
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+
+TEST_SUB = "test-user-jobs"
+
+
+def _authenticated_client(sub: str = TEST_SUB) -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: sub
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def _wait(client: TestClient, job_id: str) -> dict:
+    for _ in range(200):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] not in jobs.ACTIVE:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_export_job():
+    client = _authenticated_client()
+    client.post("/folders", json={"title": "Work"})
+    client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+
+    resp = client.post("/jobs/export?format=ndjson")
+    assert resp.status_code == 202
+    assert resp.json()["kind"] == "export"
+    job = _wait(client, resp.json()["id"])
+    assert job["status"] == "succeeded"
+    assert job["processed"] == job["total"] == job["result"]["size"]
+
+    result = client.get(f"/jobs/{job['id']}/result")
+    assert result.status_code == 200
+    assert result.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in result.text.splitlines()]
+    assert [r["type"] for r in records] == ["header", "folder", "bookmark"]
+    assert [j["id"] for j in client.get("/jobs").json()] == [job["id"]]
+    _cleanup()
+
+
+def test_import_job():
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+    export = client.get("/export").json()
+    client.post("/bookmarks", json={"title": "Extra", "url": "https://extra.com"})
+
+    resp = client.post("/jobs/import", json=export)
+    assert resp.status_code == 202
+    job = _wait(client, resp.json()["id"])
+    assert job["status"] == "succeeded"
+    assert job["result"]["bookmarks"] == 1
+    assert job["processed"] == job["total"] > 0
+    assert len(client.get("/bookmarks").json()) == 1
+
+    # Import jobs have nothing to download
+    assert client.get(f"/jobs/{job['id']}/result").status_code == 404
+    _cleanup()
+
+
+def test_failed_import_job():
+    client = _authenticated_client()
+    resp = client.post(
+        "/jobs/import",
+        content=b'{"type": "bookmark"}\n',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    job = _wait(client, resp.json()["id"])
+    assert job["status"] == "failed"
+    assert job["error"].startswith("Record 1")
+    assert client.get(f"/jobs/{job['id']}/result").status_code == 404
+    _cleanup()
+
+
+def test_html_import_job():
+    client = _authenticated_client()
+    html = '<DL><p><DT><A HREF="https://example.com/">Example</A></DL><p>'
+    resp = client.post(
+        "/jobs/import/html", content=html, headers={"Content-Type": "text/html"}
+    )
+    job = _wait(client, resp.json()["id"])
+    assert job["status"] == "succeeded"
+    assert job["result"]["bookmarks"] == 1
+    _cleanup()
+
+
+def test_active_job_limit(monkeypatch):
+    class Idle:
+        def submit(self, *args):
+            pass
+
+    monkeypatch.setattr(jobs, "_get_executor", lambda: Idle())
+    client = _authenticated_client()
+    for _ in range(2):
+        assert client.post("/jobs/export").status_code == 202
+    resp = client.post("/jobs/import", json={"bookmarks": [], "folders": []})
+    assert resp.status_code == 429
+    # The rejected upload isn't kept
+    assert not list(jobs.jobs_dir().iterdir())
+
+    queued = client.get("/jobs").json()[0]
+    assert client.get(f"/jobs/{queued['id']}/result").status_code == 409
+
+    # Other users have their own limit and can't see these jobs
+    other = _authenticated_client("test-user-jobs-other")
+    assert other.get(f"/jobs/{queued['id']}").status_code == 404
+    assert other.post("/jobs/export").status_code == 202
+    _cleanup()
+
+
+def test_interrupted_job():
+    client = _authenticated_client()
+    client.get("/bookmarks")
+    with jobs._session() as db:
+        db.add(
+            jobs.JobRecord(
+                id="stale", sub=TEST_SUB, kind="export", status="running", pid=-1
+            )
+        )
+        db.commit()
+    job = client.get("/jobs/stale").json()
+    assert job["status"] == "failed"
+    assert "restart" in job["error"]
+    _cleanup()
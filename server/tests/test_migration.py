@@ -0,0 +1,165 @@
+"""Tests for migrating existing user databases to the current schema."""
+
+import sqlite3
+
+from starlette.testclient import TestClient
+
+from quiclick_server.database import (
+    USER_SCHEMA_VERSION,
+    create_user_engine,
+    dispose_user_engines,
+    get_current_user,
+    get_schema_version,
+    user_db_path,
+)
+from quiclick_server.main import app
+
+TEST_SUB = "test-user-migration"
+
+# Joined-table layout of schema version 1, with the legacy position column
+_LEGACY_SCHEMA = """
+CREATE TABLE items (
+    id INTEGER PRIMARY KEY NOT NULL,
+    type VARCHAR NOT NULL,
+    title VARCHAR NOT NULL,
+    date_added DATETIME NOT NULL,
+    parent_id INTEGER REFERENCES items(id),
+    position FLOAT NOT NULL DEFAULT 0,
+    last_updated DATETIME NOT NULL DEFAULT '2025-01-01T00:00:00',
+    deleted_at DATETIME,
+    position_x INTEGER NOT NULL DEFAULT 0,
+    position_y INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX uq_items_parent_pos
+    ON items (COALESCE(parent_id, 0), position_x, position_y)
+    WHERE deleted_at IS NULL;
+CREATE TABLE bookmarks (
+    id INTEGER NOT NULL REFERENCES items(id),
+    url VARCHAR NOT NULL,
+    favicon BLOB,
+    favicon_mime VARCHAR,
+    PRIMARY KEY (id)
+);
+CREATE TABLE folders (
+    id INTEGER NOT NULL REFERENCES items(id),
+    PRIMARY KEY (id)
+);
+INSERT INTO items (id, type, title, date_added, parent_id, position_x, position_y)
+    VALUES (1, 'folder', 'Work', '2025-01-01 00:00:00.000000', NULL, 0, 0),
+           (2, 'bookmark', 'GH', '2025-01-01 00:00:00.000000', 1, 0, 0),
+           (3, 'bookmark', 'Root', '2025-01-01 00:00:00.000000', NULL, 1, 0);
+INSERT INTO folders (id) VALUES (1);
+INSERT INTO bookmarks (id, url, favicon, favicon_mime)
+    VALUES (2, 'https://github.com', X'89504E47', 'image/png'),
+           (3, 'https://root.com', NULL, NULL);
+PRAGMA user_version = 1;
+"""
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def test_joined_tables_are_flattened():
+    db_path = user_db_path(TEST_SUB)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_LEGACY_SCHEMA)
+    conn.close()
+
+    client = _authenticated_client()
+    folder = client.get("/folders/1").json()
+    assert folder["title"] == "Work"
+    assert [b["url"] for b in folder["bookmarks"]] == ["https://github.com"]
+    assert folder["bookmarks"][0]["favicon"] == "data:image/png;base64,iVBORw=="
+    root = client.get("/bookmarks?folder_id=root").json()
+    assert [(b["id"], b["position"]) for b in root] == [(3, [1, 0])]
+
+    conn = sqlite3.connect(db_path)
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master")}
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(items)")}
+    conn.close()
+    assert {"bookmarks", "folders", "items_legacy"}.isdisjoint(tables)
+    assert {"uq_items_parent_pos", "ix_items_last_updated_id", "items_fts"} <= tables
+    assert "position" not in columns and "url" in columns
+
+    engine = create_user_engine(db_path)
+    assert get_schema_version(engine) == USER_SCHEMA_VERSION
+    engine.dispose()
+
+    # Existing items are indexed for search
+    found = client.get("/search?q=github").json()
+    assert [b["title"] for b in found] == ["GH"]
+
+    # ... and have their normalized URL for duplicate detection
+    resp = client.post(
+        "/bookmarks?on_duplicate=skip",
+        json={"title": "Again", "url": "HTTPS://GitHub.com/"},
+    )
+    assert resp.status_code == 200 and resp.json()["id"] == 2
+
+    # Writes keep working on the new layout
+    resp = client.post("/bookmarks", json={"title": "New", "url": "https://new.com"})
+    assert resp.status_code == 201
+    assert client.delete("/folders/1").status_code == 204
+    assert len(client.get("/bookmarks?folder_id=root").json()) == 3
+    assert [b["title"] for b in client.get("/search?q=new").json()] == ["New"]
+    _cleanup()
+
+
+def test_migration_does_not_block_other_users(monkeypatch):
+    import threading
+
+    from quiclick_server import database
+
+    slow_path = user_db_path("test-user-migration-slow")
+    database.user_engine(slow_path)
+    database.dispose_user_engines()
+    started, release = threading.Event(), threading.Event()
+    migrate = database._migrate_user_db
+
+    def slow_migrate(engine):
+        if engine.url.database == str(slow_path):
+            started.set()
+            release.wait(5)
+        migrate(engine)
+
+    monkeypatch.setattr(database, "_migrate_user_db", slow_migrate)
+    slow = threading.Thread(target=database.user_engine, args=(slow_path,))
+    slow.start()
+    try:
+        assert started.wait(5)
+        # Another user's database is set up while that migration runs
+        other = threading.Thread(
+            target=database.user_engine, args=(user_db_path(TEST_SUB),)
+        )
+        other.start()
+        other.join(2)
+        assert not other.is_alive()
+    finally:
+        release.set()
+        slow.join()
+    assert database.user_engine(slow_path) is database.user_engine(slow_path)
+
+
+def test_missing_url_keys_are_filled():
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+    # A bookmark written without its key, on a current-version database
+    conn = sqlite3.connect(user_db_path(TEST_SUB))
+    with conn:
+        conn.execute("UPDATE items SET url_key = NULL")
+    conn.close()
+    dispose_user_engines()
+
+    resp = client.post(
+        "/bookmarks?on_duplicate=skip",
+        json={"title": "Again", "url": "https://github.com/"},
+    )
+    assert resp.status_code == 200 and resp.json()["title"] == "GH"
+    _cleanup()
@@ -0,0 +1,42 @@
+"""Tests for the in-memory grid occupancy index."""
+
+from quiclick_server.occupancy import OccupancyIndex, ScopeGrid
+
+
+def test_scope_grid_occupy_release():
+    grid = ScopeGrid()
+    assert grid.is_free(3, 1)
+    grid.occupy(3, 1)
+    assert not grid.is_free(3, 1)
+    grid.release(3, 1)
+    assert grid.is_free(3, 1)
+    assert grid.rows == {}
+
+
+def test_nearest_free_prefers_same_row():
+    grid = ScopeGrid()
+    for x in range(3):
+        grid.occupy(x, 0)
+    assert grid.nearest_free(1, 0, 8) == (1, 1)
+    assert grid.nearest_free(2, 0, 8) == (3, 0)
+
+
+def test_nearest_free_stays_within_width():
+    grid = ScopeGrid()
+    for x in range(4):
+        grid.occupy(x, 0)
+    assert grid.nearest_free(3, 0, 4) == (3, 1)
+
+
+def test_apply_releases_before_occupying():
+    index = OccupancyIndex()
+    index.grid(None).occupy(0, 0)
+    index.grid(None).occupy(1, 0)
+    # Swap: both cells stay occupied
+    index.apply([((None, 0, 0), (None, 1, 0)), ((None, 1, 0), (None, 0, 0))])
+    assert not index.grid(None).is_free(0, 0)
+    assert not index.grid(None).is_free(1, 0)
+    # Move into a folder scope
+    index.apply([((None, 1, 0), (7, 0, 0))])
+    assert index.grid(None).is_free(1, 0)
+    assert not index.grid(7).is_free(0, 0)
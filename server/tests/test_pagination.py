@@ -0,0 +1,115 @@
+"""Tests for keyset-paginated bookmark listings and /changes."""
+
+from starlette.testclient import TestClient
+
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+
+TEST_SUB = "test-user-pagination"
+NEXT = "X-Next-Page-Token"
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def _seed(client: TestClient, count: int) -> list[dict]:
+    rows = [{"title": f"B{i}", "url": f"https://b.com/{i}"} for i in range(count)]
+    client.post("/bookmarks/bulk", json={"bookmarks": rows})
+    return client.get("/bookmarks").json()
+
+
+def _pages(client: TestClient, path: str, **params) -> list:
+    pages = []
+    resp = client.get(path, params=params)
+    while True:
+        assert resp.status_code == 200
+        pages.append(resp)
+        token = resp.headers.get(NEXT)
+        if token is None:
+            return pages
+        resp = client.get(path, params={**params, "page_token": token})
+
+
+def test_bookmark_pages():
+    client = _authenticated_client()
+    everything = _seed(client, 23)
+
+    pages = _pages(client, "/bookmarks", limit=10)
+    assert [len(p.json()) for p in pages] == [10, 10, 3]
+    assert [b for p in pages for b in p.json()] == everything
+
+    pages = _pages(client, "/bookmarks", limit=20, fields="title")
+    assert [b for p in pages for b in p.json()] == [
+        {"id": b["id"], "title": b["title"]} for b in everything
+    ]
+
+    # Tokens are bound to their listing
+    token = pages[0].headers[NEXT]
+    resp = client.get("/bookmarks", params={"folder_id": "root", "page_token": token})
+    assert resp.status_code == 422
+    assert client.get("/bookmarks?page_token=garbage").status_code == 422
+    assert client.get("/bookmarks?limit=0").status_code == 422
+    _cleanup()
+
+
+def test_page_size_is_capped(monkeypatch):
+    monkeypatch.setenv("QUICLICK_MAX_PAGE_SIZE", "4")
+    monkeypatch.setenv("QUICLICK_PAGE_SIZE", "3")
+    from quiclick_server.config import reset_config
+
+    reset_config()
+    client = _authenticated_client()
+    _seed(client, 10)
+    assert len(client.get("/bookmarks?limit=100").json()) == 4
+    token = client.get("/bookmarks?limit=1").headers[NEXT]
+    assert len(client.get(f"/bookmarks?page_token={token}").json()) == 3
+    _cleanup()
+
+
+def test_changes_pages():
+    client = _authenticated_client()
+    everything = _seed(client, 12)
+    folder = client.post("/folders", json={"title": "Work"}).json()
+    client.patch("/settings", json={"tile_gap": 3})
+
+    first = client.get("/changes?limit=5")
+    assert len(first.json()["bookmarks"]) == 5
+    assert first.json()["settings"] is None
+    assert "Last-Modified" not in first.headers
+
+    # Changed and deleted while paging: the change comes on a later page
+    moved, gone = everything[0], everything[1]
+    client.patch(f"/bookmarks/{moved['id']}", json={"title": "Moved"})
+    client.delete(f"/bookmarks/{gone['id']}")
+    pages = [first] + _pages(
+        client, "/changes", limit=5, page_token=first.headers[NEXT]
+    )
+    last = pages[-1]
+    assert last.json()["settings"]["tile_gap"] == 3
+    assert "Last-Modified" in last.headers
+
+    seen = {}
+    deleted = []
+    for page in pages:
+        for b in page.json()["bookmarks"]:
+            seen[b["id"]] = b
+        deleted += page.json()["deleted_ids"]
+    assert seen[moved["id"]]["title"] == "Moved"
+    assert gone["id"] in deleted
+    assert [f["id"] for p in pages for f in p.json()["folders"]] == [folder["id"]]
+
+    # Incremental pages start after If-Modified-Since
+    future = {"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+    assert client.get("/changes?limit=5", headers=future).status_code == 304
+    past = {"If-Modified-Since": "Wed, 01 Jan 2020 00:00:00 GMT"}
+    resp = client.get("/changes?limit=100", headers=past)
+    assert NEXT not in resp.headers
+    assert gone["id"] in resp.json()["deleted_ids"]
+    assert len(resp.json()["bookmarks"]) == len(everything) - 1
+    _cleanup()
@@ -51,3 +51,33 @@ def test_reorder_not_found():
     resp = client.patch("/reorder", json={"items": [{"id": 9999, "position": [0, 0]}]})
     assert resp.status_code == 404
     _cleanup()
+
+
+def test_reorder_onto_occupied_cell_gets_nearest_free_cell():
+    client = _authenticated_client()
+
+    a = client.post(
+        "/bookmarks", json={"title": "A", "url": "https://a.com", "position": [0, 0]}
+    ).json()["id"]
+    b = client.post(
+        "/bookmarks", json={"title": "B", "url": "https://b.com", "position": [1, 0]}
+    ).json()["id"]
+    c = client.post(
+        "/bookmarks", json={"title": "C", "url": "https://c.com", "position": [2, 0]}
+    ).json()["id"]
+
+    # C is not part of the request, so its cell stays taken
+    resp = client.patch(
+        "/reorder",
+        json={
+            "items": [
+                {"id": a, "position": [1, 0]},
+                {"id": b, "position": [2, 0]},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    assert client.get(f"/bookmarks/{a}").json()["position"] == [1, 0]
+    assert client.get(f"/bookmarks/{b}").json()["position"] == [3, 0]
+    assert client.get(f"/bookmarks/{c}").json()["position"] == [2, 0]
+    _cleanup()
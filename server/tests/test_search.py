@@ -0,0 +1,77 @@
+"""Tests for full-text search over titles and URLs."""
+
+from starlette.testclient import TestClient
+
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+from quiclick_server.search import match_expression
+
+TEST_SUB = "test-user-search"
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def _titles(client: TestClient, q: str, **params) -> list[str]:
+    resp = client.get("/search", params={"q": q, **params})
+    assert resp.status_code == 200
+    return [item["title"] for item in resp.json()]
+
+
+def test_match_expression():
+    assert match_expression("Git hub") == '"Git"* "hub"*'
+    assert match_expression('a" OR b*') == '"a"* "OR"* "b"*'
+    assert match_expression(" -- ") is None
+
+
+def test_search_titles_and_urls():
+    client = _authenticated_client()
+    for title, url in (
+        ("GitHub", "https://github.com"),
+        ("Code hosting", "https://gitlab.com/explore"),
+        ("Café notes", "https://notes.example.com"),
+    ):
+        client.post("/bookmarks", json={"title": title, "url": url})
+    client.post("/folders", json={"title": "Git tools"})
+
+    assert _titles(client, "git") == ["Git tools", "GitHub", "Code hosting"]
+    assert _titles(client, "git expl") == ["Code hosting"]
+    assert _titles(client, "GITHUB.COM") == ["GitHub"]
+    assert _titles(client, "cafe") == ["Café notes"]
+    assert _titles(client, "git", limit=1) == ["Git tools"]
+    assert _titles(client, '"') == []
+    assert client.get("/search?q=").status_code == 422
+
+    resp = client.get("/search", params={"q": "github", "fields": "url"})
+    assert resp.json() == [{"id": 1, "url": "https://github.com"}]
+    _cleanup()
+
+
+def test_search_index_follows_writes():
+    client = _authenticated_client()
+    bm = client.post("/bookmarks", json={"title": "Old", "url": "https://a.com"})
+    bid = bm.json()["id"]
+    client.patch(f"/bookmarks/{bid}", json={"title": "Renamed"})
+    assert _titles(client, "old") == []
+    assert _titles(client, "renamed") == ["Renamed"]
+
+    client.delete(f"/bookmarks/{bid}")
+    assert _titles(client, "renamed") == []
+
+    rows = [{"title": f"Imported {i}", "url": f"https://i.com/{i}"} for i in range(3)]
+    client.post("/bookmarks/bulk", json={"bookmarks": rows})
+    assert len(_titles(client, "imported")) == 3
+
+    # A replacing import re-indexes everything
+    export = client.get("/export").json()
+    client.post("/bookmarks", json={"title": "Later", "url": "https://l.com"})
+    assert client.post("/import", json=export).status_code == 200
+    assert _titles(client, "later") == []
+    assert len(_titles(client, "imported")) == 3
+    _cleanup()
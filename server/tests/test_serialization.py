@@ -0,0 +1,101 @@
+"""The bulk serializers must match the response models byte for byte."""
+
+from pydantic_core import to_json
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from quiclick_server.database import create_user_engine, get_current_user, user_db_path
+from quiclick_server.main import app
+from quiclick_server.models import Bookmark, Folder
+from quiclick_server.routes.bookmarks import _bookmark_to_response
+from quiclick_server.routes.folders import _folder_to_response
+from quiclick_server.serialization import bookmark_dict, folder_dict
+
+TEST_SUB = "test-user-serialization"
+
+PNG_DATA_URL = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4"
+    "nGP4DwABAQEABRjYTgAAAABJRU5ErkJggg=="
+)
+
+
+def _authenticated_client() -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: TEST_SUB
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+
+
+def test_dicts_match_response_models():
+    client = _authenticated_client()
+    folder = client.post("/folders", json={"title": "Wörk"}).json()
+    client.post(
+        "/bookmarks",
+        json={
+            "title": "GH",
+            "url": "https://github.com",
+            "favicon": PNG_DATA_URL,
+            "parent_id": folder["id"],
+        },
+    )
+    client.post("/bookmarks", json={"title": "Plain", "url": "https://plain.com"})
+    client.delete(f"/folders/{folder['id']}")
+
+    engine = create_user_engine(user_db_path(TEST_SUB))
+    try:
+        with Session(engine) as db:
+            bookmarks = db.query(Bookmark).all()
+            folders = db.query(Folder).all()
+            assert len(bookmarks) == 2 and folders[0].deleted_at is not None
+            for bm in bookmarks:
+                expected = _bookmark_to_response(bm).model_dump_json().encode()
+                assert to_json(bookmark_dict(bm)) == expected
+            for f in folders:
+                expected = _folder_to_response(f).model_dump_json().encode()
+                assert to_json(folder_dict(f)) == expected
+    finally:
+        engine.dispose()
+    _cleanup()
+
+
+def test_core_queries_match_orm():
+    client = _authenticated_client()
+    folder = client.post("/folders", json={"title": "Work"}).json()
+    client.post("/folders", json={"title": "Gone"})
+    client.delete(f"/folders/{folder['id'] + 1}")
+    for i in range(3):
+        client.post(
+            "/bookmarks",
+            json={
+                "title": f"In {i}",
+                "url": f"https://in.com/{i}",
+                "favicon": PNG_DATA_URL,
+                "parent_id": folder["id"],
+            },
+        )
+        client.post("/bookmarks", json={"title": f"Root {i}", "url": f"https://r/{i}"})
+
+    engine = create_user_engine(user_db_path(TEST_SUB))
+    try:
+        with Session(engine) as db:
+            live = db.query(Bookmark).filter(Bookmark.deleted_at.is_(None))
+            grid = (Bookmark.position_y, Bookmark.position_x)
+
+            def dumped(bookmarks):
+                return [
+                    _bookmark_to_response(b).model_dump(mode="json") for b in bookmarks
+                ]
+
+            assert client.get("/bookmarks").json() == dumped(live.order_by(*grid))
+            root = live.filter(Bookmark.parent_id.is_(None)).order_by(*grid)
+            assert client.get("/bookmarks?folder_id=root").json() == dumped(root)
+            inside = live.filter(Bookmark.parent_id == folder["id"]).order_by(*grid)
+            detail = client.get(f"/folders/{folder['id']}").json()
+            assert detail["bookmarks"] == dumped(inside)
+            assert [f["id"] for f in client.get("/folders").json()] == [folder["id"]]
+    finally:
+        engine.dispose()
+    assert client.get(f"/folders/{folder['id'] + 1}").status_code == 404
+    _cleanup()
@@ -0,0 +1,89 @@
+"""Tests for the full-sync body cache."""
+
+import gzip
+
+from starlette.testclient import TestClient
+
+from quiclick_server import sync_cache
+from quiclick_server.database import get_current_user
+from quiclick_server.main import app
+
+TEST_SUB = "test-user-sync-cache"
+
+
+def _authenticated_client(sub: str = TEST_SUB) -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: sub
+    return TestClient(app)
+
+
+def _cleanup():
+    app.dependency_overrides.clear()
+    sync_cache.clear()
+
+
+def test_full_pull_served_from_cache_until_a_write():
+    client = _authenticated_client()
+    client.post("/bookmarks", json={"title": "GH", "url": "https://github.com"})
+
+    first = client.get("/changes")
+    assert sync_cache.misses == 1
+    second = client.get("/changes")
+    assert sync_cache.hits == 1
+    assert second.json() == first.json()
+    assert second.headers["last-modified"] == first.headers["last-modified"]
+
+    client.post("/bookmarks", json={"title": "New", "url": "https://new.com"})
+    third = client.get("/changes")
+    assert sync_cache.misses == 2
+    assert [b["title"] for b in third.json()["bookmarks"]] == ["GH", "New"]
+
+    # The JSON export is cached the same way
+    export = client.get("/export").json()
+    assert client.get("/export").json() == export
+    assert sync_cache.hits == 2
+    _cleanup()
+
+
+def test_compressed_variants():
+    client = _authenticated_client()
+    rows = [{"title": f"B{i}", "url": f"https://b{i}.com"} for i in range(20)]
+    client.post("/bookmarks/bulk", json={"bookmarks": rows})
+
+    plain = client.get("/changes", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    resp = client.get("/changes", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert resp.json() == plain.json()
+    assert len(plain.content) >= 1024
+
+    with client.stream(
+        "GET", "/changes", headers={"Accept-Encoding": "gzip;q=0, br"}
+    ) as raw:
+        assert "content-encoding" not in raw.headers
+    with client.stream("GET", "/export", headers={"Accept-Encoding": "*"}) as raw:
+        body = b"".join(raw.iter_raw())
+    assert raw.headers["content-encoding"] in ("gzip", "zstd")
+    if raw.headers["content-encoding"] == "gzip":
+        assert gzip.decompress(body).startswith(b'{"bookmarks":')
+    _cleanup()
+
+
+def test_lru_eviction_under_memory_budget(monkeypatch):
+    from quiclick_server.config import reset_config
+
+    client = _authenticated_client("test-user-sync-a")
+    client.get("/changes", headers={"Accept-Encoding": "identity"})
+    size = sync_cache._size
+    monkeypatch.setenv("QUICLICK_SYNC_CACHE_BYTES", str(size * 2 + size // 2))
+    reset_config()
+
+    for sub in ("test-user-sync-b", "test-user-sync-c"):
+        _authenticated_client(sub).get(
+            "/changes", headers={"Accept-Encoding": "identity"}
+        )
+    assert len(sync_cache._entries) == 2
+    assert str(sync_cache._entries.popitem(last=False)[0][0]).endswith(
+        "test-user-sync-b.db"
+    )
+    _cleanup()